@@ -1,3 +1,4 @@
+import json
 import requests
 import time
 import os
@@ -83,6 +84,42 @@ def poll_job_status(job_id: str, timeout_seconds: int = 300) -> dict | None:
     print("Job polling timed out.")
     return None
 
+def stream_job_events(job_id: str, timeout_seconds: int = 300) -> dict | None:
+    """
+    Follows a job over its Server-Sent Events stream instead of polling. Events arrive
+    as soon as they happen: progress messages, denoising steps and low-resolution
+    previews, then a final "complete" or "failed" event.
+
+    Args:
+        job_id: The ID of the job to follow.
+        timeout_seconds: The maximum time to wait between two messages from the server.
+
+    Returns:
+        The payload of the "complete" event, otherwise None.
+    """
+    headers = {"Authorization": f"Bearer {API_KEY}", "Accept": "text/event-stream"}
+    try:
+        with requests.get(f"{API_BASE_URL}/api/job/{job_id}/events", headers=headers, stream=True, timeout=timeout_seconds) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if event == "progress":
+                        print(f"[{data['progress_percent']}%] {data['message']}")
+                    elif event == "step":
+                        print(f"Denoising step {data['step']}/{data['total_steps']}")
+                    elif event == "complete":
+                        return data["result"]
+                    elif event == "failed":
+                        print(f"Job failed: {data['error']}")
+                        return None
+    except requests.exceptions.RequestException as e:
+        print(f"An error occurred while streaming events: {e}")
+    return None
+
 # --- Main Execution ---
 
 if __name__ == "__main__":
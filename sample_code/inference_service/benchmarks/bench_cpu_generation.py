@@ -0,0 +1,112 @@
+"""
+Compares CPU generation speed of the eager float32 path against the CPU-optimised mode.
+
+Each mode runs in its own subprocess, so thread settings and compiled graphs do not
+leak between runs. Every mode does one warm-up generation (which also pays any
+torch.compile cost) before the timed repeats.
+
+Usage (from the inference_service directory):
+    python -m benchmarks.bench_cpu_generation
+    python -m benchmarks.bench_cpu_generation --modes eager bf16 bf16-compile --frames 8 --steps 4 --size 256
+    python -m benchmarks.bench_cpu_generation --tier fast --steps 4
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+MODES = {
+    "eager": {"enabled": False},
+    "fp32-optimized": {"enabled": True, "dtype": "float32"},
+    "bf16": {"enabled": True, "dtype": "bfloat16"},
+    "bf16-compile": {"enabled": True, "dtype": "bfloat16", "compile": True},
+}
+
+def run_mode(args: argparse.Namespace) -> dict:
+    """Runs inside the subprocess: loads the pipeline in one mode and times generations."""
+    import torch
+    from pipeline import animator, cpu_mode
+
+    cpu_mode.configure(cpu_mode.CpuOptions(num_threads=args.threads, **MODES[args.mode]))
+    if args.tier == "fast":
+        motion_adapter_id, guidance_scale = animator.lightning_adapter_id(args.steps), animator.LIGHTNING_GUIDANCE_SCALE
+    else:
+        motion_adapter_id, guidance_scale = args.motion_adapter_id, 7.5
+
+    start = time.perf_counter()
+    instance = animator.Animator(model_id=args.model_id, motion_adapter_id=motion_adapter_id)
+    instance.to_device()
+    load_seconds = time.perf_counter() - start
+
+    def generate() -> float:
+        start = time.perf_counter()
+        instance.generate(
+            motion_prompt="walking", character_prompt="a 2D knight sprite",
+            num_frames=args.frames, num_inference_steps=args.steps, guidance_scale=guidance_scale,
+            height=args.size, width=args.size, seed=0,
+        )
+        return time.perf_counter() - start
+
+    warm_up_seconds = generate()
+    timings = [generate() for _ in range(args.repeats)]
+    best = min(timings)
+    return {
+        "mode": args.mode,
+        "dtype": str(instance.dtype).replace("torch.", ""),
+        "threads": torch.get_num_threads(),
+        "load_seconds": round(load_seconds, 2),
+        "warm_up_seconds": round(warm_up_seconds, 2),
+        "seconds_per_generation": round(best, 2),
+        "seconds_per_frame": round(best / args.frames, 3),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=["eager", "bf16"])
+    parser.add_argument("--mode", choices=sorted(MODES), help=argparse.SUPPRESS)
+    parser.add_argument("--model-id", default="runwayml/stable-diffusion-v1-5")
+    parser.add_argument("--motion-adapter-id", default="guoyww/animatediff-motion-adapter-v1-5-2")
+    parser.add_argument("--tier", choices=["quality", "fast"], default="quality")
+    parser.add_argument("--frames", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table.")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args)))
+        return
+
+    results = []
+    passthrough = [a for a in sys.argv[1:] if a != "--json"]
+    for mode in args.modes:
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_cpu_generation", *passthrough, "--mode", mode],
+            capture_output=True, text=True, cwd=Path(__file__).resolve().parents[1],
+        )
+        if completed.returncode != 0:
+            results.append({"mode": mode, "error": completed.stderr.strip().splitlines()[-1:]})
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    baseline = next((r["seconds_per_frame"] for r in results if r.get("mode") == "eager" and "error" not in r), None)
+    print(f"{args.frames} frames, {args.steps} steps, {args.size}px, tier {args.tier}")
+    print(f"{'mode':>15} {'dtype':>9} {'threads':>8} {'s/frame':>8} {'speedup':>8} {'warm-up s':>10}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['mode']:>15} failed: {' '.join(r['error'])}")
+            continue
+        speedup = f"{baseline / r['seconds_per_frame']:.2f}x" if baseline else "-"
+        print(f"{r['mode']:>15} {r['dtype']:>9} {r['threads']:>8} {r['seconds_per_frame']:>8} {speedup:>8} {r['warm_up_seconds']:>10}")
+
+if __name__ == "__main__":
+    main()
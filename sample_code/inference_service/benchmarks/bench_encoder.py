@@ -0,0 +1,58 @@
+"""
+Compares encode time and output size of every sprite sheet format and preset.
+
+The sheet is assembled from synthetic frames with `image_utils.create_sprite_sheet`
+(or from a real sheet passed with --image), so results reflect the transparent
+padding typical of our grid sheets.
+
+Usage (from the inference_service directory):
+    python -m benchmarks.bench_encoder
+    python -m benchmarks.bench_encoder --image outputs/<job_id>/character_sprites.png
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.bench_hitboxes import make_frames
+from utils import encoder, image_utils
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", type=Path, help="Encode this sheet instead of a synthetic one.")
+    parser.add_argument("--frames", type=int, default=16)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table.")
+    args = parser.parse_args()
+
+    if args.image:
+        sheet = Image.open(args.image).convert('RGBA')
+    else:
+        sheet = image_utils.create_sprite_sheet(make_frames(args.frames, args.size), columns=4)
+
+    results = []
+    for fmt in encoder.FORMATS:
+        for preset in encoder.PRESETS:
+            best = float("inf")
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                data = encoder.encode_to_bytes(sheet, fmt, preset)
+                best = min(best, time.perf_counter() - start)
+            results.append({"format": fmt, "preset": preset, "bytes": len(data), "encode_ms": round(best * 1000, 1)})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"Sheet: {sheet.width}x{sheet.height}")
+    print(f"{'format':>7} {'preset':>9} {'bytes':>10} {'encode ms':>10}")
+    for r in results:
+        print(f"{r['format']:>7} {r['preset']:>9} {r['bytes']:>10} {r['encode_ms']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmarks hitbox generation throughput for long, high-resolution animations.
+
+Compares the batched implementation in `pipeline.hitbox_generator` (one
+connected-components pass per chunk of frames) against the previous per-frame
+`cv2.findContours` loop on synthetic frames containing a body and a few detached limbs.
+
+Usage (from the inference_service directory):
+    python -m benchmarks.bench_hitboxes
+    python -m benchmarks.bench_hitboxes --frames 16 64 256 --sizes 512 1024 --repeats 5
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline import hitbox_generator
+
+def make_frames(num_frames: int, size: int, seed: int = 0) -> List[Image.Image]:
+    """Synthetic RGBA frames: a moving torso ellipse plus two detached 'fists'."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(num_frames):
+        alpha = np.zeros((size, size), dtype=np.uint8)
+        cx = size // 2 + int(size * 0.1 * np.sin(i / 4))
+        cv2.ellipse(alpha, (cx, size // 2), (size // 6, size // 3), 0, 0, 360, 255, -1)
+        for _ in range(2):
+            x, y = rng.integers(size // 8, size - size // 8, size=2)
+            cv2.circle(alpha, (int(x), int(y)), size // 24, 255, -1)
+        rgba = np.dstack([np.full((size, size, 3), 128, dtype=np.uint8), alpha])
+        frames.append(Image.fromarray(rgba, mode='RGBA'))
+    return frames
+
+def legacy_hitboxes(frames: List[Image.Image], contour_area_threshold: int = 100) -> list:
+    """The original per-frame implementation, kept here as the baseline."""
+    hitboxes = []
+    for frame in frames:
+        alpha_channel = np.array(frame)[:, :, 3]
+        contours, _ = cv2.findContours(alpha_channel, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        hitbox = {"x": 0, "y": 0, "width": 0, "height": 0}
+        if contours:
+            largest = max(contours, key=cv2.contourArea)
+            if cv2.contourArea(largest) >= contour_area_threshold:
+                x, y, w, h = cv2.boundingRect(largest)
+                hitbox = {"x": int(x), "y": int(y), "width": int(w), "height": int(h)}
+        hitboxes.append(hitbox)
+    return hitboxes
+
+def time_it(fn: Callable[[], object], repeats: int) -> float:
+    """Returns the best wall-clock time in seconds over `repeats` runs."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[512, 768])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table.")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        for num_frames in args.frames:
+            frames = make_frames(num_frames, size)
+            legacy = time_it(lambda: legacy_hitboxes(frames), args.repeats)
+            batched = time_it(lambda: hitbox_generator.generate_hitboxes_for_animation(frames), args.repeats)
+            regions = time_it(
+                lambda: hitbox_generator.generate_hitboxes_for_animation(frames, include_regions=True),
+                args.repeats
+            )
+            results.append({
+                "size": size,
+                "frames": num_frames,
+                "legacy_fps": round(num_frames / legacy, 1),
+                "batched_fps": round(num_frames / batched, 1),
+                "batched_with_regions_fps": round(num_frames / regions, 1),
+                "speedup": round(legacy / batched, 2),
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'size':>6} {'frames':>7} {'legacy f/s':>11} {'batched f/s':>12} {'+regions f/s':>13} {'speedup':>8}")
+    for r in results:
+        print(f"{r['size']:>6} {r['frames']:>7} {r['legacy_fps']:>11} {r['batched_fps']:>12} "
+              f"{r['batched_with_regions_fps']:>13} {r['speedup']:>7}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Load-tests the inference service under increasing concurrency.
+
+Starts the FastAPI app in-process on a local port with stub models (see
+`benchmarks.suite`), plus a local HTTP server that serves synthetic source images so
+the real download path runs offline. Then it ramps through concurrency levels: at
+each level that many closed-loop clients submit jobs to /run-task and follow them
+over the job event stream until they finish, for a fixed duration.
+
+Reports, per level: throughput, end-to-end latency percentiles, queue wait
+percentiles and error rate (rejected submissions and failed jobs), plus a timeline
+of queue depth and running jobs sampled from /metrics.
+
+Service settings come from the usual SPRITESHIFT_* variables, read when the app is
+imported; the flags below set the most relevant ones. The result cache is disabled
+unless --cache is given, so every job does the full work.
+
+Usage (from the inference_service directory):
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --concurrency 1 2 4 8 16 --level-seconds 20 --workers 2
+    python -m benchmarks.load_test --generate-seconds 2.0 --max-queue-size 8 --json --output load.json
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.bench_hitboxes import make_frames
+from benchmarks.suite import backend_patches, make_source_image, summarize_latencies
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+# --- Fake image origin ---
+
+class ImageOrigin:
+    """
+    A threaded HTTP server on localhost serving `count` distinct synthetic source images
+    at /source-<n>.png.
+    """
+    def __init__(self, size: int, count: int):
+        images = {f"/source-{n}.png": make_source_image(size, seed=n) for n in range(count)}
+        self.count = count
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                data = images.get(self.path)
+                if data is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", free_port()), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="image-origin", daemon=True)
+
+    def url(self, n: int) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/source-{n % self.count}.png"
+
+    def __enter__(self) -> "ImageOrigin":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+# --- In-process service ---
+
+class Service:
+    """Runs the FastAPI app under uvicorn on a background thread."""
+    def __init__(self, port: int):
+        import uvicorn
+        import main
+        self.base_url = f"http://127.0.0.1:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, name="uvicorn", daemon=True)
+
+    def __enter__(self) -> "Service":
+        self._thread.start()
+        deadline = time.monotonic() + 30
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("The service did not start.")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=30)
+
+# --- Load generation ---
+
+def run_job(client, base_url: str, source_url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Submits one job and follows its event stream until it finishes."""
+    start = time.perf_counter()
+    response = client.post(f"{base_url}/run-task", json={"source_image_url": source_url, "params": params})
+    if response.status_code != 202:
+        return {"outcome": "rejected", "status_code": response.status_code, "seconds": time.perf_counter() - start}
+    job_id = response.json()["job_id"]
+    outcome = "failed"
+    with client.stream("GET", f"{base_url}/api/job/{job_id}/events") as events:
+        for line in events.iter_lines():
+            if line == "event: complete":
+                outcome = "complete"
+                break
+            if line == "event: failed":
+                break
+    seconds = time.perf_counter() - start
+    status = client.get(f"{base_url}/api/job/{job_id}/status").json()
+    return {"outcome": outcome, "seconds": seconds, "queue_wait_seconds": status.get("queue_wait_seconds")}
+
+def sample_metrics(client, base_url: str) -> Dict[str, float]:
+    """Reads the unlabelled gauges from /metrics."""
+    values = {}
+    for line in client.get(f"{base_url}/metrics").text.splitlines():
+        if line.startswith("spriteshift_") and "{" not in line:
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+def run_level(
+    base_url: str,
+    origin: ImageOrigin,
+    concurrency: int,
+    duration: float,
+    params: Dict[str, Any],
+    timeline: List[Dict[str, Any]],
+    started_at: float,
+    sample_interval: float
+) -> Dict[str, Any]:
+    """Runs `concurrency` closed-loop clients for `duration` seconds and summarizes their jobs."""
+    import httpx
+
+    jobs: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    counter = iter(range(10**9))
+    deadline = time.monotonic() + duration
+    stop_sampling = threading.Event()
+
+    def client_loop():
+        with httpx.Client(timeout=None) as client:
+            while time.monotonic() < deadline:
+                with lock:
+                    n = next(counter)
+                try:
+                    job = run_job(client, base_url, origin.url(n), params)
+                except httpx.HTTPError as e:
+                    job = {"outcome": "error", "error": str(e), "seconds": 0.0}
+                with lock:
+                    jobs.append(job)
+
+    def sampler_loop():
+        with httpx.Client(timeout=10) as client:
+            while not stop_sampling.wait(sample_interval):
+                gauges = sample_metrics(client, base_url)
+                timeline.append({
+                    "t": round(time.monotonic() - started_at, 2),
+                    "concurrency": concurrency,
+                    "queue_depth": gauges.get("spriteshift_queue_depth"),
+                    "running": gauges.get("spriteshift_jobs_running"),
+                })
+
+    level_start = time.monotonic()
+    sampler = threading.Thread(target=sampler_loop, daemon=True)
+    sampler.start()
+    clients = [threading.Thread(target=client_loop, daemon=True) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    stop_sampling.set()
+    sampler.join()
+    elapsed = time.monotonic() - level_start
+
+    completed = [job for job in jobs if job["outcome"] == "complete"]
+    errors = [job for job in jobs if job["outcome"] != "complete"]
+    queue_waits = [job["queue_wait_seconds"] for job in completed if job.get("queue_wait_seconds") is not None]
+    level = {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "jobs": len(jobs),
+        "completed": len(completed),
+        "rejected": sum(1 for job in errors if job["outcome"] == "rejected"),
+        "failed": sum(1 for job in errors if job["outcome"] in ("failed", "error")),
+        "error_rate": round(len(errors) / len(jobs), 4) if jobs else 0.0,
+        "throughput_jobs_per_second": round(len(completed) / elapsed, 3),
+    }
+    if completed:
+        level["latency_ms"] = summarize_latencies([job["seconds"] for job in completed])
+    if queue_waits:
+        level["queue_wait_ms"] = summarize_latencies(queue_waits)
+    depths = [point["queue_depth"] for point in timeline if point["concurrency"] == concurrency and point["queue_depth"] is not None]
+    level["max_queue_depth"] = int(max(depths)) if depths else None
+    return level
+
+def print_table(report: Dict[str, Any]) -> None:
+    config = report["config"]
+    print(f"Workers: {config['workers']}, max queue size: {config['max_queue_size']}, "
+          f"stub generation: {config['generate_seconds']}s, frames: {config['frames']}x{config['size']}px")
+    print(f"{'clients':>7} {'jobs':>6} {'ok':>6} {'errors':>7} {'jobs/s':>8} {'p50 ms':>9} {'p90 ms':>9} "
+          f"{'p99 ms':>9} {'wait p50':>9} {'max queue':>9}")
+    for level in report["levels"]:
+        latency = level.get("latency_ms", {})
+        wait = level.get("queue_wait_ms", {})
+        print(f"{level['concurrency']:>7} {level['jobs']:>6} {level['completed']:>6} {level['error_rate']:>7.1%} "
+              f"{level['throughput_jobs_per_second']:>8.2f} {latency.get('p50', float('nan')):>9.0f} "
+              f"{latency.get('p90', float('nan')):>9.0f} {latency.get('p99', float('nan')):>9.0f} "
+              f"{wait.get('p50', float('nan')):>9.0f} {str(level['max_queue_depth']):>9}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--level-seconds", type=float, default=10.0, help="How long each concurrency level runs.")
+    parser.add_argument("--workers", type=int, default=2, help="SPRITESHIFT_NUM_WORKERS of the service.")
+    parser.add_argument("--max-queue-size", type=int, default=64, help="SPRITESHIFT_MAX_QUEUE_SIZE of the service.")
+    parser.add_argument("--generate-seconds", type=float, default=0.5,
+                        help="Time the stub generation holds the GPU stage, standing in for real inference.")
+    parser.add_argument("--frames", type=int, default=16)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--images", type=int, default=16, help="Distinct source images served by the origin.")
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache enabled.")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="Seconds between /metrics samples.")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON instead of a table.")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "SPRITESHIFT_PRELOAD_MODELS": "0",
+        "SPRITESHIFT_NUM_WORKERS": str(args.workers),
+        "SPRITESHIFT_MAX_QUEUE_SIZE": str(args.max_queue_size),
+        "SPRITESHIFT_CACHE_ENABLED": "1" if args.cache else "0",
+    })
+    import main as service_main  # Reads the settings above.
+    logging.getLogger().setLevel(logging.WARNING)
+
+    def generate(num_frames: int = 16, width: int = 512, seed: Optional[int] = None, **kwargs):
+        # Sleeping releases the GIL like a CUDA call would, so CPU stages of other jobs proceed.
+        time.sleep(args.generate_seconds)
+        return make_frames(num_frames, width, seed=seed or 0)
+
+    params = {"num_frames": args.frames, "width": args.size, "height": args.size}
+    timeline: List[Dict[str, Any]] = []
+    levels = []
+    with ImageOrigin(args.size, args.images) as origin, backend_patches("stub", generate=generate), \
+            Service(free_port()) as service:
+        started_at = time.monotonic()
+        for concurrency in args.concurrency:
+            levels.append(run_level(
+                service.base_url, origin, concurrency, args.level_seconds, params, timeline, started_at, args.sample_interval
+            ))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "workers": service_main.NUM_WORKERS,
+            "max_queue_size": service_main.MAX_QUEUE_SIZE,
+            "generate_seconds": args.generate_seconds,
+            "frames": args.frames,
+            "size": args.size,
+            "level_seconds": args.level_seconds,
+            "cache": args.cache,
+        },
+        "levels": levels,
+        "timeline": timeline,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Benchmark suite for the whole pipeline and each of its modules.
+
+Every benchmark runs on synthetic inputs at each requested frame size and frame
+count, and reports latency percentiles, throughput and peak memory as JSON that
+can be compared across commits.
+
+Backends:
+    stub  Background removal, pose extraction and generation are replaced by
+          deterministic fakes (no model downloads, CPU only), so the numbers track
+          our own code: orchestration, hitboxes, sheets, atlases and encoding.
+          Suitable for CI.
+    real  The real models, loaded from the local Hugging Face / rembg caches with
+          downloads disabled. Use it on a GPU box with the weights already cached.
+
+The source image is always synthetic and served from memory; no network is used.
+
+Usage (from the inference_service directory):
+    python -m benchmarks.suite
+    python -m benchmarks.suite --sizes 256 512 --frames 8 16 --repeats 5 --output report.json
+    python -m benchmarks.suite --backend real --benchmarks generate pipeline --steps 4
+    python -m benchmarks.suite --compare baseline.json --max-regression 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from unittest.mock import patch
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.bench_hitboxes import make_frames
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BACKENDS = ("stub", "real")
+BENCHMARKS = ("background", "pose", "generate", "hitboxes", "hurtboxes", "sprite_sheet", "atlas", "pipeline")
+# Solid colour behind the synthetic character, removed by the stub background remover.
+SOURCE_BACKGROUND = (40, 160, 220)
+
+# --- Synthetic inputs ---
+
+def make_source_image(size: int, seed: Optional[int] = None) -> bytes:
+    """A PNG of a character silhouette on a solid background, as a user would upload."""
+    figure = make_frames(1, size, seed=size if seed is None else seed)[0]
+    source = Image.new('RGB', (size, size), SOURCE_BACKGROUND)
+    source.paste(figure.convert('RGB'), (0, 0), figure)
+    buffer = io.BytesIO()
+    source.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def stub_landmarks(visibility: float = 0.99) -> List[Dict[str, float]]:
+    """33 MediaPipe-style landmarks of a standing figure centred in the frame."""
+    landmarks = []
+    for i in range(33):
+        # Head (0-10), arms (11-22) spread sideways, legs (23-32) down the lower half.
+        if i <= 10:
+            x, y = 0.5 + (i - 5) * 0.01, 0.2
+        elif i <= 22:
+            side = -1 if i % 2 else 1
+            x, y = 0.5 + side * (0.08 + (i - 11) * 0.01), 0.35 + (i - 11) * 0.01
+        else:
+            side = -1 if i % 2 else 1
+            x, y = 0.5 + side * 0.06, 0.55 + (i - 23) * 0.04
+        landmarks.append({"x": x, "y": y, "z": 0.0, "visibility": visibility})
+    return landmarks
+
+def stub_remove_background(image: Image.Image, model_name: Optional[str] = None) -> Image.Image:
+    rgb = np.asarray(image.convert('RGB'))
+    alpha = np.where(np.all(rgb == SOURCE_BACKGROUND, axis=-1), 0, 255).astype(np.uint8)
+    return Image.fromarray(np.dstack([rgb, alpha]), mode='RGBA')
+
+def stub_generate_animation(num_frames: int = 16, width: int = 512, seed: Optional[int] = None, **kwargs) -> List[Image.Image]:
+    return make_frames(num_frames, width, seed=seed or 0)
+
+@contextlib.contextmanager
+def backend_patches(
+    backend: str,
+    source_bytes: Optional[bytes] = None,
+    generate: Callable[..., List[Image.Image]] = stub_generate_animation
+) -> Iterator[None]:
+    """
+    Serves `source_bytes` in place of every download (downloads are real when None) and,
+    for the stub backend, replaces the models, generating frames with `generate`.
+    """
+    from pipeline import animator, background_remover, pose_extractor
+    from utils import image_utils
+
+    with contextlib.ExitStack() as stack:
+        if source_bytes is not None:
+            stack.enter_context(patch.object(image_utils, "download_image_bytes", lambda url: source_bytes))
+        if backend == "stub":
+            stack.enter_context(patch.object(background_remover, "remove_background_image", stub_remove_background))
+            stack.enter_context(patch.object(pose_extractor, "extract_pose_from_array", lambda image, **kwargs: stub_landmarks()))
+            stack.enter_context(patch.object(pose_extractor, "extract_poses", lambda images, **kwargs: [stub_landmarks() for _ in images]))
+            stack.enter_context(patch.object(animator, "generate_animation", generate))
+        yield
+
+def check_real_backend() -> Optional[str]:
+    """Returns why the real backend cannot run offline, or None if the weights are cached."""
+    from huggingface_hub import try_to_load_from_cache
+    from pipeline import animator
+
+    for repo_id, filename in ((animator.DEFAULT_MODEL_ID, "model_index.json"),
+                              (animator.DEFAULT_MOTION_ADAPTER_ID, "config.json")):
+        if not isinstance(try_to_load_from_cache(repo_id, filename), str):
+            return f"{repo_id} is not in the local Hugging Face cache."
+    return None
+
+# --- Measurement ---
+
+def _rss_bytes() -> int:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+class PeakMemory:
+    """Samples the process's resident set size in the background and records the peak."""
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.baseline_rss = 0
+        self.peak_rss = 0
+        self.peak_gpu: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "PeakMemory":
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+        self.baseline_rss = self.peak_rss = _rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, _rss_bytes())
+
+    def __exit__(self, *exc_info) -> None:
+        import torch
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, _rss_bytes())
+        if torch.cuda.is_available():
+            self.peak_gpu = torch.cuda.max_memory_allocated()
+
+    def describe(self) -> Dict[str, Optional[int]]:
+        return {
+            "peak_rss_bytes": self.peak_rss,
+            "rss_growth_bytes": self.peak_rss - self.baseline_rss,
+            "peak_gpu_bytes": self.peak_gpu,
+        }
+
+def summarize_latencies(seconds: List[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds) * 1000
+    return {
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p90": round(float(np.percentile(ms, 90)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "mean": round(float(ms.mean()), 3),
+        "min": round(float(ms.min()), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+def measure(fn: Callable[[], Any], repeats: int, warmup: int) -> Dict[str, Any]:
+    """Runs `fn` `warmup` times untimed, then `repeats` times timed under a memory sampler."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    with PeakMemory() as memory:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    return {"latencies": timings, "memory": memory.describe()}
+
+# --- Benchmarks ---
+
+def make_case(name: str, size: int, num_frames: int, args: argparse.Namespace, work_dir: Path):
+    """
+    Builds the function timed for one benchmark and the number of units (frames,
+    images or jobs) it processes per call, which throughput is reported in.
+    """
+    from main import InferenceTask, InferenceTaskParams, process_full_pipeline
+    from pipeline import animator, background_remover, hitbox_generator, hurtbox_generator, pose_extractor
+    from utils import atlas, encoder, image_utils
+
+    source = image_utils.load_image(make_source_image(size))
+    frames = make_frames(num_frames, size)
+    generation = {"num_inference_steps": args.steps, "guidance_scale": args.guidance_scale}
+
+    if name == "background":
+        return lambda: background_remover.remove_background_image(source), 1, "images"
+    if name == "pose":
+        no_bg = background_remover.remove_background_image(source)
+        return lambda: pose_extractor.extract_pose_from_array(no_bg), 1, "images"
+    if name == "generate":
+        return lambda: animator.generate_animation(
+            motion_prompt="walking", character_prompt="a 2D knight sprite",
+            num_frames=num_frames, height=size, width=size, seed=0, **generation
+        ), num_frames, "frames"
+    if name == "hitboxes":
+        return lambda: hitbox_generator.generate_hitboxes_for_animation(frames), num_frames, "frames"
+    if name == "hurtboxes":
+        return lambda: hurtbox_generator.generate_hurtboxes_for_animation(
+            frames, pose_extractor.extract_poses(frames)
+        ), num_frames, "frames"
+    if name == "sprite_sheet":
+        return lambda: encoder.encode_to_bytes(
+            image_utils.create_sprite_sheet(frames, columns=4), args.image_format, args.preset
+        ), num_frames, "frames"
+    if name == "atlas":
+        return lambda: atlas.build_atlas(frames), num_frames, "frames"
+    if name == "pipeline":
+        params = InferenceTaskParams(
+            num_frames=num_frames, width=size, height=size, seed=0,
+            image_format=args.image_format, encode_preset=args.preset, **generation
+        )
+        counter = iter(range(1_000_000))
+
+        def run_job():
+            task = InferenceTask(job_id=f"bench-{size}-{num_frames}-{next(counter)}",
+                                 source_image_url="http://benchmark.invalid/source.png", params=params)
+            process_full_pipeline(task, temp_base_dir=work_dir / "temp", output_base_dir=work_dir / "outputs")
+        return run_job, 1, "jobs"
+    raise ValueError(f"Unknown benchmark '{name}'.")
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    import torch
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="spriteshift-bench-") as tmp:
+        for size in args.sizes:
+            with backend_patches(args.backend, make_source_image(size)):
+                for num_frames in args.frames:
+                    for name in args.benchmarks:
+                        # Per-image benchmarks do not depend on the frame count.
+                        if name in ("background", "pose") and num_frames != args.frames[0]:
+                            continue
+                        entry: Dict[str, Any] = {"benchmark": name, "size": size, "frames": num_frames}
+                        try:
+                            fn, units, unit_name = make_case(name, size, num_frames, args, Path(tmp))
+                            measured = measure(fn, args.repeats, args.warmup)
+                        except Exception as e:
+                            entry["error"] = f"{type(e).__name__}: {e}"
+                            results.append(entry)
+                            continue
+                        latencies = measured["latencies"]
+                        entry["latency_ms"] = summarize_latencies(latencies)
+                        entry["throughput"] = {
+                            "unit": unit_name,
+                            "per_second": round(units * len(latencies) / sum(latencies), 3),
+                        }
+                        entry["memory"] = measured["memory"]
+                        results.append(entry)
+
+    from main import stage_executor
+    from utils import encoder
+    stage_executor.shutdown()
+    encoder.shutdown()
+    return {
+        "backend": args.backend,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "repeats": args.repeats, "warmup": args.warmup, "steps": args.steps,
+            "guidance_scale": args.guidance_scale, "image_format": args.image_format, "preset": args.preset,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "torch": torch.__version__,
+            "torch_threads": torch.get_num_threads(),
+            "cuda_device": torch.cuda.get_device_name(0) if torch.cuda.is_available() else None,
+        },
+        "results": results,
+    }
+
+# --- Reporting ---
+
+def _result_key(entry: Dict[str, Any]) -> tuple:
+    return entry["benchmark"], entry["size"], entry["frames"]
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[Dict[str, Any]]:
+    """
+    Compares median latencies with a baseline report.
+
+    Returns:
+        One row per benchmark present in both reports with the p50 change in percent,
+        flagged as a regression when it is slower by more than `max_regression` percent.
+    """
+    baseline_results = {_result_key(e): e for e in baseline["results"] if "latency_ms" in e}
+    rows = []
+    for entry in report["results"]:
+        before = baseline_results.get(_result_key(entry))
+        if before is None or "latency_ms" not in entry:
+            continue
+        old, new = before["latency_ms"]["p50"], entry["latency_ms"]["p50"]
+        change = (new - old) / old * 100 if old else 0.0
+        rows.append({
+            "benchmark": entry["benchmark"], "size": entry["size"], "frames": entry["frames"],
+            "baseline_p50_ms": old, "p50_ms": new, "change_percent": round(change, 1),
+            "regression": change > max_regression,
+        })
+    return rows
+
+def print_table(report: Dict[str, Any]) -> None:
+    print(f"Backend: {report['backend']}  ({report['environment']['platform']}, "
+          f"{report['environment']['torch_threads']} torch threads, GPU: {report['environment']['cuda_device']})")
+    print(f"{'benchmark':>12} {'size':>5} {'frames':>6} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} "
+          f"{'throughput':>16} {'peak RSS MB':>12}")
+    for r in report["results"]:
+        if "error" in r:
+            print(f"{r['benchmark']:>12} {r['size']:>5} {r['frames']:>6}  error: {r['error']}")
+            continue
+        latency, throughput = r["latency_ms"], r["throughput"]
+        rate = f"{throughput['per_second']:.1f} {throughput['unit']}/s"
+        print(f"{r['benchmark']:>12} {r['size']:>5} {r['frames']:>6} {latency['p50']:>10.1f} {latency['p90']:>10.1f} "
+              f"{latency['p99']:>10.1f} {rate:>16} {r['memory']['peak_rss_bytes'] / 1024**2:>12.0f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, default="stub")
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 512])
+    parser.add_argument("--frames", type=int, nargs="+", default=[8, 16])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=25, help="Denoising steps for the real backend.")
+    parser.add_argument("--guidance-scale", type=float, default=7.5)
+    parser.add_argument("--image-format", default="png")
+    parser.add_argument("--preset", default="fast")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file.")
+    parser.add_argument("--compare", type=Path, help="A previous JSON report to compare median latencies with.")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="With --compare, exit with status 1 if any p50 is this many percent slower.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON instead of a table.")
+    args = parser.parse_args()
+
+    if args.backend == "real":
+        # Never download weights mid-benchmark; fail fast if they are not cached.
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        problem = check_real_backend()
+        if problem:
+            sys.exit(f"The real backend needs locally cached weights: {problem}")
+
+    report = run_suite(args)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(report)
+
+    if args.compare:
+        rows = compare(report, json.loads(args.compare.read_text()), args.max_regression)
+        print(f"\nCompared with {args.compare}:")
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['benchmark']:>12} {row['size']:>5} {row['frames']:>6} {row['baseline_p50_ms']:>10.1f} -> "
+                  f"{row['p50_ms']:>10.1f} ms ({row['change_percent']:+.1f}%){flag}")
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,27 @@
 import logging
 import json
+import os
+import random
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from typing import Callable, Dict, Iterator, List, Literal, Optional, Tuple
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 import uuid
+from PIL import Image
 
 # Import pipeline modules
-from pipeline import background_remover, pose_extractor, animator, hitbox_generator
-from utils import image_utils
+from pipeline import background_remover, pose_extractor, animator, cpu_mode, hurtbox_generator, latent_preview, post_process
+from pipeline.stage_graph import Stage, StageGraph, StageExecutor, GPU
+from utils import atlas, downloader, encoder, image_utils, metrics
+from utils.batches import BatchRun
+from utils.job_queue import JobQueue, InProcessBroker, QueueFullError, DuplicateJobError, JobStatus, FINISHED_STATUSES
+from utils.result_cache import ResultCache, hash_bytes, make_key
 
 # --- Setup ---
-app = FastAPI(
-    title="SpriteShift AI - Inference Service",
-    description="This service orchestrates the AI pipeline for character animation.",
-    version="0.2.0"
-)
 
 # Configure logging to provide detailed output
 logging.basicConfig(
@@ -28,136 +35,1521 @@ logger = logging.getLogger(__name__)
 BASE_OUTPUT_DIR = Path("./outputs")
 BASE_TEMP_DIR = Path("./temp_processing")
 
+# Load the default AnimateDiff variant into the model registry at startup so that
+# the first job does not pay the model loading cost. Disable for local development.
+PRELOAD_MODELS = os.environ.get("SPRITESHIFT_PRELOAD_MODELS", "1") == "1"
+# CPU execution mode for deployments without a GPU (Dockerfile.cpu enables it): bfloat16
+# where the CPU supports it, channels-last weights, optional torch.compile, explicit
+# thread counts, attention slicing and VAE tiling. Ignored when CUDA is available.
+CPU_OPTIMIZED = os.environ.get("SPRITESHIFT_CPU_OPTIMIZED", "0") == "1"
+CPU_DTYPE = os.environ.get("SPRITESHIFT_CPU_DTYPE", "auto")
+CPU_COMPILE = os.environ.get("SPRITESHIFT_CPU_COMPILE", "0") == "1"
+TORCH_NUM_THREADS = int(os.environ.get("SPRITESHIFT_TORCH_NUM_THREADS", "0"))
+TORCH_INTEROP_THREADS = int(os.environ.get("SPRITESHIFT_TORCH_INTEROP_THREADS", "0"))
+
+# Number of prompt strings whose text-encoder embeddings stay cached on the device.
+PROMPT_CACHE_SIZE = int(os.environ.get("SPRITESHIFT_PROMPT_CACHE_SIZE", "256"))
+
+# Also preload the AnimateDiff-Lightning variant used by the "fast" tier (e.g. "4"); empty to skip.
+PRELOAD_LIGHTNING_STEPS = os.environ.get("SPRITESHIFT_PRELOAD_LIGHTNING_STEPS", "")
+
+# Base models and motion adapters tasks may request (comma-separated Hugging Face ids or
+# local paths). Any other id is rejected with a 422 instead of being downloaded and loaded.
+# The "fast" tier's Lightning adapters are always allowed.
+ALLOWED_MODEL_IDS = [
+    i.strip() for i in os.environ.get("SPRITESHIFT_ALLOWED_MODEL_IDS", animator.DEFAULT_MODEL_ID).split(",") if i.strip()
+]
+ALLOWED_MOTION_ADAPTER_IDS = [
+    i.strip() for i in os.environ.get("SPRITESHIFT_ALLOWED_MOTION_ADAPTER_IDS", animator.DEFAULT_MOTION_ADAPTER_ID).split(",")
+    if i.strip()
+]
+# Most pipeline variants loaded at once, preloaded ones included. Beyond it, the least
+# recently used variant that was not preloaded is unloaded; 0 for no limit.
+MAX_LOADED_MODELS = int(os.environ.get("SPRITESHIFT_MAX_LOADED_MODELS", "2"))
+
+# Device memory the animation models and their generations may use. Idle variants are
+# offloaded to CPU RAM (least recently used first) to stay within it, and generations
+# wait for memory instead of over-committing. 0 uses SPRITESHIFT_GPU_MEMORY_FRACTION of
+# the GPU, leaving the rest to the CUDA context and other libraries. Ignored without a GPU.
+GPU_MEMORY_BUDGET_MB = int(os.environ.get("SPRITESHIFT_GPU_MEMORY_BUDGET_MB", "0"))
+GPU_MEMORY_FRACTION = float(os.environ.get("SPRITESHIFT_GPU_MEMORY_FRACTION", "0.9"))
+
+# Job queue sizing. Each worker drives one job's stage graph at a time; use at least 2
+# so one job's CPU post-processing overlaps the next job's GPU generation.
+NUM_WORKERS = int(os.environ.get("SPRITESHIFT_NUM_WORKERS", "1"))
+MAX_QUEUE_SIZE = int(os.environ.get("SPRITESHIFT_MAX_QUEUE_SIZE", "64"))
+
+# Multi-motion jobs generate at most this many motions in one batched pipeline call;
+# bounded because GPU memory grows with the batch.
+MAX_MOTIONS_PER_BATCH = int(os.environ.get("SPRITESHIFT_MAX_MOTIONS_PER_BATCH", "4"))
+
+# Source image downloads share a keep-alive connection pool with at most
+# DOWNLOAD_CONNECTIONS_PER_HOST connections per host. Images over DOWNLOAD_MAX_MB or
+# DOWNLOAD_MAX_PIXELS are rejected as soon as their headers show it. Queued jobs' images
+# are prefetched (up to DOWNLOAD_MAX_PREFETCHED at once) so downloads overlap GPU work.
+DOWNLOAD_MAX_MB = int(os.environ.get("SPRITESHIFT_DOWNLOAD_MAX_MB", "20"))
+DOWNLOAD_MAX_PIXELS = int(os.environ.get("SPRITESHIFT_DOWNLOAD_MAX_PIXELS", str(downloader.DEFAULT_MAX_PIXELS)))
+DOWNLOAD_TIMEOUT_SECONDS = float(os.environ.get("SPRITESHIFT_DOWNLOAD_TIMEOUT_SECONDS", "30"))
+DOWNLOAD_CONNECTIONS_PER_HOST = int(os.environ.get("SPRITESHIFT_DOWNLOAD_CONNECTIONS_PER_HOST", "4"))
+DOWNLOAD_PREFETCH_WORKERS = int(os.environ.get("SPRITESHIFT_DOWNLOAD_PREFETCH_WORKERS", "4"))
+DOWNLOAD_MAX_PREFETCHED = int(os.environ.get("SPRITESHIFT_DOWNLOAD_MAX_PREFETCHED", "16"))
+
+# Bulk submissions (/run-batch): the most tasks per batch, and the most jobs of one batch
+# queued or running at once (0 = twice the number of job workers), so the queue keeps
+# room for interactive jobs while a roster is rendered.
+MAX_BATCH_TASKS = int(os.environ.get("SPRITESHIFT_MAX_BATCH_TASKS", "500"))
+BATCH_MAX_IN_FLIGHT = int(os.environ.get("SPRITESHIFT_BATCH_MAX_IN_FLIGHT", "0"))
+
+# Preview renders (params.preview): a quick look at a motion before paying for the full
+# render. The longer side is scaled down to PREVIEW_SIZE pixels, and at most
+# PREVIEW_MAX_FRAMES frames are generated in at most PREVIEW_STEPS denoising steps.
+PREVIEW_SIZE = int(os.environ.get("SPRITESHIFT_PREVIEW_SIZE", "256"))
+PREVIEW_MAX_FRAMES = int(os.environ.get("SPRITESHIFT_PREVIEW_MAX_FRAMES", "8"))
+PREVIEW_STEPS = int(os.environ.get("SPRITESHIFT_PREVIEW_STEPS", "10"))
+
+# Cross-request micro-batching of generations. A batch size of 1 disables batching;
+# batching only has concurrent jobs to combine when NUM_WORKERS is greater than 1.
+MAX_GENERATION_BATCH_SIZE = int(os.environ.get("SPRITESHIFT_MAX_GENERATION_BATCH_SIZE", "1"))
+GENERATION_BATCH_WAIT_MS = float(os.environ.get("SPRITESHIFT_GENERATION_BATCH_WAIT_MS", "50"))
+
+# Background removal. One rembg session is pooled per job worker; lighter models such
+# as "u2netp" trade some mask quality for speed. Thread counts of 0 let onnxruntime decide.
+REMBG_MODEL = os.environ.get("SPRITESHIFT_REMBG_MODEL", background_remover.DEFAULT_MODEL)
+ORT_INTRA_OP_THREADS = int(os.environ.get("SPRITESHIFT_ORT_INTRA_OP_THREADS", "0"))
+ORT_INTER_OP_THREADS = int(os.environ.get("SPRITESHIFT_ORT_INTER_OP_THREADS", "0"))
+
+# Write every job's intermediate artifacts to BASE_TEMP_DIR for debugging. Off in production,
+# where stages hand their outputs to each other in memory.
+PERSIST_INTERMEDIATES = os.environ.get("SPRITESHIFT_PERSIST_INTERMEDIATES", "0") == "1"
+
+# Content-addressed cache of stage outputs, so resubmitted images return without recomputation.
+CACHE_ENABLED = os.environ.get("SPRITESHIFT_CACHE_ENABLED", "1") == "1"
+CACHE_DIR = Path(os.environ.get("SPRITESHIFT_CACHE_DIR", "./cache"))
+CACHE_MAX_MB = int(os.environ.get("SPRITESHIFT_CACHE_MAX_MB", "2048"))
+
+# Stage scheduling. Stages of every job share these pools: GPU stages run on their own
+# small pool (sized to the generation batch so batched jobs can wait together) while
+# CPU stages of other jobs proceed. Timeouts are per stage, counted from its start.
+CPU_STAGE_WORKERS = int(os.environ.get("SPRITESHIFT_CPU_STAGE_WORKERS", str(min(8, os.cpu_count() or 1))))
+GPU_STAGE_WORKERS = int(os.environ.get("SPRITESHIFT_GPU_STAGE_WORKERS", str(MAX_GENERATION_BATCH_SIZE)))
+CPU_STAGE_TIMEOUT_SECONDS = float(os.environ.get("SPRITESHIFT_CPU_STAGE_TIMEOUT_SECONDS", "120"))
+GENERATION_TIMEOUT_SECONDS = float(os.environ.get("SPRITESHIFT_GENERATION_TIMEOUT_SECONDS", "900"))
+
+# Pose extraction. 0 (lite) and 1 (full) are much faster than 2 (heavy); tasks may override.
+POSE_MODEL_COMPLEXITY = int(os.environ.get("SPRITESHIFT_POSE_MODEL_COMPLEXITY", str(pose_extractor.DEFAULT_MODEL_COMPLEXITY)))
+# Texture atlas output (sheet_layout="atlas"): the largest page side and the transparent
+# gutter kept between packed sprites.
+ATLAS_MAX_PAGE_SIZE = int(os.environ.get("SPRITESHIFT_ATLAS_MAX_PAGE_SIZE", str(atlas.DEFAULT_MAX_PAGE_SIZE)))
+ATLAS_PADDING = int(os.environ.get("SPRITESHIFT_ATLAS_PADDING", str(atlas.DEFAULT_PADDING)))
+
+# Final asset encoding. "fast" favours job latency, "small" favours CDN egress; tasks may
+# override the preset. Atlas pages are encoded in parallel on the encoder pool.
+ENCODE_PRESET = os.environ.get("SPRITESHIFT_ENCODE_PRESET", encoder.DEFAULT_PRESET)
+ENCODER_WORKERS = int(os.environ.get("SPRITESHIFT_ENCODER_WORKERS", "2"))
+# Processes for CPU-bound post-processing (hitboxes, grid sheet assembly and encoding), so
+# contour tracing and palette quantisation of one job do not hold the GIL against the
+# stages of others. Frames reach the workers through shared memory. 0 runs them in-thread.
+CPU_PROCESS_WORKERS = int(os.environ.get("SPRITESHIFT_CPU_PROCESS_WORKERS", "0"))
+
+# Pose model used on every generated frame for per-limb hurtboxes. The lite model keeps
+# a 16-frame job well under a second on CPU.
+HURTBOX_POSE_MODEL_COMPLEXITY = int(os.environ.get("SPRITESHIFT_HURTBOX_POSE_MODEL_COMPLEXITY", "0"))
+
+# Streaming job events (GET /api/job/{id}/events): a low-resolution preview of the frames
+# is decoded from the latents every N denoising steps (0 disables previews), and idle
+# streams get a keep-alive comment this often.
+PREVIEW_EVERY_N_STEPS = int(os.environ.get("SPRITESHIFT_PREVIEW_EVERY_N_STEPS", "5"))
+EVENT_STREAM_HEARTBEAT_SECONDS = float(os.environ.get("SPRITESHIFT_EVENT_STREAM_HEARTBEAT_SECONDS", "15"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Loads resident models and starts the job workers on startup; tears both down on shutdown."""
+    global result_cache
+    cpu_mode.configure(cpu_mode.CpuOptions(
+        enabled=CPU_OPTIMIZED,
+        dtype=CPU_DTYPE,
+        compile=CPU_COMPILE,
+        num_threads=TORCH_NUM_THREADS,
+        interop_threads=TORCH_INTEROP_THREADS,
+    ))
+    if CACHE_ENABLED:
+        result_cache = ResultCache(CACHE_DIR, max_bytes=CACHE_MAX_MB * 1024**2)
+    background_remover.configure(
+        model_name=REMBG_MODEL,
+        pool_size=NUM_WORKERS,
+        intra_op_threads=ORT_INTRA_OP_THREADS,
+        inter_op_threads=ORT_INTER_OP_THREADS
+    )
+    pose_extractor.configure(pool_size=NUM_WORKERS, model_complexity=POSE_MODEL_COMPLEXITY)
+    encoder.configure(max_workers=ENCODER_WORKERS)
+    post_process.configure(max_workers=CPU_PROCESS_WORKERS)
+    downloader.configure(
+        max_bytes=DOWNLOAD_MAX_MB * 1024**2,
+        max_pixels=DOWNLOAD_MAX_PIXELS,
+        timeout=DOWNLOAD_TIMEOUT_SECONDS,
+        connections_per_host=DOWNLOAD_CONNECTIONS_PER_HOST,
+        prefetch_workers=DOWNLOAD_PREFETCH_WORKERS,
+        max_prefetched=DOWNLOAD_MAX_PREFETCHED
+    )
+    animator.prompt_cache.resize(PROMPT_CACHE_SIZE)
+    budget_bytes = animator.device_memory_budget(GPU_MEMORY_FRACTION)
+    if budget_bytes is not None and GPU_MEMORY_BUDGET_MB > 0:
+        budget_bytes = GPU_MEMORY_BUDGET_MB * 1024**2
+    animator.residency.set_budget(budget_bytes)
+    animator.registry.set_max_models(MAX_LOADED_MODELS if MAX_LOADED_MODELS > 0 else None)
+    if PRELOAD_MODELS:
+        logger.info("Preloading the default animation, background removal and pose models...")
+        animator.preload_animator()
+        if PRELOAD_LIGHTNING_STEPS:
+            animator.preload_animator(motion_adapter_id=animator.lightning_adapter_id(int(PRELOAD_LIGHTNING_STEPS)))
+        background_remover.get_session_pool().warm_up()
+        pose_extractor.get_pose_pool().warm_up()
+    if MAX_GENERATION_BATCH_SIZE > 1:
+        animator.enable_batching(
+            max_batch_size=MAX_GENERATION_BATCH_SIZE,
+            max_wait_seconds=GENERATION_BATCH_WAIT_MS / 1000
+        )
+    job_queue.start()
+    yield
+    with batch_runs_lock:
+        for run in batch_runs.values():
+            run.cancel()
+    job_queue.stop()
+    animator.disable_batching()
+    pose_extractor.close_pools()
+    stage_executor.shutdown()
+    encoder.shutdown()
+    post_process.shutdown()
+    downloader.shutdown()
+    animator.registry.clear()
+    animator.prompt_cache.clear()
+
+app = FastAPI(
+    title="SpriteShift AI - Inference Service",
+    description="This service orchestrates the AI pipeline for character animation.",
+    version="0.2.0",
+    lifespan=lifespan
+)
+
 # --- Pydantic Models for API requests ---
 class InferenceTaskParams(BaseModel):
+    # Allow the `model_id` field despite pydantic reserving the `model_` prefix.
+    model_config = ConfigDict(protected_namespaces=())
+
     motion_prompt: str = "idle"
     character_prompt: str = "a 2D character sprite"
     num_frames: int = 16
     num_columns_sprite_sheet: int = 4
+    width: int = 512
+    height: int = 512
+    num_inference_steps: int = 25
+    guidance_scale: float = 7.5
+    # MediaPipe pose model: 0 (lite), 1 (full) or 2 (heavy); None uses SPRITESHIFT_POSE_MODEL_COMPLEXITY.
+    pose_model_complexity: Optional[Literal[0, 1, 2]] = None
+    # Pixels with alpha above this threshold count as part of the character.
+    hitbox_alpha_threshold: int = 0
+    # Also emit every significant region and per-frame stats alongside the main hitbox.
+    hitbox_regions: bool = False
+    # "limbs" also runs pose estimation on every frame and adds per-body-part hurtboxes.
+    hitbox_mode: Literal["bounding", "limbs"] = "bounding"
+    # "grid" pastes full frames into a uniform grid; "atlas" trims, deduplicates and packs
+    # them into power-of-two pages, with per-frame sprite offsets in the metadata.
+    sheet_layout: Literal["grid", "atlas"] = "grid"
+    # Sprite sheet encoding: PNG, lossless WebP or 256-colour palette PNG. The preset
+    # ("fast", "balanced", "small") defaults to the server's SPRITESHIFT_ENCODE_PRESET.
+    image_format: Literal["png", "webp", "png8"] = "png"
+    encode_preset: Optional[Literal["fast", "balanced", "small"]] = None
+    seed: Optional[int] = None
+    # Debug only: write 00_source.png ... 03_animation.gif to the job's temp directory.
+    persist_intermediates: bool = False
+    model_id: str = animator.DEFAULT_MODEL_ID
+    motion_adapter_id: str = animator.DEFAULT_MOTION_ADAPTER_ID
+    # "fast" swaps the motion adapter for AnimateDiff-Lightning sampled in `lightning_steps`
+    # steps without guidance; num_inference_steps, guidance_scale and motion_adapter_id are
+    # then ignored. "quality" is the full AnimateDiff pipeline.
+    generation_tier: Literal["quality", "fast"] = "quality"
+    lightning_steps: Literal[1, 2, 4, 8] = animator.DEFAULT_LIGHTNING_STEPS
+    # Add a per-step timing breakdown (and the queue wait) to the job result.
+    include_timings: bool = False
+    # Render a small animated preview (see the PREVIEW_* settings) instead of the full
+    # assets: no pose, hitboxes or sprite sheet. POST /api/job/{job_id}/promote then
+    # queues the full render with the preview's seed.
+    preview: bool = False
+    preview_format: Literal["webp", "gif"] = "webp"
+
+    @field_validator("model_id")
+    @classmethod
+    def _allowed_model(cls, model_id: str) -> str:
+        if model_id not in ALLOWED_MODEL_IDS:
+            raise ValueError(f"Model {model_id!r} is not enabled on this server; allowed: {', '.join(ALLOWED_MODEL_IDS)}.")
+        return model_id
+
+    @field_validator("motion_adapter_id")
+    @classmethod
+    def _allowed_motion_adapter(cls, motion_adapter_id: str) -> str:
+        if motion_adapter_id not in ALLOWED_MOTION_ADAPTER_IDS:
+            raise ValueError(
+                f"Motion adapter {motion_adapter_id!r} is not enabled on this server; "
+                f"allowed: {', '.join(ALLOWED_MOTION_ADAPTER_IDS)}."
+            )
+        return motion_adapter_id
+
+    def generation_settings(self) -> dict:
+        """The motion adapter, step count and guidance scale that the tier resolves to."""
+        if self.generation_tier == "fast":
+            return {
+                "motion_adapter_id": animator.lightning_adapter_id(self.lightning_steps),
+                "num_inference_steps": self.lightning_steps,
+                "guidance_scale": animator.LIGHTNING_GUIDANCE_SCALE,
+            }
+        return {
+            "motion_adapter_id": self.motion_adapter_id,
+            "num_inference_steps": self.num_inference_steps,
+            "guidance_scale": self.guidance_scale,
+        }
+
+    def preview_params(self) -> "InferenceTaskParams":
+        """These parameters scaled down for a preview render: smaller frames, fewer frames and steps."""
+        scale = min(1.0, PREVIEW_SIZE / max(self.width, self.height))
+        return self.model_copy(update={
+            # The VAE works on 8x8 pixel blocks.
+            "width": max(8, int(self.width * scale) // 8 * 8),
+            "height": max(8, int(self.height * scale) // 8 * 8),
+            "num_frames": min(self.num_frames, PREVIEW_MAX_FRAMES),
+            "num_inference_steps": min(self.num_inference_steps, PREVIEW_STEPS),
+        })
+
+# Job and batch ids name directories and files under the output and temp dirs, so
+# only plain file-name characters are accepted.
+ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
 
 class InferenceTask(BaseModel):
-    job_id: str = str(uuid.uuid4())
+    job_id: str = Field(default_factory=lambda: str(uuid.uuid4()), pattern=ID_PATTERN)
     source_image_url: str
     params: InferenceTaskParams = InferenceTaskParams()
 
+# Seconds each frame of an animation is shown for, unless a motion says otherwise.
+DEFAULT_FRAME_DURATION = 0.1
+
+class MotionSpec(BaseModel):
+    # Key of the animation in the metadata's `animations` dictionary, e.g. "idle" or "light_punch".
+    name: str = Field(min_length=1)
+    motion_prompt: str
+    # Defaults to the task's `num_frames`.
+    num_frames: Optional[int] = Field(default=None, gt=0)
+    frame_duration: float = Field(default=DEFAULT_FRAME_DURATION, gt=0)
+
+class MultiMotionTask(BaseModel):
+    """Several motions of one character, generated in a single job into one sheet."""
+    job_id: str = Field(default_factory=lambda: str(uuid.uuid4()), pattern=ID_PATTERN)
+    source_image_url: str
+    motions: List[MotionSpec] = Field(min_length=1)
+    # Shared by every motion; `motion_prompt` and (unless overridden) `num_frames` are per motion.
+    params: InferenceTaskParams = InferenceTaskParams()
+
+    @field_validator("motions")
+    @classmethod
+    def _unique_names(cls, motions: List[MotionSpec]) -> List[MotionSpec]:
+        names = [motion.name for motion in motions]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Motion names must be unique; repeated: {', '.join(duplicates)}.")
+        return motions
+
+    @field_validator("params")
+    @classmethod
+    def _no_preview(cls, params: InferenceTaskParams) -> InferenceTaskParams:
+        if params.preview:
+            raise ValueError("Previews render a single motion; submit each motion to /run-task instead.")
+        return params
+
+class BatchTask(BaseModel):
+    """Many single-motion tasks (e.g. a game's character roster) submitted and tracked together."""
+    # Names the batch's manifest file.
+    batch_id: str = Field(default_factory=lambda: str(uuid.uuid4()), pattern=ID_PATTERN)
+    tasks: List[InferenceTask] = Field(min_length=1, max_length=MAX_BATCH_TASKS)
+
+    @field_validator("tasks")
+    @classmethod
+    def _unique_job_ids(cls, tasks: List[InferenceTask]) -> List[InferenceTask]:
+        job_ids = [task.job_id for task in tasks]
+        duplicates = sorted({job_id for job_id in job_ids if job_ids.count(job_id) > 1})
+        if duplicates:
+            raise ValueError(f"Job ids must be unique within a batch; repeated: {', '.join(duplicates)}.")
+        return tasks
+
 # --- Main Processing Logic ---
-def process_full_pipeline(task: InferenceTask, temp_base_dir: Path, output_base_dir: Path):
+ProgressCallback = Callable[[str, int], None]
+# Receives structured job events: an event name ("stage", "step", "preview") and its payload.
+EventCallback = Callable[[str, dict], None]
+
+# The process-wide result cache, created in the app lifespan when caching is enabled.
+result_cache: Optional[ResultCache] = None
+
+stage_executor = StageExecutor(cpu_workers=CPU_STAGE_WORKERS, gpu_workers=GPU_STAGE_WORKERS)
+
+def process_full_pipeline(
+    task: InferenceTask,
+    temp_base_dir: Path,
+    output_base_dir: Path,
+    progress: Optional[ProgressCallback] = None,
+    cache: Optional[ResultCache] = None,
+    executor: Optional[StageExecutor] = None,
+    events: Optional[EventCallback] = None
+):
     """
     Orchestrates the full AI pipeline for a single inference task,
     from downloading an image to generating the final assets.
 
+    Stages hand images and arrays to each other in memory. Intermediate artifacts
+    are only written to the job's temp directory when the task asks for them.
+
     Args:
         task: The inference task details.
-        temp_base_dir: The base directory for temporary processing files.
+        temp_base_dir: The base directory for intermediate debug artifacts.
         output_base_dir: The base directory for final output assets.
+        progress: Optional callback receiving a stage message and overall percent complete.
+        cache: Optional result cache consulted for the final assets and for each stage.
+        executor: The stage pools to run on; defaults to the process-wide executor.
+        events: Optional callback receiving stage completions, denoising steps and latent previews.
     """
     job_id = task.job_id
+    params = task.params
     logger.info(f"--- Starting processing for job_id: {job_id} ---")
 
     # 1. Create dedicated working directories for this job to keep files organized.
+    with _pipeline_job(job_id, params, temp_base_dir, output_base_dir, progress, events) as job:
+        trace, report, emit = job.trace, job.report, job.emit
+        job_temp_dir, job_output_dir, persist_intermediates = job.temp_dir, job.output_dir, job.persist_intermediates
+
+        # 2. Download the user-provided source image straight into memory.
+        report("Downloading source image.", 5)
+        with trace.span("download"):
+            source_bytes = _download_source(task, job_temp_dir, persist_intermediates)
+
+        # Every cache key is derived from the content of the source image, so the same
+        # picture served from a different URL still hits the cache.
+        image_hash = hash_bytes(source_bytes)
+        generation = params.generation_settings()
+        frames_key = _frames_key(image_hash, params, params.motion_prompt, params.num_frames)
+        encode_preset = params.encode_preset or ENCODE_PRESET
+        assets_key = _assets_key(frames_key, params, encode_preset)
+        metadata_path = job_output_dir / "character_anim.json"
+        output_cache = _output_cache(cache, params)
+
+        cached_assets = output_cache.get_files(assets_key) if output_cache is not None else None
+        if cached_assets is not None:
+            return _record_job(_serve_cached_assets(task, cached_assets, job_output_dir, encode_preset), trace, params)
+
+        # 3-8. Run the remaining stages as a dependency graph. Background removal and
+        #      pose extraction run on the CPU pool while generation runs on the GPU pool;
+        #      hitboxes and the sprite sheet are built concurrently once frames exist.
+
+        # Generation is the most compute-intensive step.
+        def generate(inputs):
+            report("Generating animation frames.", 25)
+            animation_frames = output_cache.get_frames(frames_key) if output_cache is not None else None
+            if animation_frames is None:
+                animation_frames = animator.generate_animation(
+                    motion_prompt=params.motion_prompt,
+                    character_prompt=params.character_prompt,
+                    output_path=job_temp_dir / "03_animation.gif" if persist_intermediates else None,
+                    num_frames=params.num_frames,
+                    model_id=params.model_id,
+                    **generation,
+                    height=params.height,
+                    width=params.width,
+                    seed=params.seed,
+                    on_step=_step_reporter(emit) if events is not None else None,
+                )
+                if not animation_frames:
+                    raise RuntimeError("Animation generation failed to produce any frames.")
+                if output_cache is not None:
+                    output_cache.put_frames(frames_key, animation_frames)
+            return animation_frames
+
+        def generate_hitboxes(inputs):
+            report("Generating hitboxes.", 85)
+            return _hitboxes(inputs["generate"], params)
+
+        def generate_hurtboxes(inputs):
+            report("Generating limb hurtboxes.", 85)
+            return _hurtboxes(inputs["generate"], params)
+
+        def assemble_sprite_sheet(inputs):
+            return _assemble_sheets(inputs["generate"], params, job_output_dir, encode_preset, report, trace)
+
+        def write_metadata(inputs):
+            report("Writing animation metadata.", 95)
+            animation_frames = inputs["generate"]
+            metadata = {
+                "job_id": job_id,
+                "source_image_url": task.source_image_url,
+                "animation_properties": _animation_properties(animation_frames, params),
+                "frames": inputs["hitboxes"]
+            }
+            if "hurtboxes" in inputs:
+                for frame, hurtboxes in zip(metadata["frames"], inputs["hurtboxes"]):
+                    frame["hurtboxes"] = hurtboxes
+            _apply_sheet_layout(metadata, params, inputs["sprite_sheet"])
+            with open(metadata_path, 'w') as f:
+                json.dump(metadata, f, indent=4)
+            logger.info(f"Animation metadata saved to {metadata_path}")
+
+        stages = _source_stages(source_bytes, image_hash, params, cache, report, job_temp_dir, persist_intermediates)
+        stages.append(Stage("generate", generate, resource=GPU, timeout=GENERATION_TIMEOUT_SECONDS))
+        stages.extend(_asset_stages(params, generate_hitboxes, generate_hurtboxes, assemble_sprite_sheet, write_metadata))
+        results = StageGraph(stages).run(executor or stage_executor, on_stage_complete=_stage_reporter(emit, trace))
+
+        logger.info(f"--- Successfully finished processing for job_id: {job_id} ---")
+        return _record_job(
+            _completed_result(job_id, job_output_dir, results["sprite_sheet"], output_cache, assets_key), trace, params
+        )
+
+def process_multi_motion_pipeline(
+    task: MultiMotionTask,
+    temp_base_dir: Path,
+    output_base_dir: Path,
+    progress: Optional[ProgressCallback] = None,
+    cache: Optional[ResultCache] = None,
+    executor: Optional[StageExecutor] = None,
+    events: Optional[EventCallback] = None
+):
+    """
+    Generates several animations (idle, walk, punch, ...) of one character in a single job.
+
+    The source image is downloaded, its background removed and its pose extracted once
+    for all motions. The motions are generated together in batched pipeline calls, and
+    every frame goes into one sprite sheet (or atlas) with a metadata file whose
+    `animations` dictionary maps each motion name to its frame indices, durations and
+    hitboxes. Frames are cached per motion under the same keys as single-motion jobs.
+
+    Args:
+        task: The multi-motion task; `task.params.motion_prompt` is ignored.
+        temp_base_dir: The base directory for intermediate debug artifacts.
+        output_base_dir: The base directory for final output assets.
+        progress: Optional callback receiving a stage message and overall percent complete.
+        cache: Optional result cache consulted for the final assets and for each stage.
+        executor: The stage pools to run on; defaults to the process-wide executor.
+        events: Optional callback receiving stage completions, denoising steps and latent previews.
+    """
+    job_id = task.job_id
+    params = task.params
+    motions = task.motions
+    logger.info(f"--- Starting processing for multi-motion job_id: {job_id} ({len(motions)} motions) ---")
+
+    with _pipeline_job(job_id, params, temp_base_dir, output_base_dir, progress, events) as job:
+        trace, report, emit = job.trace, job.report, job.emit
+        job_temp_dir, job_output_dir, persist_intermediates = job.temp_dir, job.output_dir, job.persist_intermediates
+
+        report("Downloading source image.", 5)
+        with trace.span("download"):
+            source_bytes = _download_source(task, job_temp_dir, persist_intermediates)
+
+        image_hash = hash_bytes(source_bytes)
+        generation = params.generation_settings()
+        frames_keys = {
+            motion.name: _frames_key(image_hash, params, motion.motion_prompt, motion.num_frames or params.num_frames)
+            for motion in motions
+        }
+        encode_preset = params.encode_preset or ENCODE_PRESET
+        assets_key = _assets_key(
+            [[motion.name, frames_keys[motion.name], motion.frame_duration] for motion in motions],
+            params,
+            encode_preset
+        )
+        metadata_path = job_output_dir / "character_anim.json"
+        output_cache = _output_cache(cache, params)
+
+        cached_assets = output_cache.get_files(assets_key) if output_cache is not None else None
+        if cached_assets is not None:
+            return _record_job(_serve_cached_assets(task, cached_assets, job_output_dir, encode_preset), trace, params)
+
+        # Motions of the same length share a pipeline shape and are generated in batches.
+        by_length: Dict[int, List[MotionSpec]] = {}
+        for motion in motions:
+            by_length.setdefault(motion.num_frames or params.num_frames, []).append(motion)
+        num_batches = sum(-(-len(group) // MAX_MOTIONS_PER_BATCH) for group in by_length.values())
+
+        def generate(inputs):
+            report("Generating animation frames.", 25)
+            animations: Dict[str, List[Image.Image]] = {}
+            for motion in motions:
+                cached_frames = output_cache.get_frames(frames_keys[motion.name]) if output_cache is not None else None
+                if cached_frames is not None:
+                    animations[motion.name] = cached_frames
+            for num_frames, group in by_length.items():
+                group = [motion for motion in group if motion.name not in animations]
+                if not group:
+                    continue
+                generated = animator.generate_animations(
+                    motion_prompts=[motion.motion_prompt for motion in group],
+                    character_prompt=params.character_prompt,
+                    num_frames=num_frames,
+                    model_id=params.model_id,
+                    **generation,
+                    height=params.height,
+                    width=params.width,
+                    seed=params.seed,
+                    max_batch_size=MAX_MOTIONS_PER_BATCH,
+                    on_steps=[_step_reporter(emit, motion.name) for motion in group] if events is not None else None,
+                )
+                for motion, animation_frames in zip(group, generated):
+                    if not animation_frames:
+                        raise RuntimeError(f"Animation generation failed to produce any frames for '{motion.name}'.")
+                    if output_cache is not None:
+                        output_cache.put_frames(frames_keys[motion.name], animation_frames)
+                    if persist_intermediates:
+                        image_utils.save_gif(animation_frames, job_temp_dir / f"03_animation_{motion.name}.gif")
+                    animations[motion.name] = animation_frames
+            # In the order of the task's motions, which is also their order on the sheet.
+            return {motion.name: animations[motion.name] for motion in motions}
+
+        def all_frames(animations: Dict[str, List[Image.Image]]) -> List[Image.Image]:
+            return [frame for animation_frames in animations.values() for frame in animation_frames]
+
+        def generate_hitboxes(inputs):
+            report("Generating hitboxes.", 85)
+            return _hitboxes(all_frames(inputs["generate"]), params)
+
+        def generate_hurtboxes(inputs):
+            report("Generating limb hurtboxes.", 85)
+            return _hurtboxes(all_frames(inputs["generate"]), params)
+
+        def assemble_sprite_sheet(inputs):
+            return _assemble_sheets(all_frames(inputs["generate"]), params, job_output_dir, encode_preset, report, trace)
+
+        def write_metadata(inputs):
+            report("Writing animation metadata.", 95)
+            animations = inputs["generate"]
+            properties = _animation_properties(all_frames(animations), params)
+            metadata = {
+                "job_id": job_id,
+                "source_image_url": task.source_image_url,
+                "animation_properties": properties,
+                "frames": inputs["hitboxes"]
+            }
+            if "hurtboxes" in inputs:
+                for frame, hurtboxes in zip(metadata["frames"], inputs["hurtboxes"]):
+                    frame["hurtboxes"] = hurtboxes
+            if params.sheet_layout == "grid":
+                # Sprite2D.hframes / vframes of the sheet, as read by CharacterLoader.gd.
+                metadata["h_frames"] = properties["columns"]
+                metadata["v_frames"] = properties["rows"]
+            _apply_sheet_layout(metadata, params, inputs["sprite_sheet"])
+
+            metadata["animations"] = {}
+            start = 0
+            for motion in motions:
+                indices = list(range(start, start + len(animations[motion.name])))
+                metadata["animations"][motion.name] = {
+                    "motion_prompt": motion.motion_prompt,
+                    "frames": indices,
+                    "durations": [motion.frame_duration] * len(indices),
+                    "hitboxes": {str(i): _frame_hitboxes(metadata["frames"][i]) for i in indices},
+                }
+                start += len(indices)
+            with open(metadata_path, 'w') as f:
+                json.dump(metadata, f, indent=4)
+            logger.info(f"Animation metadata saved to {metadata_path}")
+
+        stages = _source_stages(source_bytes, image_hash, params, cache, report, job_temp_dir, persist_intermediates)
+        stages.append(Stage("generate", generate, resource=GPU, timeout=GENERATION_TIMEOUT_SECONDS * num_batches))
+        stages.extend(_asset_stages(params, generate_hitboxes, generate_hurtboxes, assemble_sprite_sheet, write_metadata))
+        results = StageGraph(stages).run(executor or stage_executor, on_stage_complete=_stage_reporter(emit, trace))
+
+        logger.info(f"--- Successfully finished processing for multi-motion job_id: {job_id} ---")
+        return _record_job(
+            _completed_result(job_id, job_output_dir, results["sprite_sheet"], output_cache, assets_key), trace, params
+        )
+
+def process_preview_pipeline(
+    task: InferenceTask,
+    temp_base_dir: Path,
+    output_base_dir: Path,
+    progress: Optional[ProgressCallback] = None,
+    cache: Optional[ResultCache] = None,
+    executor: Optional[StageExecutor] = None,
+    events: Optional[EventCallback] = None
+):
+    """
+    Renders a quick, low-resolution preview of a task's motion as a small animated WebP
+    or GIF: the frames are generated with `InferenceTaskParams.preview_params`, and the
+    pose, hitbox and sprite sheet stages are skipped.
+
+    The background is still removed (on the CPU pool, while the frames generate) so that
+    a promoted full render finds it in the cache. The result carries the seed and the
+    full-render task parameters used by POST /api/job/{job_id}/promote.
+
+    Args:
+        task: The inference task details; `task.params.preview` is expected to be set.
+        temp_base_dir: The base directory for intermediate debug artifacts.
+        output_base_dir: The base directory for final output assets.
+        progress: Optional callback receiving a stage message and overall percent complete.
+        cache: Optional result cache consulted for the preview file and for each stage.
+        executor: The stage pools to run on; defaults to the process-wide executor.
+        events: Optional callback receiving stage completions, denoising steps and latent previews.
+    """
+    job_id = task.job_id
+    # Fix the seed up front so that the full render can reproduce this motion.
+    seed = task.params.seed if task.params.seed is not None else random.randrange(2**32)
+    render_params = task.params.model_copy(update={"preview": False, "seed": seed})
+    params = render_params.preview_params()
+    logger.info(f"--- Starting preview for job_id: {job_id} ({params.width}x{params.height}, {params.num_frames} frames) ---")
+    preview_path = output_base_dir / job_id / f"preview.{task.params.preview_format}"
+
+    def result(cached: bool) -> dict:
+        return {
+            "status": "complete",
+            "job_id": job_id,
+            "cached": cached,
+            "preview": True,
+            "seed": seed,
+            "output_files": {"preview": str(preview_path)},
+            "encoding": {"format": task.params.preview_format, "bytes": preview_path.stat().st_size},
+            "promote_url": f"/api/job/{job_id}/promote",
+            "render": {"source_image_url": task.source_image_url, "params": render_params.model_dump()},
+        }
+
+    with _pipeline_job(job_id, params, temp_base_dir, output_base_dir, progress, events, kind="Preview") as job:
+        trace, report, emit = job.trace, job.report, job.emit
+        job_temp_dir, persist_intermediates = job.temp_dir, job.persist_intermediates
+
+        report("Downloading source image.", 5)
+        with trace.span("download"):
+            source_bytes = _download_source(task, job_temp_dir, persist_intermediates)
+
+        image_hash = hash_bytes(source_bytes)
+        frames_key = _frames_key(image_hash, params, params.motion_prompt, params.num_frames)
+        preview_key = make_key("preview", frames=frames_key, format=task.params.preview_format)
+
+        cached_preview = cache.get_files(preview_key) if cache is not None else None
+        if cached_preview is not None:
+            preview_path.write_bytes(cached_preview[preview_path.name])
+            logger.info(f"--- Served preview for job_id {job_id} from the result cache ---")
+            return _record_job(result(cached=True), trace, params)
+
+        def generate(inputs):
+            report("Generating preview frames.", 25)
+            animation_frames = cache.get_frames(frames_key) if cache is not None else None
+            if animation_frames is None:
+                animation_frames = animator.generate_animation(
+                    motion_prompt=params.motion_prompt,
+                    character_prompt=params.character_prompt,
+                    num_frames=params.num_frames,
+                    model_id=params.model_id,
+                    **params.generation_settings(),
+                    height=params.height,
+                    width=params.width,
+                    seed=seed,
+                    on_step=_step_reporter(emit) if events is not None else None,
+                )
+                if not animation_frames:
+                    raise RuntimeError("Animation generation failed to produce any frames.")
+                if cache is not None:
+                    cache.put_frames(frames_key, animation_frames)
+            return animation_frames
+
+        def encode_preview(inputs):
+            report("Encoding preview.", 90)
+            frame_duration_ms = int(DEFAULT_FRAME_DURATION * 1000)
+            if task.params.preview_format == "webp":
+                image_utils.save_animated_webp(inputs["generate"], preview_path, frame_duration_ms)
+            else:
+                image_utils.save_gif(inputs["generate"], preview_path, frame_duration_ms)
+
+        stages = _source_stages(
+            source_bytes, image_hash, params, cache, report, job_temp_dir, persist_intermediates, include_pose=False
+        )
+        stages += [
+            Stage("generate", generate, resource=GPU, timeout=GENERATION_TIMEOUT_SECONDS),
+            Stage("preview", encode_preview, deps=("generate",), timeout=CPU_STAGE_TIMEOUT_SECONDS),
+        ]
+        StageGraph(stages).run(executor or stage_executor, on_stage_complete=_stage_reporter(emit, trace))
+        if cache is not None:
+            cache.put_files(preview_key, {preview_path.name: preview_path.read_bytes()})
+
+        logger.info(f"--- Successfully finished preview for job_id: {job_id} ---")
+        return _record_job(result(cached=False), trace, params)
+
+# --- Pipeline building blocks shared by full, multi-motion and preview jobs ---
+
+@dataclass
+class _Job:
+    """The per-job scaffolding every pipeline runs inside; see `_pipeline_job`."""
+    trace: metrics.JobTrace
+    report: ProgressCallback
+    emit: EventCallback
+    temp_dir: Path
+    output_dir: Path
+    persist_intermediates: bool
+
+@contextmanager
+def _pipeline_job(
+    job_id: str,
+    params: InferenceTaskParams,
+    temp_base_dir: Path,
+    output_base_dir: Path,
+    progress: Optional[ProgressCallback],
+    events: Optional[EventCallback],
+    kind: str = "Pipeline"
+) -> Iterator[_Job]:
+    """
+    Creates a job's output directory (and temp directory, when intermediates are kept)
+    and yields its timing trace and progress/event callbacks. A job that fails inside
+    the block is counted in the metrics and logged before the error is re-raised to the
+    caller (the job queue, which records it on the job).
+    """
+    trace = metrics.JobTrace()
+
+    def report(message: str, percent: int):
+        if progress is not None:
+            progress(message, percent)
+
+    def emit(event: str, data: dict):
+        if events is not None:
+            events(event, data)
+
+    persist_intermediates = params.persist_intermediates or PERSIST_INTERMEDIATES
     job_temp_dir = temp_base_dir / job_id
     job_output_dir = output_base_dir / job_id
-    job_temp_dir.mkdir(parents=True, exist_ok=True)
     job_output_dir.mkdir(parents=True, exist_ok=True)
+    if persist_intermediates:
+        job_temp_dir.mkdir(parents=True, exist_ok=True)
 
     try:
-        # 2. Download the user-provided source image.
-        source_image_path = job_temp_dir / "00_source.png"
-        if not image_utils.download_image(task.source_image_url, source_image_path):
-            raise RuntimeError(f"Failed to download image from {task.source_image_url}")
-
-        # 3. Remove the background from the image.
-        no_bg_image_path = job_temp_dir / "01_no_bg.png"
-        background_remover.remove_background(source_image_path, no_bg_image_path)
-
-        # 4. Extract pose data. This is for logging/future use, as the current
-        #    AnimateDiff setup does not use it as a direct input.
-        pose_data = pose_extractor.extract_pose(no_bg_image_path)
+        yield _Job(trace, report, emit, job_temp_dir, job_output_dir, persist_intermediates)
+    except Exception as e:
+        metrics.JOBS_TOTAL.inc(outcome="failed")
+        metrics.JOB_SECONDS.observe(trace.elapsed())
+        logger.error(f"!!! {kind} processing failed for job_id {job_id}: {e}", exc_info=True)
+        raise
+
+def _download_source(task, job_temp_dir: Path, persist_intermediates: bool) -> bytes:
+    source_bytes = image_utils.download_image_bytes(task.source_image_url)
+    if source_bytes is None:
+        raise RuntimeError(f"Failed to download image from {task.source_image_url}")
+    if persist_intermediates:
+        (job_temp_dir / "00_source.png").write_bytes(source_bytes)
+    return source_bytes
+
+def _output_cache(cache: Optional[ResultCache], params: InferenceTaskParams) -> Optional[ResultCache]:
+    """
+    The cache for a job's generated frames and final files: None unless the task fixes
+    a seed. Without one every generation is a fresh draw, and a cached result would
+    hand all later unseeded requests the same animation.
+    """
+    return cache if params.seed is not None else None
+
+def _frames_key(image_hash: str, params: InferenceTaskParams, motion_prompt: str, num_frames: int) -> str:
+    """Cache key of the frames generated for one motion of the character in `image_hash`."""
+    return make_key(
+        "frames",
+        image=image_hash,
+        motion_prompt=motion_prompt,
+        character_prompt=params.character_prompt,
+        num_frames=num_frames,
+        model_id=params.model_id,
+        **params.generation_settings(),
+        width=params.width,
+        height=params.height,
+        seed=params.seed,
+    )
+
+def _assets_key(frames, params: InferenceTaskParams, encode_preset: str) -> str:
+    """Cache key of a job's final files, from its frames key(s) and the post-processing parameters."""
+    return make_key(
+        "assets",
+        frames=frames,
+        columns=params.num_columns_sprite_sheet,
+        hitbox_alpha_threshold=params.hitbox_alpha_threshold,
+        hitbox_regions=params.hitbox_regions,
+        hitbox_mode=params.hitbox_mode,
+        sheet_layout=params.sheet_layout,
+        image_format=params.image_format,
+        encode_preset=encode_preset,
+    )
+
+def _serve_cached_assets(task, cached_assets: Dict[str, bytes], job_output_dir: Path, encode_preset: str) -> dict:
+    """Writes a cached job's files into the job directory and returns the job result."""
+    params = task.params
+    metadata_path = job_output_dir / "character_anim.json"
+    metadata = json.loads(cached_assets.pop(metadata_path.name))
+    for name, data in cached_assets.items():
+        (job_output_dir / name).write_bytes(data)
+    metadata["job_id"] = task.job_id
+    metadata["source_image_url"] = task.source_image_url
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f, indent=4)
+    logger.info(f"--- Served job_id {task.job_id} from the result cache ---")
+    return {
+        "status": "complete",
+        "job_id": task.job_id,
+        "cached": True,
+        "output_files": _output_files(job_output_dir, metadata),
+        "encoding": {
+            "format": params.image_format,
+            "preset": encode_preset,
+            "bytes": sum((job_output_dir / name).stat().st_size for name in _sheet_files(metadata)),
+            "encode_seconds": 0.0,
+        }
+    }
+
+def _completed_result(job_id: str, job_output_dir: Path, sheet, cache: Optional[ResultCache], assets_key: str) -> dict:
+    """Caches a finished job's files and returns the job result."""
+    _, encoded = sheet
+    metadata_path = job_output_dir / "character_anim.json"
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    if cache is not None:
+        cache.put_files(assets_key, {
+            name: (job_output_dir / name).read_bytes()
+            for name in _sheet_files(metadata) + [metadata_path.name]
+        })
+    return {
+        "status": "complete",
+        "job_id": job_id,
+        "cached": False,
+        "output_files": _output_files(job_output_dir, metadata),
+        "encoding": encoder.summarize(encoded)
+    }
+
+def _source_stages(
+    source_bytes: bytes,
+    image_hash: str,
+    params: InferenceTaskParams,
+    cache: Optional[ResultCache],
+    report: ProgressCallback,
+    job_temp_dir: Path,
+    persist_intermediates: bool,
+    include_pose: bool = True
+) -> List[Stage]:
+    """The background removal and (unless `include_pose` is False) pose extraction stages for a job's source image."""
+    background_model = background_remover.default_model_name()
+
+    def remove_background(inputs):
+        report("Removing background.", 10)
+        background_key = make_key("background", image=image_hash, model=background_model)
+        no_bg_image = cache.get_image(background_key) if cache is not None else None
+        if no_bg_image is None:
+            no_bg_image = background_remover.remove_background_image(image_utils.load_image(source_bytes))
+            if cache is not None:
+                cache.put_image(background_key, no_bg_image)
+        if persist_intermediates:
+            no_bg_image.save(job_temp_dir / "01_no_bg.png")
+        return no_bg_image
+
+    # Pose data is for logging/future use, as the current AnimateDiff setup
+    # does not use it as a direct input.
+    def extract_pose(inputs):
+        report("Extracting pose.", 20)
+        pose_complexity = params.pose_model_complexity
+        if pose_complexity is None:
+            pose_complexity = pose_extractor.default_model_complexity()
+        pose_key = make_key("pose", image=image_hash, background_model=background_model, complexity=pose_complexity)
+        cached_pose = cache.get_json(pose_key) if cache is not None else None
+        if cached_pose is not None:
+            pose_data = cached_pose["landmarks"]
+        else:
+            pose_data = pose_extractor.extract_pose_from_array(inputs["background"], model_complexity=pose_complexity)
+            if cache is not None:
+                # Wrapped so that "no pose detected" is cached too.
+                cache.put_json(pose_key, {"landmarks": pose_data})
         if pose_data:
-            pose_data_path = job_temp_dir / "02_pose_data.json"
-            with open(pose_data_path, 'w') as f:
-                json.dump(pose_data, f, indent=4)
-            logger.info(f"Pose data extracted and saved to {pose_data_path}")
+            logger.info(f"Pose data extracted ({len(pose_data)} landmarks).")
+            if persist_intermediates:
+                with open(job_temp_dir / "02_pose_data.json", 'w') as f:
+                    json.dump(pose_data, f, indent=4)
         else:
             logger.warning("Pose extraction did not return any data for this image.")
+        return pose_data
 
-        # 5. Generate the animation frames. This is the most compute-intensive step.
-        animation_gif_path = job_temp_dir / "03_animation.gif"
-        animation_frames = animator.generate_animation(
-            motion_prompt=task.params.motion_prompt,
-            character_prompt=task.params.character_prompt,
-            output_path=animation_gif_path,
-            num_frames=task.params.num_frames,
-        )
-        if not animation_frames:
-            raise RuntimeError("Animation generation failed to produce any frames.")
+    stages = [Stage("background", remove_background, timeout=CPU_STAGE_TIMEOUT_SECONDS)]
+    if include_pose:
+        stages.append(Stage("pose", extract_pose, deps=("background",), timeout=CPU_STAGE_TIMEOUT_SECONDS))
+    return stages
+
+def _asset_stages(params: InferenceTaskParams, hitboxes, hurtboxes, sprite_sheet, metadata) -> List[Stage]:
+    """The stages that turn the "generate" stage's output into the job's final files."""
+    metadata_deps = ("generate", "hitboxes", "sprite_sheet")
+    stages = [
+        Stage("hitboxes", hitboxes, deps=("generate",), timeout=CPU_STAGE_TIMEOUT_SECONDS),
+        Stage("sprite_sheet", sprite_sheet, deps=("generate",), timeout=CPU_STAGE_TIMEOUT_SECONDS),
+    ]
+    if params.hitbox_mode == "limbs":
+        stages.append(Stage("hurtboxes", hurtboxes, deps=("generate",), timeout=CPU_STAGE_TIMEOUT_SECONDS))
+        metadata_deps += ("hurtboxes",)
+    stages.append(Stage("metadata", metadata, deps=metadata_deps, timeout=CPU_STAGE_TIMEOUT_SECONDS))
+    return stages
+
+def _stage_reporter(emit: EventCallback, trace: metrics.JobTrace) -> Callable[[str, float], None]:
+    """Records stage completions as timing spans and "stage" events."""
+    def on_stage_complete(stage: str, seconds: float):
+        trace.add(stage, seconds)
+        emit("stage", {"stage": stage, "seconds": round(seconds, 3)})
+    return on_stage_complete
+
+def _record_job(result: dict, trace: metrics.JobTrace, params: InferenceTaskParams) -> dict:
+    """Counts a finished job in the metrics and adds its timing breakdown when asked for."""
+    metrics.JOBS_TOTAL.inc(outcome="cached" if result["cached"] else "complete")
+    metrics.JOB_SECONDS.observe(trace.elapsed())
+    if params.include_timings:
+        result["timings"] = trace.describe()
+    return result
+
+def _step_reporter(emit: EventCallback, animation: Optional[str] = None) -> animator.StepCallback:
+    """
+    Turns denoising steps into "step" events and, every PREVIEW_EVERY_N_STEPS steps and
+    on the last one, into "preview" events carrying frames decoded from the latents.
+    """
+    labels = {"animation": animation} if animation is not None else {}
+
+    def on_step(step: int, total_steps: int, latents):
+        emit("step", {"step": step, "total_steps": total_steps, **labels})
+        if PREVIEW_EVERY_N_STEPS > 0 and (step % PREVIEW_EVERY_N_STEPS == 0 or step == total_steps):
+            emit("preview", {**latent_preview.preview_event(latents, step, total_steps), **labels})
+    return on_step
 
-        # 6. Generate hitboxes for each frame of the animation.
-        hitboxes = hitbox_generator.generate_hitboxes_for_animation(animation_frames)
+def _hitboxes(frames: List[Image.Image], params: InferenceTaskParams) -> List[dict]:
+    return post_process.generate_hitboxes(
+        frames,
+        alpha_threshold=params.hitbox_alpha_threshold,
+        include_regions=params.hitbox_regions
+    )
 
-        # 7. Create the final sprite sheet from all generated frames.
-        sprite_sheet_path = job_output_dir / "character_sprites.png"
-        sprite_sheet = image_utils.create_sprite_sheet(
-            animation_frames, columns=task.params.num_columns_sprite_sheet
+def _hurtboxes(frames: List[Image.Image], params: InferenceTaskParams) -> List[dict]:
+    poses = pose_extractor.extract_poses(frames, model_complexity=HURTBOX_POSE_MODEL_COMPLEXITY)
+    return hurtbox_generator.generate_hurtboxes_for_animation(
+        frames, poses, alpha_threshold=params.hitbox_alpha_threshold
+    )
+
+def _assemble_sheets(
+    frames: List[Image.Image],
+    params: InferenceTaskParams,
+    job_output_dir: Path,
+    encode_preset: str,
+    report: ProgressCallback,
+    trace: metrics.JobTrace
+) -> Tuple[Optional[atlas.Atlas], List[encoder.EncodedFile]]:
+    """Lays the frames out as a grid sheet or atlas pages and encodes them into the job directory."""
+    packed = None
+    sheet_extension = encoder.file_extension(params.image_format)
+    if params.sheet_layout == "atlas":
+        report("Packing texture atlas.", 90)
+        packed = atlas.build_atlas(
+            frames,
+            padding=ATLAS_PADDING,
+            max_page_size=ATLAS_MAX_PAGE_SIZE,
+            alpha_threshold=params.hitbox_alpha_threshold
         )
-        sprite_sheet.save(sprite_sheet_path)
-        logger.info(f"Final sprite sheet saved to {sprite_sheet_path}")
+        with trace.span("encode"):
+            encoded = encoder.encode_images(
+                [(page, job_output_dir / _sheet_page_name(i, sheet_extension)) for i, page in enumerate(packed.pages)],
+                fmt=params.image_format,
+                preset=encode_preset
+            )
+    else:
+        report("Assembling sprite sheet.", 90)
+        # Assembled and encoded together, on the post-processing pool when enabled.
+        with trace.span("encode"):
+            encoded = [post_process.assemble_sprite_sheet(
+                frames,
+                columns=params.num_columns_sprite_sheet,
+                path=job_output_dir / _sheet_page_name(0, sheet_extension),
+                fmt=params.image_format,
+                preset=encode_preset
+            )]
+    logger.info(f"Sprite sheet ({len(encoded)} page(s)) saved to {job_output_dir}")
+    return packed, encoded
 
-        # 8. Create the final animation metadata file.
-        frame_count = len(animation_frames)
-        columns = task.params.num_columns_sprite_sheet
-        metadata = {
-            "job_id": job_id,
-            "source_image_url": task.source_image_url,
-            "animation_properties": {
-                "num_frames": frame_count,
-                "frame_width": animation_frames[0].width,
-                "frame_height": animation_frames[0].height,
-                "columns": columns,
-                "rows": (frame_count + columns - 1) // columns
-            },
-            "frames": hitboxes
+def _animation_properties(frames: List[Image.Image], params: InferenceTaskParams) -> dict:
+    frame_count = len(frames)
+    columns = params.num_columns_sprite_sheet
+    return {
+        "num_frames": frame_count,
+        "frame_width": frames[0].width,
+        "frame_height": frames[0].height,
+        "columns": columns,
+        "rows": (frame_count + columns - 1) // columns
+    }
+
+def _apply_sheet_layout(metadata: dict, params: InferenceTaskParams, sheet) -> None:
+    """Records the sheet files in the metadata and, for atlases, each frame's sprite."""
+    packed, encoded = sheet
+    metadata["sheets"] = [Path(f.path).name for f in encoded]
+    if packed is not None:
+        # Boxes are relative to the trimmed sprite; add its offset for frame coordinates.
+        properties = metadata["animation_properties"]
+        del properties["columns"], properties["rows"]
+        metadata["atlas"] = {
+            "page_sizes": [[page.width, page.height] for page in packed.pages],
+            "padding": ATLAS_PADDING,
+            "unique_frames": packed.unique_sprites,
         }
-        metadata_path = job_output_dir / "character_anim.json"
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=4)
-        logger.info(f"Animation metadata saved to {metadata_path}")
+        metadata["frames"] = [
+            {**atlas.translate_boxes(frame, -sprite.offset_x, -sprite.offset_y), "sprite": sprite.describe()}
+            for frame, sprite in zip(metadata["frames"], packed.sprites)
+        ]
+    metadata["animation_properties"]["layout"] = params.sheet_layout
 
-        logger.info(f"--- Successfully finished processing for job_id: {job_id} ---")
-        return {
-            "status": "complete",
-            "job_id": job_id,
-            "output_files": {
-                "sprite_sheet": str(sprite_sheet_path),
-                "animation_metadata": str(metadata_path)
-            }
+def _frame_hitboxes(frame: dict) -> List[dict]:
+    """The boxes of one frame as a list of {x, y, width, height}: every region if known, else the main box."""
+    if "regions" in frame:
+        return [{key: region[key] for key in ("x", "y", "width", "height")} for region in frame["regions"]]
+    if frame["width"] > 0 and frame["height"] > 0:
+        return [{key: frame[key] for key in ("x", "y", "width", "height")}]
+    return []
+
+def _sheet_page_name(page: int, extension: str = ".png") -> str:
+    """File name of a sprite sheet page; the first page keeps the grid sheet's name."""
+    return f"character_sprites{extension}" if page == 0 else f"character_sprites_{page}{extension}"
+
+def _sheet_files(metadata: dict) -> list:
+    """File names of every sprite sheet page a job's metadata refers to."""
+    return list(metadata.get("sheets", [_sheet_page_name(0)]))
+
+def _output_files(job_output_dir: Path, metadata: dict) -> dict:
+    sheets = _sheet_files(metadata)
+    output_files = {
+        "sprite_sheet": str(job_output_dir / sheets[0]),
+        "animation_metadata": str(job_output_dir / "character_anim.json")
+    }
+    if "atlas" in metadata:
+        output_files["atlas_pages"] = [str(job_output_dir / name) for name in sheets]
+    return output_files
+
+# --- Job Queue ---
+
+def run_queued_task(task, record) -> dict:
+    """Job handler: runs the pipeline for a queued task, reporting progress on its record."""
+    queue_wait = record.started_at - record.submitted_at
+    metrics.QUEUE_WAIT_SECONDS.observe(queue_wait)
+    if isinstance(task, MultiMotionTask):
+        pipeline = process_multi_motion_pipeline
+    elif task.params.preview:
+        pipeline = process_preview_pipeline
+    else:
+        pipeline = process_full_pipeline
+    result = pipeline(
+        task=task,
+        temp_base_dir=BASE_TEMP_DIR,
+        output_base_dir=BASE_OUTPUT_DIR,
+        progress=record.report,
+        cache=result_cache,
+        events=record.emit
+    )
+    if "timings" in result:
+        result["timings"]["queue_wait_seconds"] = round(queue_wait, 4)
+    return result
+
+job_queue = JobQueue(
+    handler=run_queued_task,
+    num_workers=NUM_WORKERS,
+    broker=InProcessBroker(max_size=MAX_QUEUE_SIZE)
+)
+
+# --- Bulk Submissions ---
+
+# Finished batches kept for status and manifest queries; the oldest are forgotten first.
+MAX_FINISHED_BATCHES = 100
+
+batch_runs: Dict[str, BatchRun] = {}
+batch_runs_lock = threading.Lock()
+
+def _plan_batch(batch: BatchTask) -> Tuple[List[Tuple[str, InferenceTask]], Dict[str, str]]:
+    """
+    Deduplicates a batch's tasks and orders the remaining jobs for throughput.
+
+    Tasks with the same source URL and parameters run once. The jobs are then grouped by
+    model variant and generation shape, so that jobs running at the same time can share a
+    batched pipeline call and the variant stays resident on the GPU.
+
+    Returns:
+        The (job_id, task) pairs to run, and for every task's job id the job id whose
+        result it receives.
+    """
+    job_ids: Dict[str, str] = {}
+    result_of: Dict[str, str] = {}
+    unique: List[InferenceTask] = []
+    for task in batch.tasks:
+        key = make_key("task", source_image_url=task.source_image_url, params=task.params.model_dump())
+        if key not in job_ids:
+            job_ids[key] = task.job_id
+            unique.append(task)
+        result_of[task.job_id] = job_ids[key]
+    # Grouped in order of each group's first task, so the roster's order is otherwise kept.
+    groups: Dict[tuple, List[InferenceTask]] = {}
+    for task in unique:
+        groups.setdefault(_generation_group(task), []).append(task)
+    return [(task.job_id, task) for group in groups.values() for task in group], result_of
+
+def _generation_group(task: InferenceTask) -> tuple:
+    """The model variant and shape a task generates with; equal groups can be batched together."""
+    params = task.params.preview_params() if task.params.preview else task.params
+    generation = params.generation_settings()
+    return (
+        params.model_id,
+        generation["motion_adapter_id"],
+        generation["num_inference_steps"],
+        generation["guidance_scale"],
+        params.num_frames,
+        params.height,
+        params.width,
+    )
+
+def _batch_manifest_path(batch_id: str) -> Path:
+    return BASE_OUTPUT_DIR / "batches" / f"{batch_id}.json"
+
+def _write_batch_manifest(run: BatchRun, batch: BatchTask, result_of: Dict[str, str]) -> None:
+    """Writes one manifest with the outcome of every task of a finished batch, in submission order."""
+    entries = []
+    for index, task in enumerate(batch.tasks):
+        job_id = result_of[task.job_id]
+        record = run.record(job_id)
+        entry = {
+            "index": index,
+            "job_id": task.job_id,
+            "source_image_url": task.source_image_url,
+            "status": record.status if record is not None else "not_submitted",
         }
+        if job_id != task.job_id:
+            entry["duplicate_of"] = job_id
+        if record is not None and record.status == JobStatus.COMPLETE:
+            entry["result"] = record.result
+        elif record is not None and record.status == JobStatus.FAILED:
+            entry["error"] = record.error
+        entries.append(entry)
+    manifest = {**run.describe(), "num_tasks": len(batch.tasks), "tasks": entries}
+    manifest_path = _batch_manifest_path(batch.batch_id)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = manifest_path.with_suffix(".json.tmp")
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=4)
+    temp_path.replace(manifest_path)
+    logger.info(f"Batch manifest saved to {manifest_path}")
 
-    except Exception as e:
-        logger.error(f"!!! Pipeline processing failed for job_id {job_id}: {e}", exc_info=True)
-        raise # Re-raise to be caught by the API endpoint handler
+def _forget_finished_batches() -> None:
+    """Drops the oldest finished batches beyond MAX_FINISHED_BATCHES; call with `batch_runs_lock` held."""
+    finished = [batch_id for batch_id, run in batch_runs.items() if run.finished_at is not None]
+    for batch_id in finished[:max(0, len(finished) - MAX_FINISHED_BATCHES)]:
+        del batch_runs[batch_id]
+
+def _collect_metrics() -> List[metrics.CollectedMetric]:
+    """Scrape-time metrics read from the queue, model registry, GPU and caches."""
+    collected = [
+        ("spriteshift_queue_depth", "gauge", "Jobs waiting for a worker.", [({}, job_queue.queue_depth())]),
+        ("spriteshift_jobs_running", "gauge", "Jobs currently being processed.", [({}, job_queue.running_count())]),
+        ("spriteshift_resident_model_bytes", "gauge", "Parameter and buffer bytes of the resident animation models.",
+         [({}, animator.registry.stats()["total_resident_bytes"])]),
+    ]
+    downloads = downloader.get_downloader().stats()
+    collected += [
+        ("spriteshift_source_downloads_total", "counter", "Source image downloads by outcome.",
+         [({"outcome": "ok"}, downloads["downloads"]), ({"outcome": "failed"}, downloads["failed"]),
+          ({"outcome": "rejected"}, downloads["rejected"])]),
+        ("spriteshift_source_download_bytes_total", "counter", "Bytes of source images downloaded.",
+         [({}, downloads["bytes"])]),
+        ("spriteshift_source_prefetch_total", "counter",
+         "Source image lookups by whether a prefetched download was ready or in progress.",
+         [({"result": "hit"}, downloads["prefetch_hits"]), ({"result": "miss"}, downloads["prefetch_misses"])]),
+    ]
+    residency = animator.residency.stats()
+    collected += [
+        ("spriteshift_model_device_bytes", "gauge",
+         "Device memory held by model weights and reserved by running generations.", [({}, residency["used_bytes"])]),
+        ("spriteshift_model_offloads_total", "counter", "Idle models moved to CPU RAM to free device memory.",
+         [({}, residency["evictions"])]),
+        ("spriteshift_model_lease_waits_total", "counter", "Generations that waited for device memory.",
+         [({}, residency["lease_waits"])]),
+    ]
+    if residency["budget_bytes"] is not None:
+        collected.append(("spriteshift_model_device_budget_bytes", "gauge",
+                          "Device memory the residency manager may hand out.", [({}, residency["budget_bytes"])]))
+    gpu = animator.gpu_memory_stats()
+    if gpu:
+        collected += [
+            ("spriteshift_gpu_memory_allocated_bytes", "gauge", "GPU memory currently allocated by tensors.",
+             [({}, gpu["allocated_bytes"])]),
+            ("spriteshift_gpu_memory_peak_allocated_bytes", "gauge", "High-water mark of GPU memory allocated by tensors.",
+             [({}, gpu["peak_allocated_bytes"])]),
+            ("spriteshift_gpu_memory_reserved_bytes", "gauge", "GPU memory reserved by the caching allocator.",
+             [({}, gpu["reserved_bytes"])]),
+        ]
+
+    hits: List[metrics.Sample] = []
+    misses: List[metrics.Sample] = []
+    ratios: List[metrics.Sample] = []
+    prompt_stats = animator.prompt_cache.stats()
+    hits.append(({"cache": "prompt_embeddings"}, prompt_stats["hits"]))
+    misses.append(({"cache": "prompt_embeddings"}, prompt_stats["misses"]))
+    ratios.append(({"cache": "prompt_embeddings"}, prompt_stats["hit_rate"]))
+    if result_cache is not None:
+        cache_stats = result_cache.stats()
+        for stage, counts in cache_stats["by_stage"].items():
+            hits.append(({"cache": "result", "stage": stage}, counts["hits"]))
+            misses.append(({"cache": "result", "stage": stage}, counts["misses"]))
+        ratios.append(({"cache": "result"}, cache_stats["hit_rate"]))
+        collected.append(("spriteshift_cache_bytes", "gauge", "Bytes held by the result cache.",
+                          [({"cache": "result"}, cache_stats["total_bytes"])]))
+    collected += [
+        ("spriteshift_cache_hits_total", "counter", "Cache lookups that found an entry.", hits),
+        ("spriteshift_cache_misses_total", "counter", "Cache lookups that found nothing.", misses),
+        ("spriteshift_cache_hit_ratio", "gauge", "Fraction of cache lookups that hit since startup.", ratios),
+    ]
+    return collected
+
+metrics.REGISTRY.add_collector(_collect_metrics)
 
 # --- API Endpoints ---
 @app.get("/", summary="Health Check")
 def read_root():
     return {"message": "SpriteShift AI Inference Service is running."}
 
-@app.post("/run-task", summary="Run Animation Pipeline")
+@app.get("/models", summary="Resident Models")
+def list_models():
+    """
+    Reports the model variants held by this worker, with load time and resident memory,
+    and where each one currently lives against the device memory budget.
+    """
+    models = animator.registry.stats()
+    models["residency"] = animator.residency.stats()
+    return models
+
+@app.get("/metrics", summary="Prometheus Metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Exposes stage and job durations, queue wait, job outcomes, GPU memory high-water
+    marks and cache hit counters in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache", summary="Result Cache Statistics")
+def get_cache_stats():
+    """Reports result cache occupancy, hit/miss counters per stage and evictions, plus prompt embedding cache counters."""
+    stats = {"enabled": False} if result_cache is None else {"enabled": True, **result_cache.stats()}
+    stats["prompt_embeddings"] = animator.prompt_cache.stats()
+    return stats
+
+@app.get("/api/preview/{job_id}", summary="Get Preview Asset")
+def get_preview(job_id: str):
+    """
+    Returns an animated preview of a finished job: the WebP or GIF rendered by a
+    preview job, or for full renders a GIF built from the sprite sheet on the first
+    request and reused afterwards.
+    """
+    job_output_dir = BASE_OUTPUT_DIR / job_id
+    webp_preview_path = job_output_dir / "preview.webp"
+    if webp_preview_path.exists():
+        return FileResponse(webp_preview_path, media_type="image/webp")
+    preview_path = job_output_dir / "preview.gif"
+    if not preview_path.exists():
+        metadata_path = job_output_dir / "character_anim.json"
+        if not metadata_path.exists():
+            raise HTTPException(status_code=404, detail=f"No finished assets for job {job_id}.")
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        sprite_sheet_path = job_output_dir / _sheet_files(metadata)[0]
+        if not sprite_sheet_path.exists():
+            raise HTTPException(status_code=404, detail=f"No finished assets for job {job_id}.")
+        if "atlas" in metadata:
+            pages = [Image.open(job_output_dir / name) for name in _sheet_files(metadata)]
+            frames = atlas.unpack_frames(pages, [frame["sprite"] for frame in metadata["frames"]])
+        else:
+            properties = metadata["animation_properties"]
+            with Image.open(sprite_sheet_path) as sprite_sheet:
+                frames = image_utils.split_sprite_sheet(
+                    sprite_sheet,
+                    frame_width=properties["frame_width"],
+                    frame_height=properties["frame_height"],
+                    num_frames=properties["num_frames"],
+                    columns=properties["columns"]
+                )
+        image_utils.save_gif(frames, preview_path)
+        logger.info(f"Preview GIF generated for job {job_id} at {preview_path}")
+    return FileResponse(preview_path, media_type="image/gif")
+
+@app.post("/run-task", summary="Run Animation Pipeline", status_code=202)
 def run_inference_task(task: InferenceTask):
     """
     Accepts a task to generate a character animation from a source image.
-    This endpoint orchestrates the entire AI pipeline asynchronously.
+    The task is queued and processed by a background worker; poll the returned
+    status URL for progress and fetch the assets from the result URL when complete.
     """
-    try:
-        result = process_full_pipeline(
-            task=task,
-            temp_base_dir=BASE_TEMP_DIR,
-            output_base_dir=BASE_OUTPUT_DIR
+    return _submit_task(task)
+
+@app.post("/run-multi-task", summary="Run Multi-Motion Animation Pipeline", status_code=202)
+def run_multi_motion_task(task: MultiMotionTask):
+    """
+    Accepts a task to generate several named animations (idle, walk, punch, ...) of one
+    character. The source image is processed once, the motions are generated in batches,
+    and the result is a single sprite sheet with an `animations` dictionary in the metadata.
+    """
+    return _submit_task(task)
+
+@app.post("/api/job/{job_id}/promote", summary="Promote Preview to Full Render", status_code=202)
+def promote_preview(job_id: str):
+    """
+    Queues the full render of a finished preview job as a new job, with the preview's
+    seed, prompts and settings. Stages the preview already ran (background removal)
+    are served from the result cache.
+    """
+    record = _get_job_record(job_id)
+    if record.status != JobStatus.COMPLETE:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {record.status}; only finished previews can be promoted.")
+    if not record.result.get("preview"):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is not a preview job.")
+    render = record.result["render"]
+    task = InferenceTask(source_image_url=render["source_image_url"], params=InferenceTaskParams(**render["params"]))
+    logger.info(f"Promoting preview {job_id} to full render job {task.job_id} (seed {task.params.seed}).")
+    return {**_submit_task(task), "promoted_from": job_id}
+
+@app.post("/run-batch", summary="Run Many Animation Tasks", status_code=202)
+def run_batch(batch: BatchTask):
+    """
+    Accepts many single-motion tasks at once, e.g. a game's whole character roster; the
+    request body can be a manifest file of this shape. Identical tasks (same source URL
+    and parameters) run once, and the jobs are ordered so that ones sharing a model and
+    generation shape run together. Jobs are fed to the queue as workers free up, which
+    favours the batch's total time over the latency of any single job.
+
+    Poll the returned status URL for aggregate progress; once every job has finished, the
+    manifest URL returns the outcome of every task in submission order.
+    """
+    with batch_runs_lock:
+        if batch.batch_id in batch_runs:
+            raise HTTPException(status_code=409, detail=f"Batch {batch.batch_id} already exists.")
+        existing = [task.job_id for task in batch.tasks if job_queue.get(task.job_id) is not None]
+        if existing:
+            raise HTTPException(status_code=409, detail=f"Jobs already exist: {', '.join(existing)}.")
+        jobs, result_of = _plan_batch(batch)
+        run = BatchRun(
+            batch.batch_id,
+            job_queue,
+            jobs,
+            max_in_flight=BATCH_MAX_IN_FLIGHT or 2 * NUM_WORKERS,
+            on_submit=lambda job_id, task: _prefetch_source(task),
+            on_skipped=lambda job_id, task: _release_source(task),
+            on_finished=lambda run: _write_batch_manifest(run, batch, result_of)
         )
-        return result
-    except Exception as e:
-        logger.error(f"Top-level error processing task for job {task.job_id}: {e}")
-        raise HTTPException(status_code=500, detail=f"Pipeline failed for job {task.job_id}: {str(e)}")
+        _forget_finished_batches()
+        batch_runs[batch.batch_id] = run
+    run.start()
+    logger.info(f"Batch {batch.batch_id} accepted: {len(batch.tasks)} task(s), {len(jobs)} unique job(s).")
+    return {
+        "batch_id": batch.batch_id,
+        "status": run.status,
+        "num_tasks": len(batch.tasks),
+        "num_jobs": len(jobs),
+        "status_url": f"/api/batch/{batch.batch_id}/status",
+        "manifest_url": f"/api/batch/{batch.batch_id}/manifest",
+    }
+
+def _get_batch_run(batch_id: str) -> BatchRun:
+    with batch_runs_lock:
+        run = batch_runs.get(batch_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found.")
+    return run
+
+@app.get("/api/batch/{batch_id}/status", summary="Get Batch Status")
+def get_batch_status(batch_id: str):
+    """Reports a batch's aggregate progress: job counts by status and the mean progress of its jobs."""
+    return _get_batch_run(batch_id).describe()
+
+@app.get("/api/batch/{batch_id}/manifest", summary="Get Batch Manifest")
+def get_batch_manifest(batch_id: str):
+    """Returns the output manifest of a finished batch."""
+    run = _get_batch_run(batch_id)
+    manifest_path = _batch_manifest_path(batch_id)
+    if run.finished_at is None or not manifest_path.exists():
+        raise HTTPException(status_code=409, detail=f"The manifest of batch {batch_id} is not ready yet.")
+    return FileResponse(manifest_path, media_type="application/json")
+
+def _submit_task(task) -> dict:
+    # Prefetch first: an idle worker may pick the job up as soon as it is queued.
+    _prefetch_source(task)
+    try:
+        job_queue.submit(task.job_id, task)
+    except QueueFullError as e:
+        _release_source(task)
+        logger.warning(f"Rejecting job {task.job_id}: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except DuplicateJobError as e:
+        _release_source(task)
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {
+        "job_id": task.job_id,
+        "status": JobStatus.QUEUED,
+        "status_url": f"/api/job/{task.job_id}/status",
+        "result_url": f"/api/job/{task.job_id}/result",
+        "queue_depth": job_queue.queue_depth(),
+    }
+
+def _prefetch_source(task) -> None:
+    """Starts downloading a task's source image so it is ready when a worker picks the job up."""
+    downloader.get_downloader().prefetch(task.source_image_url)
+
+def _release_source(task) -> None:
+    """Drops the prefetch of a task that was not queued after all."""
+    downloader.get_downloader().release(task.source_image_url)
+
+def _get_job_record(job_id: str):
+    record = job_queue.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return record
+
+@app.get("/api/job/{job_id}/status", summary="Get Job Status")
+def get_job_status(job_id: str):
+    """Reports the state and progress of a job together with the current queue depth."""
+    record = _get_job_record(job_id)
+    status = record.describe()
+    status["queue_position"] = job_queue.position(job_id)
+    status["queue_depth"] = job_queue.queue_depth()
+    return status
+
+@app.get("/api/job/{job_id}/events", summary="Stream Job Events")
+def stream_job_events(job_id: str, last_event_id: Optional[str] = Header(default=None)):
+    """
+    Streams a job's events as Server-Sent Events until it finishes: "progress" (status
+    and stage messages), "stage" (a stage completed), "step" (a denoising step),
+    "preview" (low-resolution frames decoded from the latents, as a PNG data URL), then
+    "complete" with the result or "failed" with the error. Events are numbered, so a
+    reconnecting client resumes after the `Last-Event-ID` it last received.
+    """
+    record = _get_job_record(job_id)
+    after_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    return StreamingResponse(
+        _job_event_stream(record, after_id),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _job_event_stream(record, after_id: int):
+    while True:
+        events = record.wait_for_events(after_id, timeout=EVENT_STREAM_HEARTBEAT_SECONDS)
+        for event in events:
+            after_id = event["id"]
+            yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            if event["event"] in FINISHED_STATUSES:
+                return
+        if not events:
+            if record.status in FINISHED_STATUSES:
+                # The terminal event was already delivered before this client connected.
+                return
+            yield ": keep-alive\n\n"
+
+@app.get("/api/job/{job_id}/result", summary="Get Job Result")
+def get_job_result(job_id: str):
+    """Returns the output files of a completed job."""
+    record = _get_job_record(job_id)
+    if record.status == JobStatus.FAILED:
+        raise HTTPException(status_code=500, detail=f"Pipeline failed for job {job_id}: {record.error}")
+    if record.status != JobStatus.COMPLETE:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is still {record.status}.")
+    return record.result
 
 if __name__ == "__main__":
     # Ensure the base directories exist when starting the server directly.
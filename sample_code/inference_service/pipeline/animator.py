@@ -1,120 +1,591 @@
 import torch
-from diffusers import AnimateDiffPipeline, MotionAdapter
+from diffusers import AnimateDiffPipeline, EulerDiscreteScheduler, MotionAdapter
 from diffusers.utils import export_to_gif
+from huggingface_hub import hf_hub_download
+from safetensors.torch import load_file
 from pathlib import Path
+import gc
 import logging
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
 from PIL import Image
 
+from . import cpu_mode
+from .batching import GenerationBatcher, GenerationRequest, GenerationShape
+from .gpu_residency import ResidencyManager
+from .model_registry import ModelRegistry
+from .prompt_cache import PromptEmbeddingCache
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_MODEL_ID = "runwayml/stable-diffusion-v1-5"
+DEFAULT_MOTION_ADAPTER_ID = "guoyww/animatediff-motion-adapter-v1-5-2"
+NEGATIVE_PROMPT = "bad quality, worse quality, low resolution, blurry, deformed"
+
+# AnimateDiff-Lightning: motion modules distilled for 1, 2, 4 or 8 sampling steps. They are
+# sampled with a trailing-spaced Euler scheduler and without classifier-free guidance.
+LIGHTNING_REPO_ID = "ByteDance/AnimateDiff-Lightning"
+LIGHTNING_STEPS = (1, 2, 4, 8)
+DEFAULT_LIGHTNING_STEPS = 4
+LIGHTNING_GUIDANCE_SCALE = 1.0
+
+# Activation memory per latent pixel (one frame position of one animation at 1/8 of the
+# output resolution) of a half-precision pipeline call, measured on SD1.5 + AnimateDiff
+# with some headroom. Used to reserve device memory before generating.
+WORKING_BYTES_PER_LATENT_PIXEL = 40 * 1024
+
+# A registry key identifying one loaded pipeline variant: (base model id, motion adapter id).
+# Lightning variants use the id returned by `lightning_adapter_id`, so each distilled step
+# count is a separate resident variant.
+AnimatorKey = Tuple[str, str]
+
+# Called after every denoising step with the 1-based step, the total number of steps and
+# the current (channels, frames, height, width) latents of one animation.
+StepCallback = Callable[[int, int, torch.Tensor], None]
+
+def lightning_adapter_id(steps: int = DEFAULT_LIGHTNING_STEPS) -> str:
+    """The motion adapter id that selects the AnimateDiff-Lightning checkpoint distilled for `steps` steps."""
+    if steps not in LIGHTNING_STEPS:
+        raise ValueError(f"AnimateDiff-Lightning is distilled for {LIGHTNING_STEPS} steps, got {steps}.")
+    return f"{LIGHTNING_REPO_ID}:{steps}step"
+
+def parse_lightning_adapter_id(motion_adapter_id: str) -> Optional[int]:
+    """Returns the distilled step count of a Lightning adapter id, or None for a regular adapter."""
+    prefix = f"{LIGHTNING_REPO_ID}:"
+    if not motion_adapter_id.startswith(prefix) or not motion_adapter_id.endswith("step"):
+        return None
+    steps = int(motion_adapter_id[len(prefix):-len("step")])
+    if steps not in LIGHTNING_STEPS:
+        raise ValueError(f"AnimateDiff-Lightning is distilled for {LIGHTNING_STEPS} steps, got {steps}.")
+    return steps
+
+def _cpu_generator(seed: Optional[int]) -> torch.Generator:
+    """A CPU generator seeded with `seed`, or with a fresh random seed for None."""
+    generator = torch.Generator("cpu")
+    if seed is None:
+        # A new generator always starts from the same default seed.
+        generator.seed()
+    else:
+        generator.manual_seed(seed)
+    return generator
+
 class Animator:
     """
     A wrapper class for the AnimateDiff pipeline to generate animations.
     """
-    def __init__(self, model_id: str = "runwayml/stable-diffusion-v1-5"):
+    def __init__(self, model_id: str = DEFAULT_MODEL_ID, motion_adapter_id: str = DEFAULT_MOTION_ADAPTER_ID):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.dtype = torch.float16 if self.device == "cuda" else torch.float32
+        # On CPU the dtype follows the configured CPU mode (bfloat16 where supported).
+        self.dtype = torch.float16 if self.device == "cuda" else cpu_mode.resolve_dtype()
+        self.model_id = model_id
+        self.motion_adapter_id = motion_adapter_id
+        # Set for AnimateDiff-Lightning variants: the step count the motion module was distilled for.
+        self.lightning_steps = parse_lightning_adapter_id(motion_adapter_id)
         self.pipe = None
+        self._on_device = False
+        self._low_memory = False
 
         logger.info(f"Initializing Animator on device: {self.device} with dtype: {self.dtype}")
 
         try:
-            adapter = MotionAdapter.from_pretrained("guoyww/animatediff-motion-adapter-v1-5-2")
+            if self.lightning_steps is not None:
+                adapter = _load_lightning_adapter(self.lightning_steps, self.dtype)
+            else:
+                adapter = MotionAdapter.from_pretrained(motion_adapter_id)
             self.pipe = AnimateDiffPipeline.from_pretrained(
                 model_id,
                 motion_adapter=adapter,
                 torch_dtype=self.dtype
             )
-            # The .to(device) call is deferred to the generate method
-            # to allow for more flexible resource management if needed.
+            if self.lightning_steps is not None:
+                self.pipe.scheduler = EulerDiscreteScheduler.from_config(
+                    self.pipe.scheduler.config,
+                    timestep_spacing="trailing",
+                    beta_schedule="linear"
+                )
+            if self.device == "cpu":
+                cpu_mode.optimize_pipeline(self.pipe)
+            # The .to(device) call is deferred to `to_device` so that the
+            # residency manager controls when the pipeline occupies device memory.
             logger.info("AnimateDiff pipeline and motion adapter loaded successfully.")
         except Exception as e:
             logger.error(f"Failed to load the AnimateDiff pipeline: {e}")
             raise
 
+    def to_device(self) -> None:
+        """
+        Moves the pipeline onto the target device. Subsequent calls are no-ops,
+        so a resident Animator only pays the transfer once.
+        """
+        if self._on_device or self._low_memory:
+            return
+        self.pipe.to(self.device)
+        self._on_device = True
+
+    def offload(self) -> None:
+        """Moves the pipeline back to CPU RAM and returns its device memory to the allocator."""
+        if not self._on_device:
+            return
+        self.pipe.to("cpu")
+        self._on_device = False
+        if self.device == "cuda":
+            torch.cuda.empty_cache()
+
+    def enable_low_memory(self) -> None:
+        """
+        Switches to a mode for devices that cannot hold the whole pipeline: each component
+        is moved onto the GPU only while it runs (model CPU offload) and the VAE decodes one
+        frame at a time. Slower per step, but bounded by the largest component.
+        """
+        self.offload()
+        self.pipe.enable_vae_slicing()
+        if self.device == "cuda":
+            self.pipe.enable_model_cpu_offload()
+        self._low_memory = True
+
+    def release(self) -> None:
+        """Drops the pipeline and returns its device memory to the allocator."""
+        self.pipe = None
+        self._on_device = False
+        gc.collect()
+        if self.device == "cuda":
+            torch.cuda.empty_cache()
+
+    def resident_bytes(self) -> int:
+        """
+        Returns the total size in bytes of the parameters and buffers held by the pipeline.
+        """
+        return sum(self._component_bytes().values())
+
+    def largest_component_bytes(self) -> int:
+        """The size in bytes of the largest pipeline component, what CPU offload keeps on the device at once."""
+        return max(self._component_bytes().values(), default=0)
+
+    def _component_bytes(self) -> Dict[str, int]:
+        if not self.pipe:
+            return {}
+        sizes = {}
+        for name, component in self.pipe.components.items():
+            if isinstance(component, torch.nn.Module):
+                sizes[name] = sum(
+                    tensor.numel() * tensor.element_size()
+                    for tensor in list(component.parameters()) + list(component.buffers())
+                )
+        return sizes
+
     def generate(
         self,
         motion_prompt: str,
         character_prompt: str,
-        output_path: Path,
+        output_path: Optional[Path] = None,
         num_frames: int = 16,
         guidance_scale: float = 7.5,
-        num_inference_steps: int = 25
+        num_inference_steps: int = 25,
+        height: int = 512,
+        width: int = 512,
+        seed: Optional[int] = None,
+        on_step: Optional[StepCallback] = None
     ) -> List[Image.Image]:
         """
-        Generates an animation based on prompts and saves it as a GIF.
+        Generates an animation based on prompts, optionally saving it as a GIF.
 
         Args:
             motion_prompt: A prompt describing the motion (e.g., "jumping", "walking").
             character_prompt: A prompt describing the character (e.g., "a knight in shining armor").
-            output_path: The path to save the output GIF file.
+            output_path: Optional path to save a GIF preview; skipped when None.
             num_frames: The number of frames to generate for the animation.
             guidance_scale: The scale for classifier-free guidance.
             num_inference_steps: The number of denoising steps.
+            height: The height in pixels of the generated frames.
+            width: The width in pixels of the generated frames.
+            seed: An optional seed that makes the generation reproducible.
+            on_step: Optional callback receiving denoising progress and the latents after every step.
 
         Returns:
             A list of PIL.Image.Image objects representing the generated frames.
         """
+        logger.info(f"Generating animation for motion: '{motion_prompt}'")
+        frames = self.generate_batch(
+            prompts=[(motion_prompt, character_prompt)],
+            num_frames=num_frames,
+            guidance_scale=guidance_scale,
+            num_inference_steps=num_inference_steps,
+            height=height,
+            width=width,
+            seeds=[seed],
+            step_callbacks=[on_step],
+        )[0]
+
+        if output_path is not None:
+            _export_gif(frames, output_path)
+
+        return frames
+
+    def generate_batch(
+        self,
+        prompts: List[Tuple[str, str]],
+        num_frames: int = 16,
+        guidance_scale: float = 7.5,
+        num_inference_steps: int = 25,
+        height: int = 512,
+        width: int = 512,
+        seeds: Optional[List[Optional[int]]] = None,
+        step_callbacks: Optional[List[Optional[StepCallback]]] = None
+    ) -> List[List[Image.Image]]:
+        """
+        Generates several animations that share the same shape in one pipeline call.
+
+        Args:
+            prompts: A list of (motion_prompt, character_prompt) pairs, one per animation.
+            num_frames: The number of frames to generate for each animation.
+            guidance_scale: The scale for classifier-free guidance.
+            num_inference_steps: The number of denoising steps.
+            height: The height in pixels of the generated frames.
+            width: The width in pixels of the generated frames.
+            seeds: Optional per-prompt seeds; a None entry draws a random seed.
+            step_callbacks: Optional per-prompt callbacks receiving denoising progress and
+                that animation's latents after every step.
+
+        Returns:
+            One list of frames per prompt pair, in the same order as `prompts`.
+        """
         if not self.pipe:
             raise RuntimeError("Animator pipeline is not initialized.")
 
-        logger.info(f"Generating animation for motion: '{motion_prompt}'")
+        working_bytes = estimate_working_bytes(
+            len(prompts), num_frames, height, width, guidance_scale, self.dtype
+        )
+        with residency.lease((self.model_id, self.motion_adapter_id), self, working_bytes=working_bytes):
+            return self._generate_on_device(
+                prompts, num_frames, guidance_scale, num_inference_steps, height, width, seeds, step_callbacks
+            )
 
-        self.pipe.to(self.device)
-        full_prompt = f"masterpiece, best quality, {character_prompt}, {motion_prompt}"
-        negative_prompt = "bad quality, worse quality, low resolution, blurry, deformed"
+    def _generate_on_device(
+        self,
+        prompts: List[Tuple[str, str]],
+        num_frames: int,
+        guidance_scale: float,
+        num_inference_steps: int,
+        height: int,
+        width: int,
+        seeds: Optional[List[Optional[int]]],
+        step_callbacks: Optional[List[Optional[StepCallback]]]
+    ) -> List[List[Image.Image]]:
+        full_prompts = [
+            f"masterpiece, best quality, {character_prompt}, {motion_prompt}"
+            for motion_prompt, character_prompt in prompts
+        ]
+        prompt_embeds = self.encode_prompts(full_prompts)
+        # Without classifier-free guidance the pipeline never uses the negative prompt.
+        negative_prompt_embeds = None
+        if guidance_scale > 1:
+            negative_prompt_embeds = self.encode_prompts([NEGATIVE_PROMPT] * len(full_prompts))
+
+        generator = None
+        if seeds and any(seed is not None for seed in seeds):
+            # CPU generators keep seeded results identical across devices.
+            generator = [_cpu_generator(seed) for seed in seeds]
+
+        on_step_end = None
+        if step_callbacks and any(callback is not None for callback in step_callbacks):
+            def on_step_end(pipe, step, timestep, callback_kwargs):
+                latents = callback_kwargs["latents"]
+                for i, callback in enumerate(step_callbacks):
+                    if callback is None:
+                        continue
+                    try:
+                        callback(step + 1, num_inference_steps, latents[i])
+                    except Exception as e:
+                        # Progress reporting must never fail a generation.
+                        logger.warning(f"Step callback failed: {e}")
+                return callback_kwargs
 
         if self.device == 'cuda':
             free_before, total_before = torch.cuda.mem_get_info()
             logger.info(f"GPU Memory (before generation): {(total_before - free_before) / 1024**3:.2f}GB used / {total_before / 1024**3:.2f}GB total")
 
         output = self.pipe(
-            prompt=full_prompt,
-            negative_prompt=negative_prompt,
+            prompt_embeds=prompt_embeds,
+            negative_prompt_embeds=negative_prompt_embeds,
             num_inference_steps=num_inference_steps,
             guidance_scale=guidance_scale,
             num_frames=num_frames,
+            height=height,
+            width=width,
+            generator=generator,
+            callback_on_step_end=on_step_end,
+            callback_on_step_end_tensor_inputs=["latents"],
         )
-        frames = output.frames[0]
 
         if self.device == 'cuda':
             free_after, total_after = torch.cuda.mem_get_info()
             logger.info(f"GPU Memory (after generation): {(total_after - free_after) / 1024**3:.2f}GB used / {total_after / 1024**3:.2f}GB total")
 
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        export_to_gif(frames, str(output_path))
-        logger.info(f"Animation saved successfully to '{output_path}'")
+        return [list(frames) for frames in output.frames]
 
-        return frames
+    def encode_prompts(self, prompts: List[str]) -> torch.Tensor:
+        """
+        Returns the text-encoder embeddings of `prompts`, reusing cached embeddings for
+        strings this base model has encoded before.
+        """
+        return prompt_cache.get_embeddings((self.model_id, self.dtype), prompts, self._run_text_encoder)
 
-# --- Module-level function for easy use ---
+    def _run_text_encoder(self, prompts: List[str]) -> torch.Tensor:
+        with torch.no_grad():
+            prompt_embeds, _ = self.pipe.encode_prompt(
+                prompts, self.device, num_images_per_prompt=1, do_classifier_free_guidance=False
+            )
+        return prompt_embeds
+
+def _load_lightning_adapter(steps: int, dtype: torch.dtype) -> MotionAdapter:
+    """Builds a motion adapter from the AnimateDiff-Lightning checkpoint for `steps` steps."""
+    checkpoint = f"animatediff_lightning_{steps}step_diffusers.safetensors"
+    logger.info(f"Loading AnimateDiff-Lightning motion weights '{checkpoint}'...")
+    adapter = MotionAdapter()
+    adapter.load_state_dict(load_file(hf_hub_download(LIGHTNING_REPO_ID, checkpoint)))
+    return adapter.to(dtype=dtype)
+
+def _export_gif(frames: List[Image.Image], output_path: Path) -> None:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    export_to_gif(frames, str(output_path))
+    logger.info(f"Animation saved successfully to '{output_path}'")
+
+def estimate_working_bytes(
+    batch_size: int, num_frames: int, height: int, width: int, guidance_scale: float, dtype: torch.dtype
+) -> int:
+    """
+    A rough upper bound of the activation memory one pipeline call allocates on top of the
+    weights. It grows with the number of latent pixels denoised at once; classifier-free
+    guidance doubles the UNet batch.
+    """
+    latent_pixels = batch_size * num_frames * (height // 8) * (width // 8)
+    if guidance_scale > 1:
+        latent_pixels *= 2
+    element_size = torch.empty((), dtype=dtype).element_size()
+    return latent_pixels * WORKING_BYTES_PER_LATENT_PIXEL * element_size // 2
+
+def gpu_memory_stats() -> Dict[str, int]:
+    """
+    Current, peak and reserved CUDA memory of this process in bytes; empty without a GPU.
+    The peak is the high-water mark since startup.
+    """
+    if not torch.cuda.is_available():
+        return {}
+    return {
+        "allocated_bytes": torch.cuda.memory_allocated(),
+        "peak_allocated_bytes": torch.cuda.max_memory_allocated(),
+        "reserved_bytes": torch.cuda.memory_reserved(),
+    }
+
+# --- Process-wide model registry ---
+
+# Text-encoder outputs shared by every resident variant of the same base model.
+prompt_cache = PromptEmbeddingCache()
+
+# Decides which loaded variants hold GPU memory. Without a budget (the default, and
+# always on CPU) every variant stays on its device; the FastAPI app sets the budget.
+residency = ResidencyManager(
+    to_device=lambda animator: animator.to_device(),
+    offload=lambda animator: animator.offload(),
+    size_of=lambda animator: animator.resident_bytes(),
+    enable_low_memory=lambda animator: animator.enable_low_memory(),
+    offloaded_size_of=lambda animator: animator.largest_component_bytes(),
+)
+
+def device_memory_budget(fraction: float) -> Optional[int]:
+    """`fraction` of the GPU's total memory in bytes, or None without a GPU."""
+    if not torch.cuda.is_available():
+        return None
+    _, total = torch.cuda.mem_get_info()
+    return int(total * fraction)
+
+def _load_animator(key: AnimatorKey) -> Animator:
+    model_id, motion_adapter_id = key
+    animator = Animator(model_id=model_id, motion_adapter_id=motion_adapter_id)
+    residency.admit(key, animator)
+    return animator
+
+def _release_animator(animator: Animator) -> None:
+    residency.discard((animator.model_id, animator.motion_adapter_id))
+    animator.release()
+
+# The registry keeps loaded pipeline variants in memory, on the device or in CPU RAM as
+# the residency manager decides. The FastAPI app preloads (pins) the default variant at
+# startup, caps the number of variants loaded at once and clears the registry on shutdown.
+# Generation holds its variant so that the cap never unloads a model while it runs.
+registry = ModelRegistry(
+    loader=_load_animator,
+    size_of=lambda animator: animator.resident_bytes(),
+    unloader=_release_animator,
+)
+
+def get_animator(model_id: str = DEFAULT_MODEL_ID, motion_adapter_id: str = DEFAULT_MOTION_ADAPTER_ID) -> Animator:
+    """
+    Returns the resident Animator for the given variant, loading it on first use.
+    """
+    return registry.get((model_id, motion_adapter_id))
+
+def preload_animator(model_id: str = DEFAULT_MODEL_ID, motion_adapter_id: str = DEFAULT_MOTION_ADAPTER_ID) -> None:
+    """Loads a variant and pins it, so the registry's model limit never unloads it."""
+    registry.preload([(model_id, motion_adapter_id)])
+
+# --- Cross-request micro-batching ---
 
-# Note: In a production environment, you would want to initialize the Animator
-# class once and reuse it across requests to avoid reloading the model,
-# e.g., by managing its lifecycle with the FastAPI application.
-# For this self-contained module, we instantiate it on each call.
+def _run_generation_batch(shape: GenerationShape, requests: List[GenerationRequest]) -> List[List[Image.Image]]:
+    model_id, motion_adapter_id = shape.model_key
+    with registry.hold(shape.model_key):
+        return get_animator(model_id=model_id, motion_adapter_id=motion_adapter_id).generate_batch(
+            prompts=[(r.motion_prompt, r.character_prompt) for r in requests],
+            num_frames=shape.num_frames,
+            guidance_scale=shape.guidance_scale,
+            num_inference_steps=shape.num_inference_steps,
+            height=shape.height,
+            width=shape.width,
+            seeds=[r.seed for r in requests],
+            step_callbacks=[r.on_step for r in requests],
+        )
+
+# When set, concurrent calls to `generate_animation` are folded into batched pipeline
+# calls. Batching only helps when several jobs run at once (i.e. more than one job worker).
+batcher: Optional[GenerationBatcher] = None
+
+def enable_batching(max_batch_size: int = 4, max_wait_seconds: float = 0.05) -> GenerationBatcher:
+    """Starts the process-wide generation batcher."""
+    global batcher
+    if batcher is None:
+        batcher = GenerationBatcher(
+            run_batch=_run_generation_batch,
+            max_batch_size=max_batch_size,
+            max_wait_seconds=max_wait_seconds,
+        )
+        batcher.start()
+    return batcher
+
+def disable_batching() -> None:
+    """Flushes pending batched generations and stops the batcher."""
+    global batcher
+    if batcher is not None:
+        batcher.stop()
+        batcher = None
+
+# --- Module-level function for easy use ---
 
 def generate_animation(
     motion_prompt: str,
     character_prompt: str,
-    output_path: Path,
-    num_frames: int = 16
+    output_path: Optional[Path] = None,
+    num_frames: int = 16,
+    model_id: str = DEFAULT_MODEL_ID,
+    motion_adapter_id: str = DEFAULT_MOTION_ADAPTER_ID,
+    num_inference_steps: int = 25,
+    guidance_scale: float = 7.5,
+    height: int = 512,
+    width: int = 512,
+    seed: Optional[int] = None,
+    on_step: Optional[StepCallback] = None,
 ) -> List[Image.Image]:
     """
-    High-level function to initialize the animator and generate an animation.
+    High-level function to generate an animation with the resident animator,
+    going through the batcher when batching is enabled. A GIF preview is only
+    written when `output_path` is given; `on_step` receives denoising progress.
     """
     try:
-        logger.info("Initializing animator for generation task...")
-        animator = Animator()
-        logger.info("Animator initialized. Starting animation generation...")
-        generated_frames = animator.generate(
-            motion_prompt=motion_prompt,
-            character_prompt=character_prompt,
-            output_path=output_path,
-            num_frames=num_frames
+        if batcher is None:
+            with registry.hold((model_id, motion_adapter_id)):
+                animator = get_animator(model_id=model_id, motion_adapter_id=motion_adapter_id)
+                logger.info("Using resident animator. Starting animation generation...")
+                return animator.generate(
+                    motion_prompt=motion_prompt,
+                    character_prompt=character_prompt,
+                    output_path=output_path,
+                    num_frames=num_frames,
+                    guidance_scale=guidance_scale,
+                    num_inference_steps=num_inference_steps,
+                    height=height,
+                    width=width,
+                    seed=seed,
+                    on_step=on_step,
+                )
+
+        shape = GenerationShape(
+            model_key=(model_id, motion_adapter_id),
+            num_frames=num_frames,
+            height=height,
+            width=width,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
         )
+        logger.info("Submitting animation generation to the batcher...")
+        future = batcher.submit(GenerationRequest(motion_prompt, character_prompt, shape, seed=seed, on_step=on_step))
+        generated_frames = future.result()
+
+        if output_path is not None:
+            _export_gif(generated_frames, output_path)
         return generated_frames
     except Exception as e:
         logger.error(f"Animation generation task failed: {e}")
         raise
+
+def generate_animations(
+    motion_prompts: List[str],
+    character_prompt: str,
+    num_frames: int = 16,
+    model_id: str = DEFAULT_MODEL_ID,
+    motion_adapter_id: str = DEFAULT_MOTION_ADAPTER_ID,
+    num_inference_steps: int = 25,
+    guidance_scale: float = 7.5,
+    height: int = 512,
+    width: int = 512,
+    seed: Optional[int] = None,
+    max_batch_size: int = 4,
+    on_steps: Optional[List[Optional[StepCallback]]] = None,
+) -> List[List[Image.Image]]:
+    """
+    Generates one animation per motion prompt for the same character, running the
+    motions as batched pipeline calls of at most `max_batch_size` animations. When
+    the cross-request batcher is enabled the motions are submitted to it together,
+    so they are batched with each other and with concurrent jobs. `on_steps` holds an
+    optional denoising progress callback per motion.
+
+    Returns:
+        One list of frames per motion prompt, in the same order as `motion_prompts`.
+    """
+    if not motion_prompts:
+        return []
+    on_steps = on_steps or [None] * len(motion_prompts)
+    try:
+        if batcher is None:
+            with registry.hold((model_id, motion_adapter_id)):
+                animator = get_animator(model_id=model_id, motion_adapter_id=motion_adapter_id)
+                logger.info(f"Generating {len(motion_prompts)} motions in batches of up to {max_batch_size}...")
+                animations: List[List[Image.Image]] = []
+                for start in range(0, len(motion_prompts), max_batch_size):
+                    chunk = motion_prompts[start:start + max_batch_size]
+                    animations.extend(animator.generate_batch(
+                        prompts=[(motion_prompt, character_prompt) for motion_prompt in chunk],
+                        num_frames=num_frames,
+                        guidance_scale=guidance_scale,
+                        num_inference_steps=num_inference_steps,
+                        height=height,
+                        width=width,
+                        seeds=[seed] * len(chunk),
+                        step_callbacks=on_steps[start:start + max_batch_size],
+                    ))
+                return animations
+
+        shape = GenerationShape(
+            model_key=(model_id, motion_adapter_id),
+            num_frames=num_frames,
+            height=height,
+            width=width,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+        )
+        logger.info(f"Submitting {len(motion_prompts)} motions to the batcher...")
+        futures = [
+            batcher.submit(GenerationRequest(motion_prompt, character_prompt, shape, seed=seed, on_step=on_step))
+            for motion_prompt, on_step in zip(motion_prompts, on_steps)
+        ]
+        return [future.result() for future in futures]
+    except Exception as e:
+        logger.error(f"Multi-motion generation task failed: {e}")
+        raise
@@ -1,22 +1,220 @@
-from rembg import remove
-from PIL import Image
+from rembg import remove, new_session
+from rembg.bg import naive_cutout
+import numpy as np
+import onnxruntime as ort
+from PIL import Image, ImageOps
 import logging
+import queue
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
 
 logger = logging.getLogger(__name__)
 
-def remove_background(input_path: Path, output_path: Path):
+# An image accepted by the in-memory API. Results are returned in the same type.
+ImageInput = Union[Image.Image, np.ndarray]
+
+DEFAULT_MODEL = "u2net"
+
+# Models whose ONNX graph takes a 320x320 ImageNet-normalised input and produces a
+# single saliency map. For these the batch API stacks every image into one run.
+_U2NET_FAMILY = {"u2net", "u2netp", "u2net_human_seg", "silueta"}
+_U2NET_MEAN = (0.485, 0.456, 0.406)
+_U2NET_STD = (0.229, 0.224, 0.225)
+_U2NET_SIZE = (320, 320)
+
+class SessionPool:
+    """
+    A fixed-size pool of rembg sessions for one segmentation model.
+
+    Sessions are created lazily up to `size` and then reused, so the ONNX model is
+    loaded once per pool slot instead of once per call. A pool sized to the number
+    of job workers gives each worker its own session.
+    """
+    def __init__(self, model_name: str, size: int = 1, intra_op_threads: int = 0, inter_op_threads: int = 0):
+        self.model_name = model_name
+        self.size = max(1, size)
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self._idle: "queue.Queue" = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create_session(self):
+        sess_opts = ort.SessionOptions()
+        sess_opts.intra_op_num_threads = self.intra_op_threads
+        sess_opts.inter_op_num_threads = self.inter_op_threads
+        logger.info(
+            f"Creating rembg session for model '{self.model_name}' "
+            f"(intra-op threads: {self.intra_op_threads or 'auto'}, inter-op threads: {self.inter_op_threads or 'auto'})."
+        )
+        return new_session(self.model_name, sess_opts=sess_opts)
+
+    @contextmanager
+    def session(self) -> Iterator:
+        """Borrows a session from the pool, creating one if the pool is not yet full."""
+        try:
+            session = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    session = self._create_session()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                session = self._idle.get()
+        try:
+            yield session
+        finally:
+            self._idle.put(session)
+
+    def warm_up(self) -> None:
+        """Creates the first session ahead of time so the first job does not pay for it."""
+        with self.session():
+            pass
+
+# --- Process-wide session pools ---
+
+_pool_settings = {"size": 1, "intra_op_threads": 0, "inter_op_threads": 0}
+_default_model = DEFAULT_MODEL
+_pools: Dict[str, SessionPool] = {}
+_pools_lock = threading.Lock()
+
+def configure(
+    model_name: str = DEFAULT_MODEL,
+    pool_size: int = 1,
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0
+) -> None:
+    """
+    Sets the default segmentation model and the settings used for new session pools.
+    Existing pools are dropped so the new settings take effect.
+
+    Args:
+        model_name: The rembg model used when a call does not name one (e.g. "u2net", "u2netp").
+        pool_size: The number of sessions kept per model; usually the number of job workers.
+        intra_op_threads: onnxruntime intra-op threads per session (0 lets onnxruntime decide).
+        inter_op_threads: onnxruntime inter-op threads per session (0 lets onnxruntime decide).
+    """
+    global _default_model
+    with _pools_lock:
+        _default_model = model_name
+        _pool_settings.update(size=pool_size, intra_op_threads=intra_op_threads, inter_op_threads=inter_op_threads)
+        _pools.clear()
+
+def default_model_name() -> str:
+    """The rembg model used when a call does not name one."""
+    return _default_model
+
+def get_session_pool(model_name: Optional[str] = None) -> SessionPool:
+    """Returns the shared session pool for a model, creating it on first use."""
+    model_name = model_name or _default_model
+    with _pools_lock:
+        pool = _pools.get(model_name)
+        if pool is None:
+            pool = SessionPool(model_name, **_pool_settings)
+            _pools[model_name] = pool
+        return pool
+
+# --- In-memory API ---
+
+def _to_pil(image: ImageInput) -> Image.Image:
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(image)
+    return image
+
+def _like_input(result: Image.Image, original: ImageInput) -> ImageInput:
+    if isinstance(original, np.ndarray):
+        return np.asarray(result)
+    return result
+
+def remove_background_image(image: ImageInput, model_name: Optional[str] = None) -> ImageInput:
+    """
+    Removes the background from an in-memory image using a pooled rembg session.
+
+    Args:
+        image: A PIL image or an RGB/RGBA NumPy array.
+        model_name: The rembg model to use; defaults to the configured model.
+
+    Returns:
+        The RGBA cutout, as a PIL image or NumPy array matching the input type.
+    """
+    with get_session_pool(model_name).session() as session:
+        output_image = remove(_to_pil(image), session=session)
+    return _like_input(output_image, image)
+
+def _predict_masks(session, images: List[Image.Image]) -> List[Image.Image]:
+    """
+    Predicts one mask per image, stacking u2net-family inputs into a single
+    onnxruntime run when the model accepts a dynamic batch dimension.
+    """
+    model_input = session.inner_session.get_inputs()[0]
+    batch_dim = model_input.shape[0]
+    batchable = session.model_name in _U2NET_FAMILY and not (isinstance(batch_dim, int) and batch_dim == 1)
+
+    if batchable and len(images) > 1:
+        try:
+            batch = np.concatenate([
+                session.normalize(img, _U2NET_MEAN, _U2NET_STD, _U2NET_SIZE)[model_input.name]
+                for img in images
+            ])
+            preds = session.inner_session.run(None, {model_input.name: batch})[0][:, 0, :, :]
+            masks = []
+            for img, pred in zip(images, preds):
+                pred = (pred - pred.min()) / max(pred.max() - pred.min(), 1e-6)
+                mask = Image.fromarray((pred.clip(0, 1) * 255).astype("uint8"), mode="L")
+                masks.append(mask.resize(img.size, Image.Resampling.LANCZOS))
+            return masks
+        except Exception as e:
+            logger.warning(f"Batched segmentation failed, falling back to per-image runs: {e}")
+
+    return [session.predict(img)[0] for img in images]
+
+def remove_backgrounds(images: List[ImageInput], model_name: Optional[str] = None) -> List[ImageInput]:
+    """
+    Removes the background from many in-memory images with one pooled session.
+
+    For u2net-family models all images are segmented in a single onnxruntime run;
+    other models run image by image on the same session.
+
+    Args:
+        images: PIL images or RGB/RGBA NumPy arrays.
+        model_name: The rembg model to use; defaults to the configured model.
+
+    Returns:
+        The RGBA cutouts, in input order and matching each input's type.
+    """
+    if not images:
+        return []
+    logger.info(f"Removing background from {len(images)} image(s) in one batch...")
+    pil_images = [ImageOps.exif_transpose(_to_pil(image)).convert("RGB") for image in images]
+    with get_session_pool(model_name).session() as session:
+        masks = _predict_masks(session, pil_images)
+    cutouts = [naive_cutout(img, mask) for img, mask in zip(pil_images, masks)]
+    return [_like_input(cutout, original) for cutout, original in zip(cutouts, images)]
+
+# --- File-based API ---
+
+def remove_background(input_path: Path, output_path: Path, model_name: Optional[str] = None):
     """
     Removes the background from an image using rembg.
 
     Args:
         input_path: Path to the input image file.
         output_path: Path to save the output image with a transparent background.
+        model_name: The rembg model to use; defaults to the configured model.
     """
     try:
         logger.info(f"Removing background from '{input_path}'...")
         input_image = Image.open(input_path)
-        output_image = remove(input_image)
+        output_image = remove_background_image(input_image, model_name=model_name)
 
         # Ensure the output directory exists
         output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, List, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class GenerationShape:
+    """
+    The parameters that must match for two generations to share one pipeline call.
+    """
+    model_key: Hashable
+    num_frames: int
+    height: int
+    width: int
+    num_inference_steps: int
+    guidance_scale: float
+
+@dataclass
+class GenerationRequest:
+    """A single job's generation, waiting to be folded into a batch."""
+    motion_prompt: str
+    character_prompt: str
+    shape: GenerationShape
+    seed: Optional[int] = None
+    # Receives denoising progress for this request's animation; see `animator.StepCallback`.
+    on_step: Optional[Callable] = None
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+# Runs one batch of same-shape requests and returns the frames for each request, in order.
+BatchRunner = Callable[[GenerationShape, List[GenerationRequest]], List[List[Image.Image]]]
+
+class GenerationBatcher:
+    """
+    Collects concurrent generation requests and runs compatible ones as a single
+    batched pipeline call.
+
+    Requests are grouped by `GenerationShape`. A group is dispatched as soon as it
+    reaches `max_batch_size`, or once its oldest request has waited `max_wait_seconds`.
+    Batches run one at a time on a dedicated dispatcher thread, so the GPU only ever
+    sees one pipeline call.
+    """
+    def __init__(self, run_batch: BatchRunner, max_batch_size: int = 4, max_wait_seconds: float = 0.05):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self._run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._pending: Dict[GenerationShape, List[GenerationRequest]] = {}
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self.batches_run = 0
+        self.requests_run = 0
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._dispatch_loop, name="generation-batcher", daemon=True)
+            self._thread.start()
+        logger.info(
+            f"Generation batcher started (max batch size {self.max_batch_size}, "
+            f"max wait {self.max_wait_seconds * 1000:.0f}ms)."
+        )
+
+    def stop(self) -> None:
+        """Stops the dispatcher after flushing every pending request."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self._thread = None
+
+    def submit(self, request: GenerationRequest) -> Future:
+        """Queues a request and returns a future resolving to its frames."""
+        with self._condition:
+            if self._thread is None or self._stopping:
+                raise RuntimeError("Generation batcher is not running.")
+            self._pending.setdefault(request.shape, []).append(request)
+            self._condition.notify_all()
+        return request.future
+
+    def pending_count(self) -> int:
+        with self._condition:
+            return sum(len(group) for group in self._pending.values())
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches_run": self.batches_run,
+            "requests_run": self.requests_run,
+            "mean_batch_size": round(self.requests_run / self.batches_run, 2) if self.batches_run else 0.0,
+            "pending": self.pending_count(),
+        }
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._condition:
+                batch = self._next_ready_batch()
+                while batch is None:
+                    if self._stopping and not self._pending:
+                        return
+                    self._condition.wait(timeout=self._time_until_next_deadline())
+                    batch = self._next_ready_batch()
+            self._execute(batch)
+
+    def _next_ready_batch(self) -> Optional[List[GenerationRequest]]:
+        """Pops the most urgent group that is full or past its deadline. Caller holds the lock."""
+        now = time.monotonic()
+        ready_shape = None
+        oldest = None
+        for shape, group in self._pending.items():
+            is_ready = (
+                len(group) >= self.max_batch_size
+                or now - group[0].enqueued_at >= self.max_wait_seconds
+                or self._stopping
+            )
+            if is_ready and (oldest is None or group[0].enqueued_at < oldest):
+                ready_shape, oldest = shape, group[0].enqueued_at
+        if ready_shape is None:
+            return None
+        group = self._pending[ready_shape]
+        batch, remainder = group[:self.max_batch_size], group[self.max_batch_size:]
+        if remainder:
+            self._pending[ready_shape] = remainder
+        else:
+            del self._pending[ready_shape]
+        return batch
+
+    def _time_until_next_deadline(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        now = time.monotonic()
+        oldest = min(group[0].enqueued_at for group in self._pending.values())
+        return max(0.0, oldest + self.max_wait_seconds - now)
+
+    def _execute(self, batch: List[GenerationRequest]) -> None:
+        shape = batch[0].shape
+        logger.info(f"Running batched generation of {len(batch)} request(s) for shape {shape}.")
+        try:
+            results = self._run_batch(shape, batch)
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch runner returned {len(results)} results for {len(batch)} requests.")
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        self.batches_run += 1
+        self.requests_run += len(batch)
+        for request, frames in zip(batch, results):
+            request.future.set_result(frames)
@@ -0,0 +1,103 @@
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+DTYPES = ("auto", "bfloat16", "float32")
+
+@dataclass(frozen=True)
+class CpuOptions:
+    """
+    How diffusion pipelines are executed when no GPU is available.
+
+    Attributes:
+        enabled: Apply the optimisations below; when False the pipeline runs in eager float32.
+        dtype: "bfloat16", "float32", or "auto" to use bfloat16 when the CPU supports it natively.
+        channels_last: Store the UNet and VAE weights in channels-last (NHWC) layout, which
+            oneDNN convolutions run faster on.
+        compile: Compile the UNet and the VAE decoder with torch.compile (inductor). The first
+            generation pays the compilation cost.
+        num_threads: Intra-op threads for PyTorch (0 keeps PyTorch's default).
+        interop_threads: Inter-op threads for PyTorch (0 keeps PyTorch's default).
+        attention_slicing: Compute attention in slices to bound peak memory.
+        vae_tiling: Decode with the VAE in tiles to bound peak memory at large resolutions.
+    """
+    enabled: bool = False
+    dtype: str = "auto"
+    channels_last: bool = True
+    compile: bool = False
+    num_threads: int = 0
+    interop_threads: int = 0
+    attention_slicing: bool = True
+    vae_tiling: bool = True
+
+_options = CpuOptions()
+
+def configure(options: CpuOptions) -> None:
+    """Sets the CPU execution options used by pipelines loaded from now on and applies the thread counts."""
+    global _options
+    if options.dtype not in DTYPES:
+        raise ValueError(f"Unknown CPU dtype '{options.dtype}'; expected one of {DTYPES}.")
+    _options = options
+    if options.enabled:
+        apply_thread_settings(options)
+
+def current_options() -> CpuOptions:
+    return _options
+
+def bf16_supported() -> bool:
+    """Whether the CPU has native bfloat16 support (AVX512-BF16 or AMX) through oneDNN."""
+    try:
+        return bool(torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+def resolve_dtype(options: Optional[CpuOptions] = None) -> torch.dtype:
+    """The dtype CPU pipelines are loaded in."""
+    options = options or _options
+    if not options.enabled or options.dtype == "float32":
+        return torch.float32
+    if options.dtype == "bfloat16" or bf16_supported():
+        return torch.bfloat16
+    return torch.float32
+
+def apply_thread_settings(options: Optional[CpuOptions] = None) -> None:
+    options = options or _options
+    if options.num_threads > 0:
+        torch.set_num_threads(options.num_threads)
+    if options.interop_threads > 0:
+        try:
+            torch.set_interop_threads(options.interop_threads)
+        except RuntimeError as e:
+            # Only allowed before the first inter-op parallel work in the process.
+            logger.warning(f"Could not set PyTorch inter-op threads: {e}")
+    logger.info(f"PyTorch CPU threads: {torch.get_num_threads()} intra-op, {torch.get_num_interop_threads()} inter-op.")
+
+def optimize_pipeline(pipe, options: Optional[CpuOptions] = None) -> None:
+    """
+    Applies the CPU optimisations to a loaded diffusers pipeline in place.
+
+    Args:
+        pipe: A pipeline with `unet` and `vae` components, already in the target dtype.
+        options: The options to apply; defaults to the configured options.
+    """
+    options = options or _options
+    if not options.enabled:
+        return
+    if options.channels_last:
+        pipe.unet.to(memory_format=torch.channels_last)
+        pipe.vae.to(memory_format=torch.channels_last)
+    if options.attention_slicing:
+        pipe.enable_attention_slicing()
+    if options.vae_tiling and hasattr(pipe.vae, "enable_tiling"):
+        pipe.vae.enable_tiling()
+    if options.compile:
+        pipe.unet = torch.compile(pipe.unet)
+        pipe.vae.decode = torch.compile(pipe.vae.decode)
+    logger.info(
+        f"CPU optimisations applied (channels_last={options.channels_last}, compile={options.compile}, "
+        f"attention_slicing={options.attention_slicing}, vae_tiling={options.vae_tiling})."
+    )
@@ -0,0 +1,233 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Where a model's weights live.
+HOST = "host"          # In CPU RAM; moved onto the device for its next lease.
+DEVICE = "device"      # Fully on the device.
+OFFLOADED = "offloaded"  # Low-memory mode: weights stay in CPU RAM and components visit the device one at a time.
+
+@dataclass
+class ResidentEntry:
+    """The placement and lease bookkeeping of one model tracked by the residency manager."""
+    key: Hashable
+    model: Any
+    size_bytes: int
+    offloaded_bytes: int
+    state: str = HOST
+    leases: int = 0
+    last_used_at: float = field(default_factory=time.time)
+
+    def device_bytes(self) -> int:
+        """Device memory the model's weights hold in its current state."""
+        if self.state == DEVICE:
+            return self.size_bytes
+        if self.state == OFFLOADED:
+            return self.offloaded_bytes
+        return 0
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "key": list(self.key) if isinstance(self.key, tuple) else self.key,
+            "state": self.state,
+            "size_bytes": self.size_bytes,
+            "device_bytes": self.device_bytes(),
+            "leases": self.leases,
+            "last_used_at": self.last_used_at,
+        }
+
+class ResidencyManager:
+    """
+    Decides which models hold device memory, within a fixed budget.
+
+    Work that needs a model on the device takes a lease on it, declaring the working
+    memory (activations) it will allocate on top of the weights. A lease is granted
+    once the model's weights plus every active lease's working memory fit the budget:
+    idle models are moved back to CPU RAM, least recently used first, to make room,
+    and otherwise the lease waits until running work releases memory. A model too large
+    for the budget on its own is switched to a low-memory mode (CPU offload) instead.
+    Several leases on the same model share its weights, so concurrent jobs of one
+    variant run side by side whenever their working memory fits.
+
+    Without a budget every lease is granted immediately and models stay on the device.
+    """
+    def __init__(
+        self,
+        to_device: Callable[[Any], None],
+        offload: Callable[[Any], None],
+        size_of: Callable[[Any], int],
+        enable_low_memory: Optional[Callable[[Any], None]] = None,
+        offloaded_size_of: Optional[Callable[[Any], int]] = None,
+        budget_bytes: Optional[int] = None,
+    ):
+        """
+        Args:
+            to_device: Moves a model's weights onto the device.
+            offload: Moves a model's weights back to CPU RAM.
+            size_of: Returns the device memory in bytes of a model's weights.
+            enable_low_memory: Switches a model to a low-memory mode for models that do
+                not fit the budget on their own; such models are never moved again.
+            offloaded_size_of: Returns the device memory in bytes a model still needs in
+                low-memory mode (e.g. its largest component).
+            budget_bytes: The device memory the manager may hand out; None for no limit.
+        """
+        self._to_device = to_device
+        self._offload = offload
+        self._size_of = size_of
+        self._enable_low_memory = enable_low_memory
+        self._offloaded_size_of = offloaded_size_of
+        self.budget_bytes = budget_bytes
+        self._entries: Dict[Hashable, ResidentEntry] = {}
+        self._working_bytes = 0
+        self._evictions = 0
+        self._low_memory_fallbacks = 0
+        self._waits = 0
+        self._changed = threading.Condition()
+
+    def set_budget(self, budget_bytes: Optional[int]) -> None:
+        """Changes the budget; models over a lowered budget are offloaded at the next lease."""
+        with self._changed:
+            self.budget_bytes = budget_bytes
+            self._changed.notify_all()
+
+    def admit(self, key: Hashable, model: Any) -> None:
+        """
+        Starts tracking a freshly loaded model, moving it onto the device right away when
+        it fits next to the models already there. Otherwise it waits in CPU RAM until its
+        first lease.
+        """
+        with self._changed:
+            entry = self._entry(key, model)
+            if entry.state == HOST and self._fits(entry.size_bytes):
+                self._place(entry)
+
+    def discard(self, key: Hashable) -> None:
+        """Stops tracking a model, e.g. when the model registry unloads it."""
+        with self._changed:
+            self._entries.pop(key, None)
+            self._changed.notify_all()
+
+    @contextmanager
+    def lease(self, key: Hashable, model: Any, working_bytes: int = 0) -> Iterator[Any]:
+        """
+        Holds `model` on the device (or in low-memory mode) with `working_bytes` of
+        activation memory reserved for the duration of the block.
+        """
+        self._acquire(key, model, working_bytes)
+        try:
+            yield model
+        finally:
+            with self._changed:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.leases -= 1
+                    entry.last_used_at = time.time()
+                self._working_bytes -= working_bytes
+                self._changed.notify_all()
+
+    def used_bytes(self) -> int:
+        """Device memory held by tracked weights plus the working memory of active leases."""
+        with self._changed:
+            return self._used_bytes()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the budget, its current use and the placement of every tracked model."""
+        with self._changed:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "used_bytes": self._used_bytes(),
+                "working_bytes": self._working_bytes,
+                "evictions": self._evictions,
+                "low_memory_fallbacks": self._low_memory_fallbacks,
+                "lease_waits": self._waits,
+                "models": [entry.describe() for entry in self._entries.values()],
+            }
+
+    def _acquire(self, key: Hashable, model: Any, working_bytes: int) -> None:
+        waited = False
+        with self._changed:
+            entry = self._entry(key, model)
+            while True:
+                needed = working_bytes + (entry.size_bytes if entry.state == HOST else 0)
+                if self._fits(needed):
+                    break
+                victim = self._least_recently_used_idle(exclude=key)
+                if victim is not None:
+                    self._evict(victim)
+                    continue
+                if self._leases_held(exclude=key) == 0:
+                    # Nothing else holds device memory: the model and its work exceed the
+                    # budget on their own.
+                    if entry.state == HOST and entry.leases == 0 and self._enable_low_memory is not None:
+                        self._switch_to_low_memory(entry)
+                        continue
+                    if entry.leases == 0:
+                        logger.warning(
+                            f"Model {key} needs {needed / 1024**2:.0f}MB of device memory, more than the "
+                            f"{self.budget_bytes / 1024**2:.0f}MB budget; running over budget."
+                        )
+                        break
+                if not waited:
+                    waited = True
+                    self._waits += 1
+                    logger.info(f"Waiting for device memory to run model {key}...")
+                self._changed.wait()
+                # The model may have been discarded and reloaded while we waited.
+                entry = self._entry(key, model)
+            if entry.state == HOST:
+                self._place(entry)
+            entry.leases += 1
+            entry.last_used_at = time.time()
+            self._working_bytes += working_bytes
+
+    def _entry(self, key: Hashable, model: Any) -> ResidentEntry:
+        entry = self._entries.get(key)
+        if entry is None or entry.model is not model:
+            size_bytes = int(self._size_of(model))
+            offloaded_bytes = int(self._offloaded_size_of(model)) if self._offloaded_size_of else 0
+            entry = ResidentEntry(key=key, model=model, size_bytes=size_bytes, offloaded_bytes=offloaded_bytes)
+            self._entries[key] = entry
+        return entry
+
+    def _used_bytes(self) -> int:
+        return sum(entry.device_bytes() for entry in self._entries.values()) + self._working_bytes
+
+    def _fits(self, extra_bytes: int) -> bool:
+        return self.budget_bytes is None or self._used_bytes() + extra_bytes <= self.budget_bytes
+
+    def _leases_held(self, exclude: Hashable) -> int:
+        return sum(entry.leases for key, entry in self._entries.items() if key != exclude)
+
+    def _least_recently_used_idle(self, exclude: Hashable) -> Optional[ResidentEntry]:
+        idle: List[ResidentEntry] = [
+            entry for key, entry in self._entries.items()
+            if key != exclude and entry.leases == 0 and entry.state == DEVICE
+        ]
+        return min(idle, key=lambda entry: entry.last_used_at) if idle else None
+
+    # Moves run under the lock, so transfers are serialised and never interleave with
+    # the budget accounting of other leases.
+    def _place(self, entry: ResidentEntry) -> None:
+        logger.info(f"Moving model {entry.key} onto the device ({entry.size_bytes / 1024**2:.0f}MB).")
+        self._to_device(entry.model)
+        entry.state = DEVICE
+
+    def _evict(self, entry: ResidentEntry) -> None:
+        logger.info(f"Offloading idle model {entry.key} to CPU RAM to free {entry.size_bytes / 1024**2:.0f}MB.")
+        self._offload(entry.model)
+        entry.state = HOST
+        self._evictions += 1
+
+    def _switch_to_low_memory(self, entry: ResidentEntry) -> None:
+        logger.warning(
+            f"Model {entry.key} ({entry.size_bytes / 1024**2:.0f}MB) does not fit the "
+            f"{self.budget_bytes / 1024**2:.0f}MB device budget; switching it to CPU offload."
+        )
+        self._enable_low_memory(entry.model)
+        entry.state = OFFLOADED
+        self._low_memory_fallbacks += 1
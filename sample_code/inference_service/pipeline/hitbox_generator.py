@@ -1,7 +1,7 @@
 import cv2
 import numpy as np
 import logging
-from typing import List, Dict
+from typing import Any, Dict, List, Optional
 from PIL import Image
 
 logger = logging.getLogger(__name__)
@@ -9,61 +9,220 @@ logger = logging.getLogger(__name__)
 Hitbox = Dict[str, int]
 AnimationHitboxes = List[Hitbox]
 
-def generate_hitboxes_for_animation(frames: List[Image.Image], contour_area_threshold: int = 100) -> AnimationHitboxes:
+# Frames are processed in chunks so the stacked alpha array (16MB) and the int32
+# component labels of its opaque crops (at most 64MB) stay bounded even for long,
+# high-resolution animations.
+MAX_PIXELS_PER_PASS = 16 * 1024 * 1024
+
+EMPTY_HITBOX: Hitbox = {"x": 0, "y": 0, "width": 0, "height": 0}
+
+def stack_alpha(frames: List[Image.Image]) -> np.ndarray:
+    """
+    Stacks the alpha channels of all frames into one (num_frames, height, width) uint8 array.
+    Only the alpha band is copied out of each frame; frames without one are converted to RGBA first.
+    """
+    alpha = np.empty((len(frames), frames[0].height, frames[0].width), dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        if frame.mode != 'RGBA':
+            logger.warning(f"Frame {i} is not in RGBA mode. Converting...")
+            frame = frame.convert('RGBA')
+        alpha[i] = np.asarray(frame.getchannel('A'))
+    return alpha
+
+def opaque_mask(alpha: np.ndarray, alpha_threshold: int = 0) -> np.ndarray:
+    """
+    Thresholds a stack of alpha channels in a single pass.
+
+    OpenCV treats every non-zero pixel as foreground, so with the default threshold
+    of 0 the alpha stack is used as-is and no copy is made.
+    """
+    if alpha_threshold <= 0:
+        return alpha
+    num_frames, height, width = alpha.shape
+    _, mask = cv2.threshold(alpha.reshape(num_frames * height, width), alpha_threshold, 255, cv2.THRESH_BINARY)
+    return mask.reshape(num_frames, height, width)
+
+def opaque_bounds(mask: np.ndarray) -> np.ndarray:
+    """
+    Returns the overall opaque bounds of every frame as a (num_frames, 4) array of
+    x, y, width, height, from row and column reductions over the whole stack.
+    Empty frames get an empty box at the origin.
+
+    Args:
+        mask: A (num_frames, height, width) uint8 array; non-zero pixels are opaque.
+    """
+    num_frames, height, width = mask.shape
+    rows = mask.max(axis=2) > 0
+    cols = mask.max(axis=1) > 0
+    # The first opaque row/column from each side.
+    top = rows.argmax(axis=1)
+    bottom = height - rows[:, ::-1].argmax(axis=1)
+    left = cols.argmax(axis=1)
+    right = width - cols[:, ::-1].argmax(axis=1)
+    bounds = np.stack([left, top, right - left, bottom - top], axis=1)
+    bounds[~rows.any(axis=1)] = 0
+    return bounds
+
+def find_regions(
+    mask: np.ndarray,
+    area_threshold: int = 100,
+    bounds: Optional[np.ndarray] = None
+) -> List[List[Dict[str, int]]]:
+    """
+    Returns every significant opaque region of every frame, largest first.
+
+    Each frame is cropped to its opaque bounds and the crops are stacked into one image,
+    separated by a transparent row so regions never join across frames. A single
+    connected-components pass over that image yields every region's box and pixel area.
+
+    Args:
+        mask: A (num_frames, height, width) uint8 array; non-zero pixels are opaque.
+        area_threshold: The minimum pixel area for a region to be kept.
+        bounds: The frames' `opaque_bounds`, if already computed.
+
+    Returns:
+        One list of region boxes (x, y, width, height, area) per frame.
+    """
+    num_frames = mask.shape[0]
+    regions: List[List[Dict[str, int]]] = [[] for _ in range(num_frames)]
+    if bounds is None:
+        bounds = opaque_bounds(mask)
+    x0, y0, crop_width, crop_height = bounds.T
+    if not crop_width.any():
+        return regions
+
+    offsets = np.concatenate([[0], np.cumsum(crop_height + 1)[:-1]])
+    packed = np.zeros((int(offsets[-1] + crop_height[-1] + 1), int(crop_width.max())), dtype=np.uint8)
+    for i, ((x, y, w, h), offset) in enumerate(zip(bounds.tolist(), offsets.tolist())):
+        packed[offset:offset + h, :w] = mask[i, y:y + h, x:x + w]
+
+    _, _, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(packed, 8, cv2.CV_32S, cv2.CCL_GRANA)
+    stats = stats[1:]  # Label 0 is the transparent background.
+    stats = stats[stats[:, cv2.CC_STAT_AREA] >= area_threshold]
+    frame_index = np.searchsorted(offsets, stats[:, cv2.CC_STAT_TOP], side="right") - 1
+    # By frame, then largest first; ties keep raster order.
+    order = np.lexsort((-stats[:, cv2.CC_STAT_AREA], frame_index))
+    frame_index = frame_index[order]
+    stats = stats[order]
+    xs = stats[:, cv2.CC_STAT_LEFT] + x0[frame_index]
+    ys = stats[:, cv2.CC_STAT_TOP] - offsets[frame_index] + y0[frame_index]
+
+    boxes = np.stack(
+        [xs, ys, stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT], stats[:, cv2.CC_STAT_AREA]], axis=1
+    )
+    for i, (x, y, w, h, area) in zip(frame_index.tolist(), boxes.tolist()):
+        regions[i].append({"x": x, "y": y, "width": w, "height": h, "area": area})
+    return regions
+
+def frame_stats(mask: np.ndarray, bounds: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+    """
+    Computes the opaque pixel count, coverage and overall opaque bounds of every frame.
+
+    Args:
+        mask: A (num_frames, height, width) uint8 array; non-zero pixels are opaque.
+        bounds: The frames' `opaque_bounds`, if already computed.
     """
-    Generates hitboxes for a sequence of animation frames by finding the largest contour.
+    num_frames, height, width = mask.shape
+    if bounds is None:
+        bounds = opaque_bounds(mask)
+
+    stats = []
+    for frame, (x, y, w, h) in zip(mask, bounds.tolist()):
+        area = cv2.countNonZero(frame)
+        stats.append({
+            "opaque_area": area,
+            "coverage": round(area / (height * width), 4),
+            "bounds": {"x": x, "y": y, "width": w, "height": h},
+        })
+    return stats
+
+def generate_hitboxes_for_animation(
+    frames: List[Image.Image],
+    contour_area_threshold: int = 100,
+    alpha_threshold: int = 0,
+    include_regions: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Generates hitboxes for a sequence of animation frames by finding the largest opaque region.
+
+    Frames are processed in chunks: only their alpha channels are stacked into one
+    array, which is thresholded and measured with whole-stack passes instead of
+    converting every RGBA frame to its own array.
 
     Args:
         frames: A list of PIL Image objects, expected to be in RGBA format.
-        contour_area_threshold: The minimum pixel area to be considered a valid contour.
+        contour_area_threshold: The minimum pixel area for a region to count.
+        alpha_threshold: Pixels with alpha strictly greater than this count as part of the character.
+        include_regions: Also return every significant region ("regions") and per-frame
+            statistics ("stats") alongside the main hitbox.
 
     Returns:
-        A list of hitbox dictionaries, one for each frame. If no valid contour is found
+        A list of hitbox dictionaries, one for each frame. If no region is large enough
         for a frame, a zero-sized hitbox is returned for that frame.
     """
-    animation_hitboxes = []
     logger.info(f"Generating hitboxes for {len(frames)} animation frames...")
+    if not frames:
+        return []
 
-    for i, frame in enumerate(frames):
-        hitbox = {"x": 0, "y": 0, "width": 0, "height": 0} # Default empty hitbox
-        try:
-            # Convert PIL Image to a NumPy array that OpenCV can process.
-            # The image must be in RGBA format to have an alpha channel for contour detection.
-            if frame.mode != 'RGBA':
-                logger.warning(f"Frame {i} is not in RGBA mode. Converting...")
-                frame_rgba = frame.convert('RGBA')
-            else:
-                frame_rgba = frame
-
-            frame_np = np.array(frame_rgba)
-
-            # The alpha channel is the 4th channel in an RGBA image.
-            alpha_channel = frame_np[:, :, 3]
-
-            # Find contours in the alpha channel. cv2.RETR_EXTERNAL retrieves only the outer contours.
-            contours, _ = cv2.findContours(alpha_channel, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-            if not contours:
-                logger.warning(f"No contours found for frame {i}.")
-                animation_hitboxes.append(hitbox)
-                continue
-
-            # Find the largest contour by area to represent the main character body.
-            largest_contour = max(contours, key=cv2.contourArea)
-
-            if cv2.contourArea(largest_contour) < contour_area_threshold:
-                logger.warning(f"Largest contour in frame {i} is below the area threshold.")
-                animation_hitboxes.append(hitbox)
-                continue
-
-            # Calculate the bounding box for the largest contour.
-            x, y, w, h = cv2.boundingRect(largest_contour)
-            hitbox = {"x": int(x), "y": int(y), "width": int(w), "height": int(h)}
-            animation_hitboxes.append(hitbox)
-
-        except Exception as e:
-            logger.error(f"Failed to generate hitbox for frame {i}: {e}")
-            animation_hitboxes.append(hitbox) # Append default hitbox on error
+    frames_per_pass = max(1, MAX_PIXELS_PER_PASS // (frames[0].width * frames[0].height))
+    animation_hitboxes = []
+    for start in range(0, len(frames), frames_per_pass):
+        alpha = stack_alpha(frames[start:start + frames_per_pass])
+        animation_hitboxes.extend(
+            _chunk_hitboxes(alpha, start, contour_area_threshold, alpha_threshold, include_regions)
+        )
 
     logger.info(f"Successfully generated hitboxes for {len(animation_hitboxes)} frames.")
     return animation_hitboxes
+
+def generate_hitboxes_from_alpha(
+    alpha: np.ndarray,
+    contour_area_threshold: int = 100,
+    alpha_threshold: int = 0,
+    include_regions: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Same as `generate_hitboxes_for_animation`, for frames whose alpha channels are
+    already in one array, e.g. the alpha band of frames held in shared memory.
+
+    Args:
+        alpha: A (num_frames, height, width) uint8 array; may be a strided view.
+    """
+    num_frames, height, width = alpha.shape
+    frames_per_pass = max(1, MAX_PIXELS_PER_PASS // (width * height))
+    animation_hitboxes = []
+    for start in range(0, num_frames, frames_per_pass):
+        # OpenCV needs contiguous planes; only one chunk is copied at a time.
+        chunk = np.ascontiguousarray(alpha[start:start + frames_per_pass])
+        animation_hitboxes.extend(
+            _chunk_hitboxes(chunk, start, contour_area_threshold, alpha_threshold, include_regions)
+        )
+    return animation_hitboxes
+
+def _chunk_hitboxes(
+    alpha: np.ndarray,
+    start: int,
+    contour_area_threshold: int,
+    alpha_threshold: int,
+    include_regions: bool
+) -> List[Dict[str, Any]]:
+    """Hitboxes of one chunk of stacked alpha channels, whose first frame is frame `start`."""
+    mask = opaque_mask(alpha, alpha_threshold)
+    bounds = opaque_bounds(mask)
+    regions = find_regions(mask, area_threshold=contour_area_threshold, bounds=bounds)
+    stats = frame_stats(mask, bounds=bounds) if include_regions else None
+
+    hitboxes = []
+    for i, frame_regions in enumerate(regions):
+        if frame_regions:
+            largest = frame_regions[0]
+            hitbox = {key: largest[key] for key in ("x", "y", "width", "height")}
+        else:
+            logger.warning(f"No region above the area threshold found for frame {start + i}.")
+            hitbox = dict(EMPTY_HITBOX)
+
+        if include_regions:
+            hitbox["regions"] = frame_regions
+            hitbox["stats"] = {"num_regions": len(frame_regions), **stats[i]}
+        hitboxes.append(hitbox)
+    return hitboxes
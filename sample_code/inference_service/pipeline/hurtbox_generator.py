@@ -0,0 +1,129 @@
+import cv2
+import numpy as np
+import logging
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+
+from .hitbox_generator import Hitbox, opaque_mask, stack_alpha
+from .pose_extractor import PoseLandmarks
+
+logger = logging.getLogger(__name__)
+
+# Hurtboxes for one frame, keyed by body part.
+FrameHurtboxes = Dict[str, Hitbox]
+
+# MediaPipe Pose landmark indices that make up each body part.
+BODY_PARTS: Dict[str, Tuple[int, ...]] = {
+    "head": (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10),
+    "torso": (11, 12, 23, 24),
+    "left_arm": (11, 13, 15, 17, 19, 21),
+    "right_arm": (12, 14, 16, 18, 20, 22),
+    "left_leg": (23, 25, 27, 29, 31),
+    "right_leg": (24, 26, 28, 30, 32),
+}
+
+# How far each part's landmark box is grown, as a fraction of the body scale (the
+# shoulder width). Landmarks sit on joints and facial features, so limbs need some
+# thickness and the head needs to reach the skull.
+PART_PADDING: Dict[str, float] = {
+    "head": 0.35,
+    "torso": 0.1,
+    "left_arm": 0.15,
+    "right_arm": 0.15,
+    "left_leg": 0.15,
+    "right_leg": 0.15,
+}
+
+MIN_VISIBILITY = 0.5
+
+# A part needs this many visible landmarks; a limb whose only visible landmark is
+# the shoulder or hip it shares with the torso is treated as hidden.
+MIN_PART_LANDMARKS = 2
+
+def _body_scale(points: np.ndarray, visible: np.ndarray, frame_width: int) -> float:
+    """The shoulder width in pixels, or a fixed fraction of the frame when a shoulder is hidden."""
+    if visible[11] and visible[12]:
+        return max(float(np.linalg.norm(points[11] - points[12])), 1.0)
+    return frame_width * 0.15
+
+def limb_hurtboxes(
+    landmarks: Optional[PoseLandmarks],
+    mask: np.ndarray,
+    min_visibility: float = MIN_VISIBILITY
+) -> FrameHurtboxes:
+    """
+    Derives one box per body part from a frame's pose landmarks, tightened to the
+    opaque pixels of the character.
+
+    Each part's visible landmarks are boxed and padded, then shrunk to the bounding
+    rectangle of the opaque pixels inside that box. Parts with too few visible
+    landmarks, or whose box contains no opaque pixels, are omitted.
+
+    Args:
+        landmarks: The frame's normalised pose landmarks, or None if no pose was detected.
+        mask: The frame's (height, width) uint8 mask; non-zero pixels are opaque.
+        min_visibility: The minimum landmark visibility for a landmark to be used.
+
+    Returns:
+        A dictionary of hitbox dictionaries keyed by body part name.
+    """
+    if not landmarks:
+        return {}
+    height, width = mask.shape
+    coords = np.array([(lm["x"], lm["y"], lm["visibility"]) for lm in landmarks], dtype=np.float32)
+    points = coords[:, :2] * (width, height)
+    visible = coords[:, 2] >= min_visibility
+    scale = _body_scale(points, visible, width)
+
+    hurtboxes: FrameHurtboxes = {}
+    for part, indices in BODY_PARTS.items():
+        indices = [i for i in indices if i < len(points) and visible[i]]
+        if len(indices) < MIN_PART_LANDMARKS:
+            continue
+        pad = PART_PADDING[part] * scale
+        x0, y0 = np.floor(points[indices].min(axis=0) - pad).astype(int)
+        x1, y1 = np.ceil(points[indices].max(axis=0) + pad).astype(int)
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, width), min(y1, height)
+        if x1 <= x0 or y1 <= y0:
+            continue
+        x, y, w, h = cv2.boundingRect(mask[y0:y1, x0:x1])
+        if w == 0 or h == 0:
+            continue
+        hurtboxes[part] = {"x": int(x0 + x), "y": int(y0 + y), "width": w, "height": h}
+    return hurtboxes
+
+def generate_hurtboxes_for_animation(
+    frames: List[Image.Image],
+    poses: List[Optional[PoseLandmarks]],
+    alpha_threshold: int = 0,
+    min_visibility: float = MIN_VISIBILITY
+) -> List[FrameHurtboxes]:
+    """
+    Generates per-body-part hurtboxes for a sequence of animation frames.
+
+    Args:
+        frames: A list of PIL Image objects, expected to be in RGBA format.
+        poses: The pose landmarks of each frame (None where no pose was detected),
+            e.g. from `pose_extractor.extract_poses`.
+        alpha_threshold: Pixels with alpha strictly greater than this count as part of the character.
+        min_visibility: The minimum landmark visibility for a landmark to be used.
+
+    Returns:
+        One dictionary of body part hurtboxes per frame; empty for frames without a pose.
+    """
+    if len(frames) != len(poses):
+        raise ValueError(f"Got {len(poses)} poses for {len(frames)} frames.")
+    logger.info(f"Generating limb hurtboxes for {len(frames)} animation frames...")
+    if not frames:
+        return []
+
+    mask = opaque_mask(stack_alpha(frames), alpha_threshold)
+    hurtboxes = [
+        limb_hurtboxes(landmarks, frame_mask, min_visibility=min_visibility)
+        for landmarks, frame_mask in zip(poses, mask)
+    ]
+    missing = sum(1 for boxes in hurtboxes if not boxes)
+    if missing:
+        logger.warning(f"No pose-derived hurtboxes for {missing}/{len(frames)} frames.")
+    return hurtboxes
@@ -0,0 +1,63 @@
+import base64
+import io
+import logging
+from typing import List
+
+import torch
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Linear approximation of the Stable Diffusion 1.x VAE decoder: each of the 4 latent
+# channels contributes a fixed RGB colour. Good enough to show composition and motion
+# while denoising, at 1/8 of the output resolution and no VAE cost.
+LATENT_RGB_FACTORS = (
+    (0.3512, 0.2297, 0.3227),
+    (0.3250, 0.4974, 0.2350),
+    (-0.2829, 0.1762, 0.2721),
+    (-0.2120, -0.2616, -0.7177),
+)
+
+def latents_to_frames(latents: torch.Tensor) -> List[Image.Image]:
+    """
+    Approximates the frames of one animation from its latents.
+
+    Args:
+        latents: A (channels, frames, height, width) latent tensor of a single animation.
+
+    Returns:
+        One RGB image per frame, at the latent resolution (1/8 of the output size).
+    """
+    factors = torch.tensor(LATENT_RGB_FACTORS, dtype=torch.float32)
+    rgb = torch.einsum("cfhw,cr->fhwr", latents.detach().float().cpu(), factors)
+    pixels = ((rgb + 1.0) * 127.5).clamp(0, 255).to(torch.uint8).numpy()
+    return [Image.fromarray(frame, mode="RGB") for frame in pixels]
+
+def preview_strip(frames: List[Image.Image]) -> Image.Image:
+    """Lays preview frames out left to right in a single image."""
+    width, height = frames[0].size
+    strip = Image.new("RGB", (width * len(frames), height))
+    for i, frame in enumerate(frames):
+        strip.paste(frame, (i * width, 0))
+    return strip
+
+def to_data_url(image: Image.Image) -> str:
+    """Encodes an image as a base64 PNG data URL, for embedding in JSON events."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=1)
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+def preview_event(latents: torch.Tensor, step: int, total_steps: int) -> dict:
+    """
+    Builds the payload of a "preview" job event: the animation's frames side by side as
+    one low-resolution PNG.
+    """
+    frames = latents_to_frames(latents)
+    return {
+        "step": step,
+        "total_steps": total_steps,
+        "num_frames": len(frames),
+        "frame_width": frames[0].width,
+        "frame_height": frames[0].height,
+        "image": to_data_url(preview_strip(frames)),
+    }
@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ModelEntry:
+    """
+    A single resident model held by the registry, along with the bookkeeping
+    needed to report what a worker is currently holding.
+    """
+    key: Hashable
+    model: Any
+    load_seconds: float
+    resident_bytes: int
+    loaded_at: float = field(default_factory=time.time)
+    last_used_at: float = field(default_factory=time.time)
+    use_count: int = 0
+    pinned: bool = False
+
+    def describe(self) -> Dict[str, Any]:
+        """Returns a JSON-serialisable summary of this entry."""
+        return {
+            "key": list(self.key) if isinstance(self.key, tuple) else self.key,
+            "load_seconds": round(self.load_seconds, 3),
+            "resident_bytes": self.resident_bytes,
+            "resident_mb": round(self.resident_bytes / 1024**2, 1),
+            "loaded_at": self.loaded_at,
+            "last_used_at": self.last_used_at,
+            "use_count": self.use_count,
+            "pinned": self.pinned,
+        }
+
+class ModelRegistry:
+    """
+    A process-wide, thread-safe registry of loaded models keyed by variant.
+
+    Each key is loaded at most once: concurrent requests for a key that is still
+    loading wait for the first load to finish instead of starting their own.
+    The registry is intended to be populated at application startup and cleared
+    at shutdown, so that requests never pay the model loading cost.
+
+    Preloaded models are pinned. With `max_models` set, other variants are loaded on
+    demand and the least recently used of them is unloaded to make room for the next,
+    unless a caller still holds it (see `hold`).
+    """
+    def __init__(
+        self,
+        loader: Callable[[Hashable], Any],
+        size_of: Optional[Callable[[Any], int]] = None,
+        unloader: Optional[Callable[[Any], None]] = None,
+        max_models: Optional[int] = None,
+    ):
+        """
+        Args:
+            loader: Builds the model for a given key.
+            size_of: Returns the resident size in bytes of a loaded model.
+            unloader: Releases any resources held by a model when it is evicted.
+            max_models: The most models kept loaded, pinned ones included; None for no limit.
+        """
+        self._loader = loader
+        self._size_of = size_of
+        self._unloader = unloader
+        self._max_models = max_models
+        self._entries: Dict[Hashable, ModelEntry] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._pinned: Set[Hashable] = set()
+        self._holds: Dict[Hashable, int] = {}
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Returns the model for `key`, loading it first if it is not yet resident.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+        if entry is None:
+            with key_lock:
+                # Another thread may have finished loading while we were waiting.
+                with self._lock:
+                    entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._load(key)
+        with self._lock:
+            entry.last_used_at = time.time()
+            entry.use_count += 1
+        return entry.model
+
+    def preload(self, keys: List[Hashable]) -> None:
+        """Loads every key in `keys` that is not already resident and pins it, so it is never evicted."""
+        for key in keys:
+            with self._lock:
+                self._pinned.add(key)
+                if key in self._entries:
+                    self._entries[key].pinned = True
+            self.get(key)
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        """Keeps the model for `key` from being evicted for the duration of the block, e.g. while it runs."""
+        with self._lock:
+            self._holds[key] = self._holds.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._holds[key] -= 1
+                if self._holds[key] == 0:
+                    del self._holds[key]
+            # Models kept over the limit because they were held can go now.
+            self._evict_to(self._max_models)
+
+    def set_max_models(self, max_models: Optional[int]) -> None:
+        """Changes the model limit, unloading idle models above a lowered one."""
+        with self._lock:
+            self._max_models = max_models
+        self._evict_to(max_models)
+
+    def is_loaded(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def unload(self, key: Hashable) -> bool:
+        """
+        Removes a model from the registry. Returns True if it was resident.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._release(entry)
+        return True
+
+    def clear(self) -> None:
+        """Unloads every resident model, e.g. on application shutdown."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._release(entry)
+        logger.info(f"Model registry cleared ({len(entries)} model(s) released).")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns load time and resident memory for every resident model."""
+        with self._lock:
+            entries = [entry.describe() for entry in self._entries.values()]
+            max_models, evictions = self._max_models, self._evictions
+        return {
+            "num_models": len(entries),
+            "max_models": max_models,
+            "evictions": evictions,
+            "total_resident_bytes": sum(e["resident_bytes"] for e in entries),
+            "models": entries,
+        }
+
+    def _load(self, key: Hashable) -> ModelEntry:
+        if self._max_models is not None:
+            # Free the memory before loading, not after.
+            self._evict_to(self._max_models - 1)
+        logger.info(f"Loading model variant {key} into the registry...")
+        start = time.perf_counter()
+        model = self._loader(key)
+        load_seconds = time.perf_counter() - start
+        resident_bytes = 0
+        if self._size_of is not None:
+            try:
+                resident_bytes = int(self._size_of(model))
+            except Exception as e:
+                logger.warning(f"Could not measure resident size of model {key}: {e}")
+        entry = ModelEntry(key=key, model=model, load_seconds=load_seconds, resident_bytes=resident_bytes)
+        with self._lock:
+            entry.pinned = key in self._pinned
+            self._entries[key] = entry
+            if self._max_models is not None and len(self._entries) > self._max_models:
+                logger.warning(
+                    f"{len(self._entries)} models loaded, more than the limit of {self._max_models}: "
+                    f"the others are pinned or in use."
+                )
+        logger.info(
+            f"Model variant {key} loaded in {load_seconds:.2f}s "
+            f"({resident_bytes / 1024**2:.1f}MB resident)."
+        )
+        return entry
+
+    def _release(self, entry: ModelEntry) -> None:
+        if self._unloader is None:
+            return
+        try:
+            self._unloader(entry.model)
+        except Exception as e:
+            logger.warning(f"Failed to release model {entry.key}: {e}")
+
+    def _evict_to(self, limit: Optional[int]) -> None:
+        """Unloads least recently used models that are neither pinned nor held until at most `limit` remain."""
+        if limit is None:
+            return
+        evicted: List[ModelEntry] = []
+        with self._lock:
+            while len(self._entries) > max(0, limit):
+                idle = [
+                    entry for key, entry in self._entries.items()
+                    if key not in self._pinned and key not in self._holds
+                ]
+                if not idle:
+                    break
+                victim = min(idle, key=lambda entry: entry.last_used_at)
+                del self._entries[victim.key]
+                self._evictions += 1
+                evicted.append(victim)
+        for entry in evicted:
+            logger.info(f"Unloading least recently used model variant {entry.key} to stay within the model limit.")
+            self._release(entry)
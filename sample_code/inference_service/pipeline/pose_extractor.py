@@ -1,28 +1,220 @@
 import cv2
 import mediapipe as mp
+import numpy as np
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional, Union
+from PIL import Image
 
 logger = logging.getLogger(__name__)
 
 # Define a type alias for pose landmarks for clarity
 PoseLandmarks = List[Dict[str, float]]
 
-def extract_pose(image_path: Path) -> Optional[PoseLandmarks]:
+# An image accepted by the in-memory API: a PIL image or an RGB/RGBA NumPy array.
+ImageInput = Union[Image.Image, np.ndarray]
+
+# MediaPipe offers three model complexities: 0 (lite), 1 (full) and 2 (heavy).
+MODEL_COMPLEXITIES = (0, 1, 2)
+DEFAULT_MODEL_COMPLEXITY = 2
+
+class PosePool:
+    """
+    A fixed-size pool of pre-initialised MediaPipe Pose estimators for one model complexity.
+
+    A Pose instance is not safe to share between threads, so each caller borrows
+    one for the duration of its work. Estimators are created lazily up to `size`
+    and kept for the lifetime of the pool, so the graph is initialised once per slot.
+    """
+    def __init__(self, model_complexity: int, size: int = 1):
+        if model_complexity not in MODEL_COMPLEXITIES:
+            raise ValueError(f"model_complexity must be one of {MODEL_COMPLEXITIES}, got {model_complexity}.")
+        self.model_complexity = model_complexity
+        self.size = max(1, size)
+        self._idle: "queue.Queue" = queue.Queue()
+        self._all: List = []
+        self._lock = threading.Lock()
+
+    def _create_estimator(self):
+        logger.info(f"Initialising MediaPipe Pose estimator (model complexity {self.model_complexity}).")
+        return mp.solutions.pose.Pose(
+            static_image_mode=True,
+            model_complexity=self.model_complexity,
+            enable_segmentation=False
+        )
+
+    @contextmanager
+    def estimator(self) -> Iterator:
+        """Borrows an estimator from the pool, creating one if the pool is not yet full."""
+        try:
+            pose = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                pose = self._create_estimator() if len(self._all) < self.size else None
+                if pose is not None:
+                    self._all.append(pose)
+            if pose is None:
+                pose = self._idle.get()
+        try:
+            yield pose
+        finally:
+            self._idle.put(pose)
+
+    def warm_up(self) -> None:
+        """Creates the first estimator ahead of time so the first job does not pay for it."""
+        with self.estimator():
+            pass
+
+    def close(self) -> None:
+        """Releases every estimator's graph resources."""
+        with self._lock:
+            estimators, self._all = self._all, []
+        self._idle = queue.Queue()
+        for pose in estimators:
+            pose.close()
+
+# --- Process-wide estimator pools ---
+
+_pool_size = 1
+_default_complexity = DEFAULT_MODEL_COMPLEXITY
+_pools: Dict[int, PosePool] = {}
+_pools_lock = threading.Lock()
+
+def configure(pool_size: int = 1, model_complexity: int = DEFAULT_MODEL_COMPLEXITY) -> None:
+    """
+    Sets the pool size and the default model complexity. Existing pools are closed
+    so the new settings take effect.
+
+    Args:
+        pool_size: The number of estimators kept per complexity; usually the number of job workers.
+        model_complexity: The complexity used when a call does not specify one.
+    """
+    global _pool_size, _default_complexity
+    if model_complexity not in MODEL_COMPLEXITIES:
+        raise ValueError(f"model_complexity must be one of {MODEL_COMPLEXITIES}, got {model_complexity}.")
+    close_pools()
+    with _pools_lock:
+        _pool_size = pool_size
+        _default_complexity = model_complexity
+
+def default_model_complexity() -> int:
+    """The model complexity used when a call does not specify one."""
+    return _default_complexity
+
+def get_pose_pool(model_complexity: Optional[int] = None) -> PosePool:
+    """Returns the shared estimator pool for a model complexity, creating it on first use."""
+    if model_complexity is None:
+        model_complexity = _default_complexity
+    with _pools_lock:
+        pool = _pools.get(model_complexity)
+        if pool is None:
+            pool = PosePool(model_complexity, size=_pool_size)
+            _pools[model_complexity] = pool
+        return pool
+
+def close_pools() -> None:
+    """Closes every estimator pool, e.g. on application shutdown."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+# --- In-memory API ---
+
+def _to_rgb_array(image: ImageInput) -> np.ndarray:
+    """Converts an input image to the contiguous RGB uint8 array MediaPipe expects."""
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert('RGB'))
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    return np.ascontiguousarray(image[:, :, :3])
+
+def _process(pose, image_rgb: np.ndarray) -> Optional[PoseLandmarks]:
+    results = pose.process(image_rgb)
+    if not results.pose_landmarks:
+        return None
+    return [
+        {
+            "x": landmark.x,
+            "y": landmark.y,
+            "z": landmark.z,
+            "visibility": landmark.visibility,
+        }
+        for landmark in results.pose_landmarks.landmark
+    ]
+
+def extract_pose_from_array(image: ImageInput, model_complexity: Optional[int] = None) -> Optional[PoseLandmarks]:
+    """
+    Extracts pose landmarks from an in-memory image with a pooled estimator.
+
+    Args:
+        image: A PIL image or an RGB/RGBA NumPy array.
+        model_complexity: 0 (lite), 1 (full) or 2 (heavy); defaults to the configured complexity.
+
+    Returns:
+        A list of landmark dictionaries (containing x, y, z, visibility),
+        or None if no pose is detected.
+    """
+    image_rgb = _to_rgb_array(image)
+    with get_pose_pool(model_complexity).estimator() as pose:
+        return _process(pose, image_rgb)
+
+def extract_poses(images: List[ImageInput], model_complexity: Optional[int] = None) -> List[Optional[PoseLandmarks]]:
+    """
+    Extracts pose landmarks from many in-memory images.
+
+    The images are split across the estimators in the pool and processed in
+    parallel; MediaPipe releases the GIL while its graph runs.
+
+    Args:
+        images: PIL images or RGB/RGBA NumPy arrays.
+        model_complexity: 0 (lite), 1 (full) or 2 (heavy); defaults to the configured complexity.
+
+    Returns:
+        One landmark list (or None when no pose is detected) per image, in input order.
+    """
+    if not images:
+        return []
+    pool = get_pose_pool(model_complexity)
+    arrays = [_to_rgb_array(image) for image in images]
+    num_chunks = min(pool.size, len(arrays))
+    chunks = [list(range(i, len(arrays), num_chunks)) for i in range(num_chunks)]
+    results: List[Optional[PoseLandmarks]] = [None] * len(arrays)
+
+    def run_chunk(indices: List[int]) -> None:
+        with pool.estimator() as pose:
+            for i in indices:
+                results[i] = _process(pose, arrays[i])
+
+    if num_chunks == 1:
+        run_chunk(chunks[0])
+    else:
+        with ThreadPoolExecutor(max_workers=num_chunks) as executor:
+            list(executor.map(run_chunk, chunks))
+
+    detected = sum(1 for r in results if r)
+    logger.info(f"Extracted poses for {detected}/{len(results)} image(s) (model complexity {pool.model_complexity}).")
+    return results
+
+# --- File-based API ---
+
+def extract_pose(image_path: Path, model_complexity: Optional[int] = None) -> Optional[PoseLandmarks]:
     """
     Extracts pose landmarks from an image using MediaPipe Pose.
 
     Args:
         image_path: Path to the input image file.
+        model_complexity: 0 (lite), 1 (full) or 2 (heavy); defaults to the configured complexity.
 
     Returns:
         A list of landmark dictionaries (containing x, y, z, visibility),
         or None if no pose is detected.
     """
-    mp_pose = mp.solutions.pose
-    pose_landmarks = []
-
     try:
         logger.info(f"Extracting pose from '{image_path}'...")
         image = cv2.imread(str(image_path))
@@ -33,24 +225,13 @@ def extract_pose(image_path: Path) -> Optional[PoseLandmarks]:
         # MediaPipe processes RGB images, but OpenCV reads them in BGR format.
         image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
-        # Initialize MediaPipe Pose with high complexity for better accuracy on static images.
-        with mp_pose.Pose(static_image_mode=True, model_complexity=2, enable_segmentation=False) as pose:
-            results = pose.process(image_rgb)
-
-            if not results.pose_landmarks:
-                logger.warning(f"No pose detected in image '{image_path}'.")
-                return None
-
-            for landmark in results.pose_landmarks.landmark:
-                pose_landmarks.append({
-                    "x": landmark.x,
-                    "y": landmark.y,
-                    "z": landmark.z,
-                    "visibility": landmark.visibility,
-                })
+        pose_landmarks = extract_pose_from_array(image_rgb, model_complexity=model_complexity)
+        if not pose_landmarks:
+            logger.warning(f"No pose detected in image '{image_path}'.")
+            return None
 
-            logger.info(f"Successfully extracted {len(pose_landmarks)} landmarks from '{image_path}'.")
-            return pose_landmarks
+        logger.info(f"Successfully extracted {len(pose_landmarks)} landmarks from '{image_path}'.")
+        return pose_landmarks
 
     except Exception as e:
         logger.error(f"An unexpected error occurred during pose extraction: {e}")
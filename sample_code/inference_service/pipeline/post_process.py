@@ -0,0 +1,131 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+import numpy as np
+from PIL import Image
+
+from pipeline import hitbox_generator
+from utils import encoder, image_utils, shared_frames
+
+logger = logging.getLogger(__name__)
+
+# --- Worker entry points ---
+# These run in the pool's processes. They receive only a handle to the frames in shared
+# memory, never the images themselves, and return small results (boxes, file metadata).
+
+def _hitboxes_worker(handle: shared_frames.FramesHandle, alpha_threshold: int, include_regions: bool) -> List[dict]:
+    with shared_frames.attach(handle) as frames:
+        if handle.mode == "RGBA":
+            alpha = frames[..., 3]
+        else:
+            # Frames without alpha are fully opaque, as if converted to RGBA.
+            alpha = np.full(handle.shape[:3], 255, dtype=np.uint8)
+        hitboxes = hitbox_generator.generate_hitboxes_from_alpha(
+            alpha, alpha_threshold=alpha_threshold, include_regions=include_regions
+        )
+        del alpha, frames
+    return hitboxes
+
+def _sprite_sheet_worker(
+    handle: shared_frames.FramesHandle,
+    columns: int,
+    path: Path,
+    fmt: str,
+    preset: str
+) -> encoder.EncodedFile:
+    with shared_frames.attach(handle) as frames:
+        images = shared_frames.to_images(frames)
+        del frames
+    sheet = image_utils.create_sprite_sheet(images, columns=columns)
+    return encoder.encode_image(sheet, path, fmt, preset)
+
+# --- Shared process pool ---
+
+_max_workers = 0
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def configure(max_workers: int = 0) -> None:
+    """
+    Sets the number of post-processing processes; 0 keeps post-processing on the
+    calling thread. The pool is recreated on next use.
+    """
+    global _max_workers
+    shutdown()
+    with _executor_lock:
+        _max_workers = max(0, max_workers)
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    with _executor_lock:
+        if _executor is None and _max_workers > 0:
+            # "spawn" keeps the workers free of the parent's threads, CUDA context and
+            # loaded models; they import only the post-processing modules.
+            _executor = ProcessPoolExecutor(
+                max_workers=_max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def shutdown() -> None:
+    """Shuts the process pool down, e.g. on application shutdown."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+def _run_shared(frames: List[Image.Image], worker: Callable[..., Any], *args: Any) -> Any:
+    """
+    Runs `worker` on the pool over a shared-memory copy of `frames`. Returns None when
+    the pool is disabled or the frames cannot be shared, so the caller runs in-thread.
+    """
+    global _executor
+    executor = _get_executor()
+    if executor is None or not shared_frames.can_share(frames):
+        return None
+    with shared_frames.SharedFrames(frames) as shared:
+        try:
+            return executor.submit(worker, shared.handle, *args).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool for later jobs.
+            logger.error("Post-processing process pool broke; running this stage in-thread.", exc_info=True)
+            with _executor_lock:
+                if _executor is executor:
+                    _executor = None
+            executor.shutdown(wait=False)
+            return None
+
+def generate_hitboxes(frames: List[Image.Image], alpha_threshold: int = 0, include_regions: bool = False) -> List[dict]:
+    """
+    `hitbox_generator.generate_hitboxes_for_animation`, on the process pool when it is
+    enabled so region labelling does not compete for the GIL with other jobs' stages.
+    """
+    if frames:
+        hitboxes = _run_shared(frames, _hitboxes_worker, alpha_threshold, include_regions)
+        if hitboxes is not None:
+            return hitboxes
+    return hitbox_generator.generate_hitboxes_for_animation(
+        frames, alpha_threshold=alpha_threshold, include_regions=include_regions
+    )
+
+def assemble_sprite_sheet(
+    frames: List[Image.Image],
+    columns: int,
+    path: Path,
+    fmt: str = encoder.DEFAULT_FORMAT,
+    preset: str = encoder.DEFAULT_PRESET
+) -> encoder.EncodedFile:
+    """
+    Lays the frames out as a grid sprite sheet and encodes it to `path`, on the process
+    pool when it is enabled. Palette quantisation (png8) holds the GIL, so it benefits most.
+    """
+    if frames:
+        encoded = _run_shared(frames, _sprite_sheet_worker, columns, path, fmt, preset)
+        if encoded is not None:
+            return encoded
+    sheet = image_utils.create_sprite_sheet(frames, columns=columns)
+    return encoder.encode_images([(sheet, path)], fmt=fmt, preset=preset)[0]
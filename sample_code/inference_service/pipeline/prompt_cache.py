@@ -0,0 +1,97 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Tuple, Union
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+
+# Encodes a batch of prompt strings into text-encoder hidden states, one row per string.
+Encoder = Callable[[List[str]], torch.Tensor]
+
+class PromptEmbeddingCache:
+    """
+    An LRU cache of text-encoder outputs keyed by (model id, prompt string).
+
+    Character and motion prompts repeat across jobs, and the negative prompt is the
+    same on every call, so most generations can skip the text encoder entirely. The
+    cached tensors stay on the encoder's device (about 120KB each in float16 for
+    SD 1.5), so `max_entries` bounds the memory held.
+    """
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, str], torch.Tensor]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_embeddings(self, model_key: Hashable, prompts: List[str], encode: Encoder) -> torch.Tensor:
+        """
+        Returns the stacked embeddings of `prompts`, encoding only the strings not yet cached.
+
+        Args:
+            model_key: Identifies the text encoder the embeddings belong to (e.g. the base model id).
+            prompts: The prompt strings; duplicates are encoded once.
+            encode: Called with the missing strings; must return one embedding row per string.
+
+        Returns:
+            A (len(prompts), sequence_length, hidden_size) tensor in prompt order.
+        """
+        found: Dict[str, torch.Tensor] = {}
+        with self._lock:
+            for prompt in prompts:
+                key = (model_key, prompt)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[prompt] = self._entries[key]
+        missing = list(dict.fromkeys(p for p in prompts if p not in found))
+
+        if missing:
+            # Encoded outside the lock so other jobs can keep reading the cache.
+            encoded = encode(missing)
+            with self._lock:
+                for prompt, embedding in zip(missing, encoded):
+                    embedding = embedding.unsqueeze(0)
+                    found[prompt] = embedding
+                    self._put((model_key, prompt), embedding)
+
+        with self._lock:
+            self._hits += len(prompts) - len(missing)
+            self._misses += len(missing)
+        return torch.cat([found[p] for p in prompts])
+
+    def _put(self, key: Tuple[Hashable, str], embedding: torch.Tensor) -> None:
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def resize(self, max_entries: int) -> None:
+        """Changes the capacity, evicting the least recently used entries if needed."""
+        with self._lock:
+            self.max_entries = max_entries
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Reports the number of cached prompts and the lookup counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
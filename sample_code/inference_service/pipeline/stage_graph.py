@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CPU = "cpu"
+GPU = "gpu"
+
+# A stage function receives the results of its dependencies, keyed by stage name.
+StageFn = Callable[[Dict[str, Any]], Any]
+
+class StageTimeoutError(RuntimeError):
+    """Raised when a stage runs longer than its timeout."""
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One node of a pipeline graph.
+
+    Attributes:
+        name: Unique name of the stage; its result is stored under this name.
+        fn: Called with the results of `deps` once they are all available.
+        deps: Names of the stages that must finish before this one starts.
+        resource: Which executor pool runs the stage: `CPU` or `GPU`.
+        timeout: Maximum seconds the stage may run once started, or None for no limit.
+    """
+    name: str
+    fn: StageFn
+    deps: Tuple[str, ...] = ()
+    resource: str = CPU
+    timeout: Optional[float] = None
+
+class StageExecutor:
+    """
+    The thread pools that stages run on, shared by every job in the process.
+
+    GPU stages go to a small dedicated pool so that at most `gpu_workers` of them
+    run at once, while CPU stages of other jobs keep the CPU pool busy. Sharing one
+    executor across job workers is what lets job N's CPU post-processing overlap
+    job N+1's generation.
+    """
+    def __init__(self, cpu_workers: int = 4, gpu_workers: int = 1):
+        self.cpu_workers = cpu_workers
+        self.gpu_workers = gpu_workers
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, resource: str, fn: Callable[..., Any], *args: Any) -> Future:
+        with self._lock:
+            pool = self._pools.get(resource)
+            if pool is None:
+                workers = self.gpu_workers if resource == GPU else self.cpu_workers
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{resource}-stage")
+                self._pools[resource] = pool
+        return pool.submit(fn, *args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shuts the pools down. They are recreated if the executor is used again."""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.shutdown(wait=wait)
+
+class StageGraph:
+    """
+    A dependency graph of pipeline stages, run with as much concurrency as the
+    dependencies allow.
+    """
+    def __init__(self, stages: List[Stage]):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique.")
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'.")
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        remaining = {name: set(stage.deps) for name, stage in self.stages.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Stage graph has a cycle among: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def run(
+        self,
+        executor: StageExecutor,
+        on_stage_complete: Optional[Callable[[str, float], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Runs every stage and returns their results keyed by stage name.
+
+        A stage is submitted as soon as all of its dependencies have finished. If a
+        stage fails or exceeds its timeout, no further stages are started and the
+        error is raised; stages already running are left to finish in the background.
+
+        Args:
+            executor: The shared pools to run stages on.
+            on_stage_complete: Optional callback receiving each stage's name and duration in seconds.
+        """
+        results: Dict[str, Any] = {}
+        started_at: Dict[str, float] = {}
+        running: Dict[Future, Stage] = {}
+        pending = dict(self.stages)
+
+        def run_stage(stage: Stage, inputs: Dict[str, Any]) -> Tuple[Any, float]:
+            start = time.monotonic()
+            started_at[stage.name] = start
+            result = stage.fn(inputs)
+            return result, time.monotonic() - start
+
+        while pending or running:
+            for name in [n for n, s in pending.items() if all(d in results for d in s.deps)]:
+                stage = pending.pop(name)
+                inputs = {dep: results[dep] for dep in stage.deps}
+                running[executor.submit(stage.resource, run_stage, stage, inputs)] = stage
+
+            done, _ = wait(list(running), timeout=self._next_timeout(running, started_at), return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name], duration = future.result()
+                except Exception:
+                    self._cancel(running)
+                    logger.error(f"Stage '{stage.name}' failed.")
+                    raise
+                if on_stage_complete is not None:
+                    on_stage_complete(stage.name, duration)
+
+            now = time.monotonic()
+            for future, stage in list(running.items()):
+                start = started_at.get(stage.name)
+                if stage.timeout is not None and start is not None and now - start > stage.timeout:
+                    self._cancel(running)
+                    raise StageTimeoutError(f"Stage '{stage.name}' exceeded its {stage.timeout}s timeout.")
+        return results
+
+    @staticmethod
+    def _next_timeout(running: Dict[Future, Stage], started_at: Dict[str, float]) -> Optional[float]:
+        """Seconds until the earliest running stage hits its timeout, polling stages not yet started."""
+        now = time.monotonic()
+        deadlines = []
+        for stage in running.values():
+            if stage.timeout is None:
+                continue
+            start = started_at.get(stage.name)
+            # A stage still queued behind other jobs has not started its clock yet.
+            deadlines.append(0.5 if start is None else max(0.0, start + stage.timeout - now))
+        return min(deadlines) if deadlines else None
+
+    @staticmethod
+    def _cancel(running: Dict[Future, Stage]) -> None:
+        for future in running:
+            future.cancel()
@@ -0,0 +1,158 @@
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+import torch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline import animator
+
+# --- Test Cases ---
+
+def test_lightning_adapter_ids_round_trip():
+    for steps in animator.LIGHTNING_STEPS:
+        assert animator.parse_lightning_adapter_id(animator.lightning_adapter_id(steps)) == steps
+    assert animator.parse_lightning_adapter_id(animator.DEFAULT_MOTION_ADAPTER_ID) is None
+    with pytest.raises(ValueError):
+        animator.lightning_adapter_id(3)
+
+@patch('pipeline.animator.EulerDiscreteScheduler')
+@patch('pipeline.animator.AnimateDiffPipeline')
+@patch('pipeline.animator.MotionAdapter')
+@patch('pipeline.animator.load_file')
+@patch('pipeline.animator.hf_hub_download')
+def test_lightning_variant_loads_distilled_weights_and_trailing_scheduler(
+    mock_download: MagicMock,
+    mock_load_file: MagicMock,
+    mock_adapter_cls: MagicMock,
+    mock_pipeline_cls: MagicMock,
+    mock_scheduler_cls: MagicMock
+):
+    mock_download.return_value = "/hf-cache/lightning.safetensors"
+    original_config = mock_pipeline_cls.from_pretrained.return_value.scheduler.config
+
+    instance = animator.Animator(motion_adapter_id=animator.lightning_adapter_id(4))
+
+    assert instance.lightning_steps == 4
+    mock_download.assert_called_once_with(
+        animator.LIGHTNING_REPO_ID, "animatediff_lightning_4step_diffusers.safetensors"
+    )
+    mock_adapter_cls.return_value.load_state_dict.assert_called_once_with(mock_load_file.return_value)
+    mock_adapter_cls.from_pretrained.assert_not_called()
+    mock_scheduler_cls.from_config.assert_called_once_with(
+        original_config, timestep_spacing="trailing", beta_schedule="linear"
+    )
+    assert instance.pipe.scheduler is mock_scheduler_cls.from_config.return_value
+
+@patch('pipeline.animator.EulerDiscreteScheduler')
+@patch('pipeline.animator.AnimateDiffPipeline')
+@patch('pipeline.animator.MotionAdapter')
+@patch('pipeline.animator.hf_hub_download')
+def test_quality_variant_keeps_the_pretrained_adapter_and_scheduler(
+    mock_download: MagicMock,
+    mock_adapter_cls: MagicMock,
+    mock_pipeline_cls: MagicMock,
+    mock_scheduler_cls: MagicMock
+):
+    instance = animator.Animator()
+
+    assert instance.lightning_steps is None
+    mock_adapter_cls.from_pretrained.assert_called_once_with(animator.DEFAULT_MOTION_ADAPTER_ID)
+    mock_download.assert_not_called()
+    mock_scheduler_cls.from_config.assert_not_called()
+
+@patch('pipeline.animator.prompt_cache', new_callable=lambda: animator.PromptEmbeddingCache())
+@patch('pipeline.animator.AnimateDiffPipeline')
+@patch('pipeline.animator.MotionAdapter')
+def test_generation_reuses_cached_prompt_embeddings(
+    mock_adapter_cls: MagicMock,
+    mock_pipeline_cls: MagicMock,
+    mock_cache: animator.PromptEmbeddingCache
+):
+    pipe = mock_pipeline_cls.from_pretrained.return_value
+    pipe.encode_prompt.side_effect = lambda prompts, *args, **kwargs: (torch.zeros(len(prompts), 77, 8), None)
+    pipe.return_value.frames = [[MagicMock()]]
+
+    instance = animator.Animator()
+    instance.generate_batch([("walking", "a knight")], guidance_scale=7.5)
+    instance.generate_batch([("walking", "a knight")], guidance_scale=7.5)
+
+    # The positive and negative prompts are encoded on the first call only.
+    assert pipe.encode_prompt.call_count == 2
+    kwargs = pipe.call_args.kwargs
+    assert "prompt" not in kwargs
+    assert kwargs["prompt_embeds"].shape == (1, 77, 8)
+    assert kwargs["negative_prompt_embeds"].shape == (1, 77, 8)
+    assert mock_cache.stats()["hits"] == 2
+
+    # Without classifier-free guidance no negative embeddings are computed.
+    instance.generate_batch([("walking", "a knight")], guidance_scale=1.0)
+    assert pipe.call_args.kwargs["negative_prompt_embeds"] is None
+
+@patch('pipeline.animator.get_animator')
+def test_multiple_motions_are_generated_in_bounded_batches(mock_get_animator: MagicMock):
+    resident = mock_get_animator.return_value
+    resident.generate_batch.side_effect = lambda prompts, **kwargs: [[motion] for motion, _ in prompts]
+
+    animations = animator.generate_animations(
+        ["idle", "walk", "punch"], "a knight", num_frames=8, seed=7, max_batch_size=2
+    )
+
+    assert animations == [["idle"], ["walk"], ["punch"]]
+    batches = resident.generate_batch.call_args_list
+    assert [c.kwargs["prompts"] for c in batches] == [[("idle", "a knight"), ("walk", "a knight")], [("punch", "a knight")]]
+    assert batches[0].kwargs["seeds"] == [7, 7]
+
+@patch('pipeline.animator.prompt_cache', new_callable=lambda: animator.PromptEmbeddingCache())
+@patch('pipeline.animator.AnimateDiffPipeline')
+@patch('pipeline.animator.MotionAdapter')
+def test_step_callbacks_receive_their_own_animations_latents(
+    mock_adapter_cls: MagicMock,
+    mock_pipeline_cls: MagicMock,
+    mock_cache: animator.PromptEmbeddingCache
+):
+    pipe = mock_pipeline_cls.from_pretrained.return_value
+    pipe.encode_prompt.side_effect = lambda prompts, *args, **kwargs: (torch.zeros(len(prompts), 77, 8), None)
+    latents = torch.stack([torch.full((4, 2, 8, 8), float(i)) for i in range(2)])
+
+    def run_pipeline(**kwargs):
+        for step in range(kwargs["num_inference_steps"]):
+            kwargs["callback_on_step_end"](pipe, step, 999 - step, {"latents": latents})
+        return MagicMock(frames=[[MagicMock()], [MagicMock()]])
+    pipe.side_effect = run_pipeline
+
+    seen = []
+    def broken_callback(step, total_steps, animation_latents):
+        raise RuntimeError("client went away")
+
+    instance = animator.Animator()
+    instance.generate_batch(
+        [("walking", "a knight"), ("jumping", "a knight")],
+        num_inference_steps=2,
+        step_callbacks=[broken_callback, lambda *args: seen.append((args[0], args[1], args[2].mean().item()))],
+    )
+
+    # Step numbers are 1-based, each callback sees its own batch entry, and a failing
+    # callback does not stop the generation.
+    assert seen == [(1, 2, 1.0), (2, 2, 1.0)]
+
+@patch('pipeline.animator.prompt_cache', new_callable=lambda: animator.PromptEmbeddingCache())
+@patch('pipeline.animator.AnimateDiffPipeline')
+@patch('pipeline.animator.MotionAdapter')
+def test_unseeded_entries_of_a_seeded_batch_draw_different_noise(
+    mock_adapter_cls: MagicMock,
+    mock_pipeline_cls: MagicMock,
+    mock_cache: animator.PromptEmbeddingCache
+):
+    pipe = mock_pipeline_cls.from_pretrained.return_value
+    pipe.encode_prompt.side_effect = lambda prompts, *args, **kwargs: (torch.zeros(len(prompts), 77, 8), None)
+    pipe.return_value.frames = [[MagicMock()] for _ in range(3)]
+
+    instance = animator.Animator()
+    instance.generate_batch([("walking", "a knight")] * 3, seeds=[7, None, None])
+
+    latents = [torch.randn(4, 8, 8, generator=g) for g in pipe.call_args.kwargs["generator"]]
+    assert torch.equal(latents[0], torch.randn(4, 8, 8, generator=torch.Generator("cpu").manual_seed(7)))
+    assert not torch.equal(latents[1], latents[2])
@@ -0,0 +1,94 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils import atlas
+
+# --- Test Helper Functions ---
+
+def sprite_frame(box, size=(128, 128), color=(200, 40, 40, 255)) -> Image.Image:
+    """Creates a transparent frame with one opaque rectangle at box = (x, y, w, h)."""
+    frame = Image.new('RGBA', size, (0, 0, 0, 0))
+    x, y, w, h = box
+    frame.paste(Image.new('RGBA', (w, h), color), (x, y))
+    return frame
+
+def is_power_of_two(n: int) -> bool:
+    return n > 0 and n & (n - 1) == 0
+
+def overlaps(a, b) -> bool:
+    return not (a.x + a.width <= b.x or b.x + b.width <= a.x or a.y + a.height <= b.y or b.y + b.height <= a.y)
+
+# --- Test Cases ---
+
+def test_frames_are_trimmed_deduplicated_and_round_trip():
+    frames = [
+        sprite_frame((10, 20, 30, 40)),
+        sprite_frame((50, 60, 30, 40)),                       # same pixels, different offset
+        sprite_frame((0, 0, 64, 16), color=(0, 0, 255, 255)),
+        Image.new('RGBA', (128, 128), (0, 0, 0, 0)),          # fully transparent
+    ]
+    packed = atlas.build_atlas(frames, padding=2)
+
+    assert packed.unique_sprites == 3
+    assert len(packed.pages) == 1
+    page = packed.pages[0]
+    assert is_power_of_two(page.width) and is_power_of_two(page.height)
+    assert page.width * page.height < 128 * 128 * len(frames)
+
+    first, second = packed.sprites[0], packed.sprites[1]
+    assert (first.width, first.height, first.offset_x, first.offset_y) == (30, 40, 10, 20)
+    assert (second.x, second.y) == (first.x, first.y)
+    assert (second.offset_x, second.offset_y) == (50, 60)
+
+    rebuilt = atlas.unpack_frames(packed.pages, [s.describe() for s in packed.sprites])
+    for original, copy in zip(frames, rebuilt):
+        assert np.array_equal(np.asarray(original), np.asarray(copy))
+
+def test_sprites_never_overlap_and_keep_their_padding():
+    rng = np.random.default_rng(0)
+    frames = [
+        sprite_frame((0, 0, int(w), int(h)), color=(i, 0, 0, 255))
+        for i, (w, h) in enumerate(rng.integers(8, 100, size=(30, 2)))
+    ]
+    packed = atlas.build_atlas(frames, padding=3)
+
+    sprites = packed.sprites
+    for i, a in enumerate(sprites):
+        page = packed.pages[a.page]
+        assert a.x + a.width <= page.width and a.y + a.height <= page.height
+        grown = atlas.AtlasSprite(a.page, a.x, a.y, a.width + 3, a.height + 3, 0, 0, 0, 0)
+        for b in sprites[i + 1:]:
+            if b.page == a.page:
+                assert not overlaps(grown, b)
+
+def test_overflowing_frames_spill_onto_more_pages():
+    frames = [sprite_frame((0, 0, 100, 100), size=(100, 100), color=(i, 1, 1, 255)) for i in range(6)]
+    packed = atlas.build_atlas(frames, padding=0, max_page_size=256)
+
+    assert len(packed.pages) == 2
+    assert all(p.width <= 256 and p.height <= 256 for p in packed.pages)
+    assert {s.page for s in packed.sprites} == {0, 1}
+
+    with pytest.raises(ValueError):
+        atlas.build_atlas([sprite_frame((0, 0, 300, 10), size=(300, 10))], max_page_size=256)
+
+def test_translate_boxes_moves_every_nested_box():
+    hitbox = {
+        "x": 12, "y": 30, "width": 5, "height": 6,
+        "regions": [{"x": 12, "y": 30, "width": 5, "height": 6, "area": 30}],
+        "stats": {"opaque_area": 30, "bounds": {"x": 12, "y": 30, "width": 5, "height": 6}},
+        "hurtboxes": {"head": {"x": 14, "y": 31, "width": 2, "height": 2}},
+    }
+    moved = atlas.translate_boxes(hitbox, -10, -20)
+
+    assert (moved["x"], moved["y"]) == (2, 10)
+    assert (moved["regions"][0]["x"], moved["regions"][0]["area"]) == (2, 30)
+    assert moved["stats"]["bounds"]["y"] == 10 and moved["stats"]["opaque_area"] == 30
+    assert moved["hurtboxes"]["head"] == {"x": 4, "y": 11, "width": 2, "height": 2}
+    assert hitbox["x"] == 12
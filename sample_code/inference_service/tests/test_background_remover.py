@@ -0,0 +1,70 @@
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline import background_remover
+
+class FakeU2netSession:
+    """Mimics a rembg u2net session whose ONNX graph accepts a dynamic batch dimension."""
+    model_name = "u2net"
+
+    def __init__(self):
+        self.run_batch_sizes = []
+        model_input = SimpleNamespace(name="input.1", shape=["batch", 3, 320, 320])
+        self.inner_session = SimpleNamespace(get_inputs=lambda: [model_input], run=self._run)
+
+    def normalize(self, img, mean, std, size):
+        return {"input.1": np.zeros((1, 3, *size), dtype=np.float32)}
+
+    def _run(self, output_names, feeds):
+        batch = feeds["input.1"]
+        self.run_batch_sizes.append(batch.shape[0])
+        # Foreground in the left half of every image.
+        pred = np.zeros((batch.shape[0], 1, 320, 320), dtype=np.float32)
+        pred[:, :, :, :160] = 1.0
+        return [pred]
+
+def test_session_pool_reuses_sessions_up_to_its_size():
+    created = []
+    with patch.object(background_remover, 'new_session', side_effect=lambda *a, **k: created.append(1) or object()):
+        pool = background_remover.SessionPool("u2net", size=2)
+        with pool.session() as first:
+            pass
+        with pool.session() as second:
+            pass
+        assert first is second
+
+        barrier = threading.Barrier(2)
+        def borrow():
+            with pool.session():
+                barrier.wait(timeout=5)
+        threads = [threading.Thread(target=borrow) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert len(created) == 2
+
+def test_remove_backgrounds_segments_batch_in_one_run_and_preserves_input_types():
+    session = FakeU2netSession()
+    pool = background_remover.SessionPool("u2net")
+    pool._idle.put(session)
+    pool._created = 1
+
+    images = [Image.new('RGB', (64, 32), 'red'), np.full((32, 64, 3), 200, dtype=np.uint8)]
+    with patch.object(background_remover, 'get_session_pool', return_value=pool):
+        cutouts = background_remover.remove_backgrounds(images)
+
+    assert session.run_batch_sizes == [2]
+    assert isinstance(cutouts[0], Image.Image) and cutouts[0].mode == 'RGBA'
+    assert isinstance(cutouts[1], np.ndarray) and cutouts[1].shape == (32, 64, 4)
+    alpha = np.asarray(cutouts[0])[:, :, 3]
+    assert alpha[:, :16].min() > 200 and alpha[:, 48:].max() < 50
@@ -0,0 +1,70 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.batches import BatchRun, BatchStatus
+from utils.job_queue import InProcessBroker, JobQueue, JobStatus
+
+# --- Test Cases ---
+
+def test_batch_feeds_jobs_within_in_flight_limit_and_reports_when_done():
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def handler(payload, record):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        if payload == "bad":
+            raise RuntimeError("bad input")
+        return {"payload": payload}
+
+    # A one-slot queue also exercises retrying when the queue is full.
+    job_queue = JobQueue(handler=handler, num_workers=4, broker=InProcessBroker(max_size=1), poll_interval=0.01)
+    finished = threading.Event()
+    jobs = [(f"job-{i}", "bad" if i == 3 else i) for i in range(8)]
+    run = BatchRun("roster", job_queue, jobs, max_in_flight=2, on_finished=lambda run: finished.set(), poll_interval=0.01)
+
+    job_queue.start()
+    try:
+        run.start()
+        assert finished.wait(10)
+    finally:
+        job_queue.stop()
+
+    assert peak <= 2
+    status = run.describe()
+    assert status["status"] == BatchStatus.COMPLETE
+    assert status["jobs"][JobStatus.COMPLETE] == 7
+    assert status["jobs"][JobStatus.FAILED] == 1
+    assert status["progress_percent"] == 100
+    assert run.record("job-5").result == {"payload": 5}
+    assert "bad input" in run.record("job-3").error
+
+def test_jobs_are_announced_once_and_skipped_when_never_queued():
+    # Workers are not started: the first job fills the one-slot queue and the second
+    # keeps retrying until the run is cancelled.
+    job_queue = JobQueue(handler=lambda payload, record: None, broker=InProcessBroker(max_size=1), poll_interval=0.01)
+    submitted, skipped = [], []
+    run = BatchRun(
+        "roster", job_queue, [("job-0", 0), ("job-1", 1)], max_in_flight=2,
+        on_submit=lambda job_id, payload: submitted.append(job_id),
+        on_skipped=lambda job_id, payload: skipped.append(job_id),
+        poll_interval=0.01
+    )
+    run.start()
+    time.sleep(0.1)
+    run.cancel()
+    run.join(timeout=5)
+
+    assert submitted == ["job-0", "job-1"]
+    assert skipped == ["job-1"]
+    assert run.status == BatchStatus.CANCELLED
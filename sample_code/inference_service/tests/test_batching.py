@@ -0,0 +1,79 @@
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline.batching import GenerationBatcher, GenerationRequest, GenerationShape
+
+def make_shape(num_frames: int = 16) -> GenerationShape:
+    return GenerationShape(
+        model_key=("base-model", "motion-adapter"),
+        num_frames=num_frames,
+        height=64,
+        width=64,
+        num_inference_steps=25,
+        guidance_scale=7.5,
+    )
+
+def fake_runner(calls: list):
+    """A batch runner that records each batch and returns frames tagged with the request's prompt."""
+    def run_batch(shape, requests):
+        calls.append([r.motion_prompt for r in requests])
+        return [[Image.new('RGBA', (shape.width, shape.height))] * shape.num_frames for _ in requests]
+    return run_batch
+
+def test_compatible_requests_are_batched_and_split_back():
+    calls = []
+    batcher = GenerationBatcher(run_batch=fake_runner(calls), max_batch_size=4, max_wait_seconds=0.2)
+    batcher.start()
+    try:
+        futures = [
+            batcher.submit(GenerationRequest(f"motion-{i}", "knight", make_shape()))
+            for i in range(4)
+        ]
+        results = [f.result(timeout=5) for f in futures]
+    finally:
+        batcher.stop()
+
+    assert calls == [["motion-0", "motion-1", "motion-2", "motion-3"]]
+    assert all(len(frames) == 16 for frames in results)
+
+def test_incompatible_shapes_run_in_separate_batches():
+    calls = []
+    batcher = GenerationBatcher(run_batch=fake_runner(calls), max_batch_size=4, max_wait_seconds=0.05)
+    batcher.start()
+    try:
+        short = batcher.submit(GenerationRequest("punch", "knight", make_shape(num_frames=8)))
+        long = batcher.submit(GenerationRequest("walk", "knight", make_shape(num_frames=16)))
+        assert len(short.result(timeout=5)) == 8
+        assert len(long.result(timeout=5)) == 16
+    finally:
+        batcher.stop()
+
+    assert sorted(calls) == [["punch"], ["walk"]]
+
+def test_batch_failure_propagates_to_every_request():
+    def failing_runner(shape, requests):
+        raise RuntimeError("CUDA out of memory")
+
+    batcher = GenerationBatcher(run_batch=failing_runner, max_batch_size=2, max_wait_seconds=0.01)
+    batcher.start()
+    try:
+        futures = [batcher.submit(GenerationRequest(m, "knight", make_shape())) for m in ("a", "b")]
+        errors = [f.exception(timeout=5) for f in futures]
+    finally:
+        batcher.stop()
+
+    assert all(isinstance(e, RuntimeError) for e in errors)
+
+def test_stop_flushes_pending_requests():
+    calls = []
+    batcher = GenerationBatcher(run_batch=fake_runner(calls), max_batch_size=8, max_wait_seconds=60)
+    batcher.start()
+    future = batcher.submit(GenerationRequest("idle", "knight", make_shape()))
+    batcher.stop()
+
+    assert future.done()
+    assert calls == [["idle"]]
@@ -0,0 +1,55 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks import suite
+from benchmarks.bench_hitboxes import make_frames
+
+# --- Test Cases ---
+
+def test_stub_backend_reports_every_benchmark():
+    args = argparse.Namespace(
+        backend="stub", benchmarks=list(suite.BENCHMARKS), sizes=[64], frames=[4], repeats=2, warmup=0,
+        steps=1, guidance_scale=7.5, image_format="png", preset="fast"
+    )
+
+    report = suite.run_suite(args)
+
+    assert [r["benchmark"] for r in report["results"]] == list(suite.BENCHMARKS)
+    for result in report["results"]:
+        assert "error" not in result, result
+        assert set(result["latency_ms"]) == {"p50", "p90", "p99", "mean", "min", "max"}
+        assert result["throughput"]["per_second"] > 0
+        assert result["memory"]["peak_rss_bytes"] > 0
+
+    rows = suite.compare(report, report, max_regression=20)
+    assert len(rows) == len(suite.BENCHMARKS)
+    assert not any(row["regression"] for row in rows)
+
+def test_load_test_level_completes_jobs_against_local_service(tmp_path):
+    import main
+    from benchmarks import load_test
+
+    def generate(num_frames=16, width=512, seed=None, **kwargs):
+        return make_frames(num_frames, width, seed=seed or 0)
+
+    timeline = []
+    # Job outputs and the result cache go to the test's directory, not the service's.
+    with patch.object(main, 'PRELOAD_MODELS', False), patch.object(main, 'BASE_OUTPUT_DIR', tmp_path / "outputs"), \
+            patch.object(main, 'BASE_TEMP_DIR', tmp_path / "temp"), patch.object(main, 'CACHE_DIR', tmp_path / "cache"), \
+            load_test.ImageOrigin(64, 2) as origin, \
+            suite.backend_patches("stub", generate=generate), load_test.Service(load_test.free_port()) as service:
+        level = load_test.run_level(
+            service.base_url, origin, concurrency=2, duration=1.0,
+            params={"num_frames": 4, "width": 64, "height": 64},
+            timeline=timeline, started_at=time.monotonic(), sample_interval=0.2
+        )
+
+    assert level["completed"] > 0
+    assert level["error_rate"] == 0.0
+    assert set(level["latency_ms"]) == {"p50", "p90", "p99", "mean", "min", "max"}
+    assert timeline and all(point["queue_depth"] is not None for point in timeline)
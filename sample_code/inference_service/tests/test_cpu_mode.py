@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+import torch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline import animator, cpu_mode
+
+@pytest.fixture(autouse=True)
+def restore_cpu_options():
+    original = cpu_mode.current_options()
+    yield
+    cpu_mode.configure(original)
+
+def test_dtype_resolution():
+    assert cpu_mode.resolve_dtype(cpu_mode.CpuOptions(enabled=False, dtype="bfloat16")) == torch.float32
+    assert cpu_mode.resolve_dtype(cpu_mode.CpuOptions(enabled=True, dtype="float32")) == torch.float32
+    assert cpu_mode.resolve_dtype(cpu_mode.CpuOptions(enabled=True, dtype="bfloat16")) == torch.bfloat16
+    with patch('pipeline.cpu_mode.bf16_supported', return_value=False):
+        assert cpu_mode.resolve_dtype(cpu_mode.CpuOptions(enabled=True)) == torch.float32
+    with patch('pipeline.cpu_mode.bf16_supported', return_value=True):
+        assert cpu_mode.resolve_dtype(cpu_mode.CpuOptions(enabled=True)) == torch.bfloat16
+    with pytest.raises(ValueError):
+        cpu_mode.configure(cpu_mode.CpuOptions(dtype="float16"))
+
+def test_optimize_pipeline_applies_every_enabled_option():
+    pipe = MagicMock()
+    unet = pipe.unet
+    with patch('pipeline.cpu_mode.torch.compile', side_effect=lambda fn: ("compiled", fn)) as mock_compile:
+        cpu_mode.optimize_pipeline(pipe, cpu_mode.CpuOptions(enabled=True, compile=True))
+
+    unet.to.assert_called_once_with(memory_format=torch.channels_last)
+    pipe.vae.to.assert_called_once_with(memory_format=torch.channels_last)
+    pipe.enable_attention_slicing.assert_called_once()
+    pipe.vae.enable_tiling.assert_called_once()
+    assert mock_compile.call_count == 2
+    assert pipe.unet == ("compiled", unet)
+
+def test_disabled_mode_leaves_the_pipeline_untouched():
+    pipe = MagicMock()
+    cpu_mode.optimize_pipeline(pipe, cpu_mode.CpuOptions(enabled=False))
+    assert pipe.mock_calls == []
+
+@patch('pipeline.animator.torch.cuda.is_available', return_value=False)
+@patch('pipeline.animator.AnimateDiffPipeline')
+@patch('pipeline.animator.MotionAdapter')
+def test_cpu_animator_loads_in_bfloat16_and_is_optimised(mock_adapter_cls, mock_pipeline_cls, _):
+    cpu_mode.configure(cpu_mode.CpuOptions(enabled=True, dtype="bfloat16"))
+
+    instance = animator.Animator()
+
+    assert instance.dtype == torch.bfloat16
+    assert mock_pipeline_cls.from_pretrained.call_args.kwargs["torch_dtype"] == torch.bfloat16
+    mock_pipeline_cls.from_pretrained.return_value.enable_attention_slicing.assert_called_once()
@@ -0,0 +1,160 @@
+import io
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.downloader import DownloadError, ImageDownloader
+
+def png_bytes(size=(32, 32)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGBA', size, 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+class Origin:
+    """A local HTTP/1.1 server recording requests, connections and concurrency."""
+    def __init__(self, routes: dict, delay: float = 0.0):
+        self.requests = []
+        self.connections = set()
+        self.active = 0
+        self.peak_active = 0
+        lock = threading.Lock()
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with lock:
+                    origin.requests.append(self.path)
+                    origin.connections.add(self.client_address)
+                    origin.active += 1
+                    origin.peak_active = max(origin.peak_active, origin.active)
+                try:
+                    time.sleep(delay)
+                    body, headers = routes[self.path]
+                    self.send_response(200)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    if "Content-Length" not in headers:
+                        self.send_header("Connection", "close")
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with lock:
+                        origin.active -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path: str) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def origin():
+    image = png_bytes()
+    large = png_bytes((200, 200))
+    servers = []
+
+    def make(delay: float = 0.0):
+        server = Origin({
+            "/image.png": (image, {"Content-Length": str(len(image))}),
+            # Oversized without declaring it: only detectable while streaming.
+            "/stream.bin": (b"\0" * 300_000, {}),
+            "/large.png": (large, {"Content-Length": str(len(large))}),
+        }, delay=delay)
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.close()
+
+# --- Test Cases ---
+
+def test_downloads_reuse_pooled_connections(origin):
+    server = origin()
+    downloader = ImageDownloader()
+    try:
+        results = [downloader.fetch(server.url("/image.png")) for _ in range(3)]
+    finally:
+        downloader.close()
+
+    assert all(data == png_bytes() for data in results)
+    assert len(server.requests) == 3
+    assert len(server.connections) == 1
+    assert downloader.stats()["downloads"] == 3
+
+def test_size_guards_reject_oversized_images(origin):
+    server = origin()
+    downloader = ImageDownloader(max_bytes=100_000, max_pixels=100 * 100)
+    try:
+        with pytest.raises(DownloadError, match="byte limit"):
+            downloader.fetch(server.url("/stream.bin"))
+        with pytest.raises(DownloadError, match="pixel limit"):
+            downloader.fetch(server.url("/large.png"))
+        small = ImageDownloader(max_bytes=50)
+        with pytest.raises(DownloadError, match="50 byte limit"):
+            small.fetch(server.url("/image.png"))
+        small.close()
+        with pytest.raises(DownloadError, match="Failed to download"):
+            downloader.fetch(server.url("/missing.png"))
+    finally:
+        downloader.close()
+
+    assert downloader.stats()["rejected"] == 2
+
+def test_prefetched_image_is_downloaded_once_and_per_host_limit_holds(origin):
+    server = origin(delay=0.1)
+    downloader = ImageDownloader(connections_per_host=2, prefetch_workers=4)
+    try:
+        downloader.prefetch(server.url("/image.png"))
+        downloader.prefetch(server.url("/image.png"))
+        first = downloader.get(server.url("/image.png"))
+        second = downloader.get(server.url("/image.png"))
+        assert first == second == png_bytes()
+        assert server.requests == ["/image.png"]
+
+        threads = [threading.Thread(target=downloader.fetch, args=(server.url("/image.png"),)) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        downloader.close()
+
+    assert server.peak_active <= 2
+    stats = downloader.stats()
+    assert (stats["prefetch_hits"], stats["prefetched"]) == (2, 0)
+
+def test_released_prefetch_is_dropped_once_no_claims_remain(origin):
+    server = origin(delay=0.2)
+    downloader = ImageDownloader(prefetch_workers=1)
+    try:
+        # The first download occupies the only prefetch worker, so the second has not started.
+        downloader.prefetch(server.url("/large.png"))
+        downloader.prefetch(server.url("/image.png"))
+        downloader.prefetch(server.url("/image.png"))
+        downloader.release(server.url("/image.png"))
+        assert downloader.stats()["prefetched"] == 2
+        downloader.release(server.url("/image.png"))
+        assert downloader.stats()["prefetched"] == 1
+        downloader.get(server.url("/large.png"))
+    finally:
+        downloader.close()
+
+    assert server.requests == ["/large.png"]
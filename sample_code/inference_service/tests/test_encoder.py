@@ -0,0 +1,54 @@
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils import encoder
+
+# --- Test Helper Functions ---
+
+def sprite_sheet(size=(256, 128)) -> Image.Image:
+    """A transparent sheet with a few opaque and semi-transparent blocks."""
+    sheet = Image.new('RGBA', size, (0, 0, 0, 0))
+    sheet.paste(Image.new('RGBA', (60, 90), (220, 30, 30, 255)), (10, 10))
+    sheet.paste(Image.new('RGBA', (40, 40), (30, 30, 220, 128)), (150, 60))
+    return sheet
+
+# --- Test Cases ---
+
+@pytest.mark.parametrize("fmt", ["png", "webp"])
+@pytest.mark.parametrize("preset", encoder.PRESETS)
+def test_lossless_formats_round_trip_exactly(fmt, preset):
+    sheet = sprite_sheet()
+    decoded = Image.open(io.BytesIO(encoder.encode_to_bytes(sheet, fmt, preset))).convert('RGBA')
+    assert np.array_equal(np.asarray(decoded), np.asarray(sheet))
+
+def test_palette_png_keeps_transparency():
+    sheet = sprite_sheet()
+    data = encoder.encode_to_bytes(sheet, "png8", "balanced")
+    decoded = Image.open(io.BytesIO(data))
+
+    assert decoded.mode == 'P'
+    assert np.array_equal(np.asarray(decoded.convert('RGBA'))[..., 3], np.asarray(sheet)[..., 3])
+
+def test_encode_images_writes_files_in_order_and_reports_sizes(tmp_path: Path):
+    pages = [(sprite_sheet(), tmp_path / "a.webp"), (sprite_sheet((64, 64)), tmp_path / "b.webp")]
+    files = encoder.encode_images(pages, fmt="webp", preset="fast")
+
+    assert [Path(f.path).name for f in files] == ["a.webp", "b.webp"]
+    assert all(f.bytes == Path(f.path).stat().st_size for f in files)
+    summary = encoder.summarize(files)
+    assert summary["bytes"] == sum(f.bytes for f in files)
+    assert summary["format"] == "webp" and summary["preset"] == "fast"
+    encoder.shutdown()
+
+def test_unknown_format_or_preset_is_rejected():
+    with pytest.raises(ValueError):
+        encoder.encode_to_bytes(sprite_sheet(), "jpeg")
+    with pytest.raises(ValueError):
+        encoder.encode_to_bytes(sprite_sheet(), "png", "ultra")
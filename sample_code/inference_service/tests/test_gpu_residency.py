@@ -0,0 +1,100 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline.gpu_residency import DEVICE, HOST, OFFLOADED, ResidencyManager
+
+class FakeModel:
+    def __init__(self, size: int, largest_component: int = 0):
+        self.size = size
+        self.largest_component = largest_component
+        self.placement = "cpu"
+
+def make_manager(budget_bytes: int) -> ResidencyManager:
+    """A manager over fake models that only record where they were moved, on a simulated budget."""
+    def move(placement):
+        def apply(model):
+            model.placement = placement
+        return apply
+
+    return ResidencyManager(
+        to_device=move("device"),
+        offload=move("cpu"),
+        size_of=lambda model: model.size,
+        enable_low_memory=move("low-memory"),
+        offloaded_size_of=lambda model: model.largest_component,
+        budget_bytes=budget_bytes,
+    )
+
+def states(manager: ResidencyManager) -> dict:
+    return {model["key"]: model["state"] for model in manager.stats()["models"]}
+
+# --- Test Cases ---
+
+def test_least_recently_used_idle_model_is_offloaded_under_pressure():
+    manager = make_manager(budget_bytes=100)
+    models = {key: FakeModel(40) for key in ("a", "b", "c")}
+    for key in ("a", "b"):
+        with manager.lease(key, models[key], working_bytes=10):
+            pass
+    with manager.lease("a", models["a"], working_bytes=10):
+        pass
+
+    with manager.lease("c", models["c"], working_bytes=10):
+        assert models["c"].placement == "device"
+        assert manager.used_bytes() <= 100
+
+    assert states(manager) == {"a": DEVICE, "b": HOST, "c": DEVICE}
+    assert models["b"].placement == "cpu"
+    assert manager.stats()["evictions"] == 1
+
+def test_concurrent_leases_wait_instead_of_over_committing():
+    manager = make_manager(budget_bytes=100)
+    model = FakeModel(40)
+    peak_used = []
+    lock = threading.Lock()
+
+    def run():
+        with manager.lease("a", model, working_bytes=40):
+            with lock:
+                peak_used.append(manager.used_bytes())
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(peak_used) == 3
+    assert max(peak_used) <= 100
+    stats = manager.stats()
+    assert stats["lease_waits"] == 2
+    assert stats["used_bytes"] == 40
+    assert stats["working_bytes"] == 0
+
+def test_model_larger_than_the_budget_switches_to_low_memory_mode():
+    manager = make_manager(budget_bytes=100)
+    small, large = FakeModel(30), FakeModel(150, largest_component=60)
+    manager.admit("small", small)
+    assert small.placement == "device"
+
+    with manager.lease("large", large, working_bytes=20):
+        assert large.placement == "low-memory"
+        assert manager.used_bytes() == 80
+
+    assert states(manager) == {"small": HOST, "large": OFFLOADED}
+    assert manager.stats()["low_memory_fallbacks"] == 1
+
+def test_without_a_budget_models_stay_on_the_device():
+    manager = make_manager(budget_bytes=None)
+    models = [FakeModel(10**12) for _ in range(3)]
+    for i, model in enumerate(models):
+        with manager.lease(i, model, working_bytes=10**12):
+            pass
+
+    assert all(model.placement == "device" for model in models)
+    assert manager.stats()["evictions"] == 0
@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline import hitbox_generator
+from benchmarks.bench_hitboxes import legacy_hitboxes, make_frames
+
+# --- Test Helper Functions ---
+
+def frame_with_rects(rects, size=(128, 96), alpha=255) -> Image.Image:
+    """Creates a transparent RGBA frame with filled rectangles given as (x, y, w, h)."""
+    a = np.zeros((size[1], size[0]), dtype=np.uint8)
+    for x, y, w, h in rects:
+        a[y:y + h, x:x + w] = alpha
+    rgba = np.dstack([np.zeros((size[1], size[0], 3), dtype=np.uint8), a])
+    return Image.fromarray(rgba, mode='RGBA')
+
+# --- Test Cases ---
+
+def test_matches_the_per_frame_contour_implementation():
+    frames = make_frames(12, 128, seed=3)
+    assert hitbox_generator.generate_hitboxes_for_animation(frames) == legacy_hitboxes(frames)
+
+def test_largest_region_is_the_hitbox_and_all_regions_are_reported():
+    frame = frame_with_rects([(10, 10, 40, 60), (80, 20, 20, 20), (120, 90, 3, 3)])
+    [hitbox] = hitbox_generator.generate_hitboxes_for_animation([frame], include_regions=True)
+
+    assert {k: hitbox[k] for k in ("x", "y", "width", "height")} == {"x": 10, "y": 10, "width": 40, "height": 60}
+    # The 3x3 speck is below the area threshold and is dropped.
+    assert [(r["x"], r["y"], r["width"], r["height"]) for r in hitbox["regions"]] == [(10, 10, 40, 60), (80, 20, 20, 20)]
+    stats = hitbox["stats"]
+    assert stats["num_regions"] == 2
+    assert stats["opaque_area"] == 40 * 60 + 20 * 20 + 9
+    assert stats["bounds"] == {"x": 10, "y": 10, "width": 113, "height": 83}
+    assert stats["coverage"] == round(stats["opaque_area"] / (128 * 96), 4)
+
+def test_alpha_threshold_ignores_faint_pixels():
+    solid = np.asarray(frame_with_rects([(10, 10, 30, 30)]))
+    faint = np.asarray(frame_with_rects([(60, 10, 50, 50)], alpha=40))
+    frame = Image.fromarray(np.maximum(solid, faint), mode='RGBA')
+
+    [default] = hitbox_generator.generate_hitboxes_for_animation([frame])
+    [thresholded] = hitbox_generator.generate_hitboxes_for_animation([frame], alpha_threshold=64)
+
+    assert default["x"] == 60
+    assert thresholded == {"x": 10, "y": 10, "width": 30, "height": 30}
+
+def test_empty_and_non_rgba_frames():
+    empty = frame_with_rects([])
+    opaque_rgb = Image.new('RGB', (128, 96), 'blue')
+
+    hitboxes = hitbox_generator.generate_hitboxes_for_animation([empty, opaque_rgb], include_regions=True)
+
+    assert {k: hitboxes[0][k] for k in ("x", "y", "width", "height")} == hitbox_generator.EMPTY_HITBOX
+    assert hitboxes[0]["regions"] == []
+    assert hitboxes[0]["stats"]["opaque_area"] == 0
+    assert hitboxes[1]["width"] == 128 and hitboxes[1]["height"] == 96
+    assert hitbox_generator.generate_hitboxes_for_animation([]) == []
+
+def test_long_animations_are_processed_in_chunks(monkeypatch):
+    frames = make_frames(10, 64, seed=1)
+    expected = hitbox_generator.generate_hitboxes_for_animation(frames, include_regions=True)
+
+    # Force three frames per pass.
+    monkeypatch.setattr(hitbox_generator, "MAX_PIXELS_PER_PASS", 3 * 64 * 64)
+    assert hitbox_generator.generate_hitboxes_for_animation(frames, include_regions=True) == expected
+
+def test_regions_on_adjacent_frames_stay_separate():
+    # Opaque to the bottom edge of one frame and from the top edge of the next.
+    frames = [frame_with_rects([(20, 56, 30, 40)]), frame_with_rects([(20, 0, 30, 40)])]
+    hitboxes = hitbox_generator.generate_hitboxes_for_animation(frames, include_regions=True)
+
+    assert [h["regions"] for h in hitboxes] == [
+        [{"x": 20, "y": 56, "width": 30, "height": 40, "area": 1200}],
+        [{"x": 20, "y": 0, "width": 30, "height": 40, "area": 1200}],
+    ]
@@ -0,0 +1,87 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline import hurtbox_generator
+
+# --- Test Helper Functions ---
+
+SIZE = 200
+
+def standing_figure() -> tuple:
+    """
+    Returns a frame with an opaque stick figure and matching normalised landmarks.
+    Shoulders at y=60, hips at y=120, arms hanging to y=110, legs down to y=190.
+    """
+    alpha = np.zeros((SIZE, SIZE), dtype=np.uint8)
+    alpha[20:55, 85:115] = 255    # head
+    alpha[55:125, 80:120] = 255   # torso
+    alpha[60:115, 65:80] = 255    # right arm (image left)
+    alpha[60:115, 120:135] = 255  # left arm (image right)
+    alpha[125:195, 82:98] = 255   # right leg
+    alpha[125:195, 102:118] = 255 # left leg
+    rgba = np.dstack([np.zeros((SIZE, SIZE, 3), dtype=np.uint8), alpha])
+
+    points = {i: (100, 38) for i in range(11)}
+    points.update({
+        11: (125, 60), 12: (75, 60), 13: (128, 85), 14: (72, 85),
+        15: (128, 108), 16: (72, 108), 17: (128, 110), 18: (72, 110),
+        19: (128, 110), 20: (72, 110), 21: (128, 110), 22: (72, 110),
+        23: (110, 120), 24: (90, 120), 25: (110, 155), 26: (90, 155),
+        27: (110, 185), 28: (90, 185), 29: (110, 190), 30: (90, 190),
+        31: (112, 192), 32: (88, 192),
+    })
+    landmarks = [
+        {"x": x / SIZE, "y": y / SIZE, "z": 0.0, "visibility": 0.99}
+        for x, y in (points[i] for i in range(33))
+    ]
+    return Image.fromarray(rgba, mode='RGBA'), landmarks
+
+# --- Test Cases ---
+
+def test_every_body_part_gets_a_box_clipped_to_the_character():
+    frame, landmarks = standing_figure()
+    [hurtboxes] = hurtbox_generator.generate_hurtboxes_for_animation([frame], [landmarks])
+
+    assert set(hurtboxes) == set(hurtbox_generator.BODY_PARTS)
+    head = hurtboxes["head"]
+    # The head box grows from the facial landmarks to the top of the opaque head.
+    assert head["y"] == 20
+    assert head["y"] + head["height"] < 60
+    assert hurtboxes["torso"]["height"] > head["height"]
+    # Legs stop at the bottom of the opaque pixels, not at the padded landmark box.
+    for leg in ("left_leg", "right_leg"):
+        box = hurtboxes[leg]
+        assert box["y"] + box["height"] == 195
+    # Every box lies inside the frame.
+    for box in hurtboxes.values():
+        assert box["x"] >= 0 and box["y"] >= 0
+        assert box["x"] + box["width"] <= SIZE and box["y"] + box["height"] <= SIZE
+
+def test_hidden_landmarks_and_missing_poses_are_skipped():
+    frame, landmarks = standing_figure()
+    for i in hurtbox_generator.BODY_PARTS["left_leg"]:
+        if i not in hurtbox_generator.BODY_PARTS["torso"]:
+            landmarks[i]["visibility"] = 0.1
+
+    hurtboxes = hurtbox_generator.generate_hurtboxes_for_animation([frame, frame], [landmarks, None])
+
+    # Only the hip shared with the torso is visible, so the leg counts as hidden.
+    assert "left_leg" not in hurtboxes[0]
+    assert "right_leg" in hurtboxes[0]
+    assert hurtboxes[1] == {}
+
+def test_boxes_without_opaque_pixels_are_dropped():
+    _, landmarks = standing_figure()
+    empty = Image.new('RGBA', (SIZE, SIZE), (0, 0, 0, 0))
+    assert hurtbox_generator.generate_hurtboxes_for_animation([empty], [landmarks]) == [{}]
+
+def test_pose_count_must_match_frame_count():
+    frame, landmarks = standing_figure()
+    with pytest.raises(ValueError):
+        hurtbox_generator.generate_hurtboxes_for_animation([frame, frame], [landmarks])
@@ -0,0 +1,327 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import main
+from utils.job_queue import JobQueue, JobRecord, InProcessBroker, QueueFullError, JobStatus
+
+# --- JobQueue unit tests ---
+
+def test_jobs_are_processed_by_workers_and_report_progress():
+    def handler(payload, record):
+        record.report("halfway", progress_percent=50)
+        return {"doubled": payload * 2}
+
+    job_queue = JobQueue(handler=handler, num_workers=2, poll_interval=0.01)
+    job_queue.start()
+    try:
+        record = job_queue.submit("job-1", 21)
+        finished = job_queue.wait("job-1", timeout=5)
+    finally:
+        job_queue.stop()
+
+    assert finished is record
+    assert record.status == JobStatus.COMPLETE
+    assert record.result == {"doubled": 42}
+    assert record.progress_percent == 100
+    assert "halfway" in record.logs
+
+def test_failed_job_records_error():
+    def handler(payload, record):
+        raise RuntimeError("model exploded")
+
+    job_queue = JobQueue(handler=handler, poll_interval=0.01)
+    job_queue.start()
+    try:
+        job_queue.submit("job-1", None)
+        record = job_queue.wait("job-1", timeout=5)
+    finally:
+        job_queue.stop()
+
+    assert record.status == JobStatus.FAILED
+    assert "model exploded" in record.error
+
+def test_bounded_queue_rejects_when_full():
+    release = threading.Event()
+    job_queue = JobQueue(
+        handler=lambda payload, record: release.wait(5),
+        broker=InProcessBroker(max_size=1),
+        poll_interval=0.01,
+    )
+    # Workers are not started, so the single slot stays occupied.
+    job_queue.submit("job-1", None)
+    with pytest.raises(QueueFullError):
+        job_queue.submit("job-2", None)
+
+    assert job_queue.queue_depth() == 1
+    assert job_queue.position("job-1") == 0
+    assert job_queue.get("job-2") is None
+
+def test_job_events_are_numbered_and_end_with_the_outcome():
+    def handler(payload, record):
+        record.emit("step", {"step": 1, "total_steps": 2})
+        return {"ok": True}
+
+    job_queue = JobQueue(handler=handler, poll_interval=0.01)
+    job_queue.start()
+    try:
+        record = job_queue.submit("job-1", None)
+        job_queue.wait("job-1", timeout=5)
+    finally:
+        job_queue.stop()
+
+    events = record.wait_for_events(after_id=0, timeout=0)
+    assert [e["id"] for e in events] == list(range(1, len(events) + 1))
+    assert [e["event"] for e in events] == ["progress", "progress", "step", "progress", "complete"]
+    assert events[1]["data"]["status"] == JobStatus.RUNNING
+    assert events[-1]["data"] == {"result": {"ok": True}}
+    # Resuming after the last seen id only returns newer events, without blocking on a finished job.
+    assert record.wait_for_events(after_id=events[-2]["id"], timeout=5) == events[-1:]
+
+def test_event_stream_always_ends_with_the_final_event():
+    step_streamed = threading.Event()
+
+    def handler(payload, record):
+        record.emit("step", {"step": 1, "total_steps": 1})
+        step_streamed.wait(5)
+        return {"ok": True}
+
+    original_emit = JobRecord.emit
+
+    def slow_emit(record, event, data):
+        # Holds the worker after the job is marked finished, before a separately emitted
+        # final event would be recorded.
+        if event in (JobStatus.COMPLETE, JobStatus.FAILED):
+            time.sleep(0.2)
+        original_emit(record, event, data)
+
+    job_queue = JobQueue(handler=handler, poll_interval=0.01)
+    job_queue.start()
+    streamed = []
+    try:
+        with patch.object(JobRecord, 'emit', slow_emit):
+            record = job_queue.submit("job-1", None)
+            for chunk in main._job_event_stream(record, after_id=0):
+                streamed.append(chunk)
+                if "event: step" in chunk:
+                    step_streamed.set()
+    finally:
+        job_queue.stop()
+
+    assert "event: complete" in streamed[-1]
+    assert '"ok": true' in streamed[-1]
+
+# --- API tests ---
+
+@pytest.fixture
+def client(tmp_path):
+    """
+    A TestClient running the app lifespan with model preloading disabled, source image
+    prefetching stubbed out (no network) and the result cache in a temporary directory.
+    """
+    with patch.object(main, 'PRELOAD_MODELS', False), patch.object(main, 'CACHE_DIR', tmp_path / "cache"), \
+            patch('utils.downloader.get_downloader') as mock_get_downloader:
+        with TestClient(main.app) as test_client:
+            test_client.downloader = mock_get_downloader.return_value
+            yield test_client
+
+@patch('main.process_full_pipeline')
+def test_run_task_returns_202_and_exposes_status_and_result(mock_pipeline, client):
+    mock_pipeline.return_value = {"status": "complete", "job_id": "api-job", "output_files": {}}
+
+    response = client.post("/run-task", json={"job_id": "api-job", "source_image_url": "http://example.com/a.png"})
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["job_id"] == "api-job"
+    assert body["status_url"] == "/api/job/api-job/status"
+
+    main.job_queue.wait("api-job", timeout=5)
+    status = client.get("/api/job/api-job/status").json()
+    assert status["status"] == JobStatus.COMPLETE
+    assert status["progress_percent"] == 100
+    assert "queue_depth" in status
+
+    result = client.get("/api/job/api-job/result")
+    assert result.status_code == 200
+    assert result.json()["job_id"] == "api-job"
+
+@patch('main.process_full_pipeline')
+def test_queue_wait_is_added_to_requested_timings(mock_pipeline, client):
+    mock_pipeline.return_value = {"status": "complete", "output_files": {}, "timings": {"total_seconds": 1.0, "spans": {}}}
+
+    client.post("/run-task", json={"job_id": "timed-job", "source_image_url": "http://example.com/a.png"})
+    record = main.job_queue.wait("timed-job", timeout=5)
+
+    assert record.result["timings"]["queue_wait_seconds"] == round(record.started_at - record.submitted_at, 4)
+
+@patch('main.process_full_pipeline')
+def test_source_is_prefetched_before_queueing_and_released_when_rejected(mock_pipeline, client):
+    mock_pipeline.return_value = {"status": "complete", "output_files": {}}
+    queued_at_prefetch = []
+    client.downloader.prefetch.side_effect = lambda url: queued_at_prefetch.append(main.job_queue.get("dup-job"))
+
+    task = {"job_id": "dup-job", "source_image_url": "http://example.com/a.png"}
+    assert client.post("/run-task", json=task).status_code == 202
+    assert client.post("/run-task", json=task).status_code == 409
+
+    # The first prefetch ran before the job existed; the duplicate's claim was given back.
+    assert queued_at_prefetch[0] is None
+    client.downloader.release.assert_called_once_with("http://example.com/a.png")
+    main.job_queue.wait("dup-job", timeout=5)
+
+@patch('main.process_full_pipeline')
+@patch('main.process_preview_pipeline')
+def test_finished_preview_can_be_promoted_to_a_full_render(mock_preview, mock_full, client):
+    render_params = main.InferenceTaskParams(seed=1234).model_dump()
+    mock_preview.return_value = {
+        "status": "complete", "job_id": "preview-job", "preview": True, "seed": 1234,
+        "render": {"source_image_url": "http://example.com/a.png", "params": render_params},
+    }
+    mock_full.return_value = {"status": "complete", "output_files": {}}
+
+    client.post("/run-task", json={
+        "job_id": "preview-job", "source_image_url": "http://example.com/a.png", "params": {"preview": True}
+    })
+    main.job_queue.wait("preview-job", timeout=5)
+    response = client.post("/api/job/preview-job/promote")
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["promoted_from"] == "preview-job"
+    main.job_queue.wait(body["job_id"], timeout=5)
+    promoted_task = mock_full.call_args.kwargs["task"]
+    assert promoted_task.params.seed == 1234
+    assert promoted_task.params.preview is False
+    # Only previews can be promoted.
+    assert client.post(f"/api/job/{body['job_id']}/promote").status_code == 409
+
+@patch('main.process_full_pipeline')
+def test_batch_runs_unique_tasks_grouped_by_shape_and_writes_manifest(mock_pipeline, client, tmp_path):
+    mock_pipeline.side_effect = lambda task, **kwargs: {"status": "complete", "job_id": task.job_id}
+    tasks = [
+        {"job_id": "knight", "source_image_url": "http://example.com/knight.png", "params": {"num_frames": 16}},
+        {"job_id": "mage", "source_image_url": "http://example.com/mage.png", "params": {"num_frames": 8}},
+        {"job_id": "knight-again", "source_image_url": "http://example.com/knight.png", "params": {"num_frames": 16}},
+        {"job_id": "rogue", "source_image_url": "http://example.com/rogue.png", "params": {"num_frames": 16}},
+    ]
+
+    with patch.object(main, 'BASE_OUTPUT_DIR', tmp_path), patch.object(main, 'BATCH_MAX_IN_FLIGHT', 1):
+        response = client.post("/run-batch", json={"batch_id": "roster", "tasks": tasks})
+        assert response.status_code == 202
+        assert (response.json()["num_tasks"], response.json()["num_jobs"]) == (4, 3)
+        main.batch_runs["roster"].join(timeout=10)
+
+        status = client.get("/api/batch/roster/status").json()
+        manifest = client.get("/api/batch/roster/manifest").json()
+
+    assert status["status"] == "complete"
+    assert status["jobs"]["complete"] == 3
+    # One job at a time, grouped by frame count: the 16-frame jobs run back to back.
+    assert [call.kwargs["task"].job_id for call in mock_pipeline.call_args_list] == ["knight", "rogue", "mage"]
+    assert [entry["job_id"] for entry in manifest["tasks"]] == ["knight", "mage", "knight-again", "rogue"]
+    duplicate = manifest["tasks"][2]
+    assert duplicate["duplicate_of"] == "knight"
+    assert duplicate["result"] == {"status": "complete", "job_id": "knight"}
+    assert client.post("/run-batch", json={"batch_id": "roster", "tasks": tasks[:1]}).status_code == 409
+
+def test_batch_ids_that_are_not_plain_file_names_are_rejected(client):
+    task = {"source_image_url": "http://example.com/a.png"}
+    for batch_id in ("../../x", "roster.json", "a/b", "", "x" * 65):
+        assert client.post("/run-batch", json={"batch_id": batch_id, "tasks": [task]}).status_code == 422
+
+def test_job_ids_that_are_not_plain_file_names_are_rejected(client):
+    task = {"source_image_url": "http://example.com/a.png"}
+    multi_task = {**task, "motions": [{"name": "idle", "motion_prompt": "standing idle"}]}
+    for job_id in ("../../x", "a/b", "", "x" * 65):
+        assert client.post("/run-task", json={**task, "job_id": job_id}).status_code == 422
+        assert client.post("/run-multi-task", json={**multi_task, "job_id": job_id}).status_code == 422
+        assert client.post("/run-batch", json={"tasks": [{**task, "job_id": job_id}]}).status_code == 422
+    client.downloader.prefetch.assert_not_called()
+
+def test_tasks_get_unique_default_job_ids():
+    first = main.InferenceTask(source_image_url="http://example.com/a.png")
+    second = main.InferenceTask(source_image_url="http://example.com/a.png")
+    assert first.job_id != second.job_id
+
+def test_models_outside_the_allowlist_are_rejected(client):
+    for params in ({"model_id": "someone/huge-model"}, {"motion_adapter_id": "/etc/passwd"}):
+        task = {"source_image_url": "http://example.com/a.png", "params": params}
+        response = client.post("/run-task", json=task)
+        assert response.status_code == 422
+        assert "not enabled on this server" in response.text
+    client.downloader.prefetch.assert_not_called()
+
+def test_invalid_pose_model_complexity_is_rejected_on_submit(client):
+    task = {"source_image_url": "http://example.com/a.png", "params": {"pose_model_complexity": 3}}
+    assert client.post("/run-task", json=task).status_code == 422
+    assert main.InferenceTaskParams(pose_model_complexity=2).pose_model_complexity == 2
+
+def test_unknown_job_returns_404(client):
+    assert client.get("/api/job/does-not-exist/status").status_code == 404
+
+def test_preview_gif_is_built_lazily_from_sprite_sheet(client, tmp_path):
+    from utils import image_utils
+    from PIL import Image
+
+    job_dir = tmp_path / "preview-job"
+    job_dir.mkdir()
+    frames = [Image.new('RGBA', (16, 16), (i * 60, 0, 0, 255)) for i in range(4)]
+    image_utils.create_sprite_sheet(frames, columns=2).save(job_dir / "character_sprites.png")
+    (job_dir / "character_anim.json").write_text(
+        '{"animation_properties": {"num_frames": 4, "frame_width": 16, "frame_height": 16, "columns": 2, "rows": 2}}'
+    )
+
+    with patch.object(main, 'BASE_OUTPUT_DIR', tmp_path):
+        assert not (job_dir / "preview.gif").exists()
+        response = client.get("/api/preview/preview-job")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/gif"
+    assert Image.open(job_dir / "preview.gif").n_frames == 4
+
+@patch('main.process_full_pipeline')
+def test_event_stream_pushes_job_events_until_completion(mock_pipeline, client):
+    def pipeline(task, events, progress, **kwargs):
+        progress("Generating animation frames.", 25)
+        events("step", {"step": 1, "total_steps": 1})
+        return {"status": "complete", "job_id": task.job_id, "output_files": {}}
+    mock_pipeline.side_effect = pipeline
+
+    client.post("/run-task", json={"job_id": "sse-job", "source_image_url": "http://example.com/a.png"})
+    with client.stream("GET", "/api/job/sse-job/events") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    messages = [block for block in body.split("\n\n") if block.startswith("id:")]
+    names = [block.split("\n")[1].removeprefix("event: ") for block in messages]
+    assert names[-1] == "complete"
+    assert "step" in names
+    assert '"message": "Generating animation frames."' in body
+
+    # A client reconnecting after the last event gets nothing more and the stream closes.
+    last_id = messages[-1].split("\n")[0].removeprefix("id: ")
+    with client.stream("GET", "/api/job/sse-job/events", headers={"Last-Event-ID": last_id}) as response:
+        assert "".join(response.iter_text()) == ""
+
+@patch('main.process_full_pipeline')
+def test_metrics_endpoint_exposes_queue_job_and_cache_metrics(mock_pipeline, client):
+    mock_pipeline.return_value = {"status": "complete", "job_id": "metrics-job", "output_files": {}}
+    client.post("/run-task", json={"job_id": "metrics-job", "source_image_url": "http://example.com/a.png"})
+    main.job_queue.wait("metrics-job", timeout=5)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert "spriteshift_queue_depth 0" in text
+    assert "spriteshift_queue_wait_seconds_count" in text
+    assert 'spriteshift_cache_hits_total{cache="prompt_embeddings"}' in text
@@ -0,0 +1,29 @@
+import base64
+import io
+import sys
+from pathlib import Path
+
+import torch
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline import latent_preview
+
+# --- Test Cases ---
+
+def test_preview_event_lays_frames_out_at_latent_resolution():
+    latents = torch.zeros(4, 3, 8, 6)
+    latents[0, 1] = 2.0  # Saturates the second frame.
+
+    event = latent_preview.preview_event(latents, step=5, total_steps=25)
+
+    assert (event["step"], event["total_steps"], event["num_frames"]) == (5, 25, 3)
+    assert (event["frame_width"], event["frame_height"]) == (6, 8)
+    prefix = "data:image/png;base64,"
+    assert event["image"].startswith(prefix)
+    strip = Image.open(io.BytesIO(base64.b64decode(event["image"][len(prefix):])))
+    assert strip.size == (18, 8)
+    # Zero latents map to mid grey; a strong first channel pushes every colour up.
+    assert strip.getpixel((0, 0)) == (127, 127, 127)
+    assert all(value > 127 for value in strip.getpixel((7, 0)))
@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.metrics import JobTrace, MetricsRegistry, STAGE_SECONDS
+
+# --- Test Cases ---
+
+def test_registry_renders_prometheus_text_format():
+    registry = MetricsRegistry()
+    jobs = registry.counter("jobs_total", "Finished jobs.")
+    peak = registry.gauge("peak_bytes", "High-water mark.")
+    durations = registry.histogram("stage_seconds", "Stage durations.", buckets=(0.1, 1.0))
+    registry.add_collector(lambda: [("queue_depth", "gauge", "Waiting jobs.", [({}, 3)])])
+    registry.add_collector(lambda: 1 / 0)  # A failing collector must not break the scrape.
+
+    jobs.inc(outcome="complete")
+    jobs.inc(outcome="complete")
+    jobs.inc(outcome="failed")
+    peak.set_max(100)
+    peak.set_max(50)
+    durations.observe(0.05, stage="pose")
+    durations.observe(0.5, stage="pose")
+    durations.observe(5.0, stage="pose")
+
+    text = registry.render()
+    lines = text.splitlines()
+    assert "# TYPE jobs_total counter" in lines
+    assert 'jobs_total{outcome="complete"} 2' in lines
+    assert 'jobs_total{outcome="failed"} 1' in lines
+    assert "peak_bytes 100" in lines
+    assert 'stage_seconds_bucket{stage="pose",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="pose",le="1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="pose",le="+Inf"} 3' in lines
+    assert 'stage_seconds_sum{stage="pose"} 5.55' in lines
+    assert 'stage_seconds_count{stage="pose"} 3' in lines
+    assert "queue_depth 3" in lines
+    assert text.endswith("\n")
+
+def test_job_trace_accumulates_spans_and_feeds_the_stage_histogram():
+    before = STAGE_SECONDS.count(stage="test-encode")
+    trace = JobTrace()
+    with trace.span("test-encode"):
+        pass
+    trace.add("test-encode", 0.25)
+
+    breakdown = trace.describe()
+    assert set(breakdown["spans"]) == {"test-encode"}
+    assert breakdown["spans"]["test-encode"] >= 0.25
+    assert STAGE_SECONDS.count(stage="test-encode") == before + 2
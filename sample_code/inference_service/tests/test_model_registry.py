@@ -0,0 +1,88 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline.model_registry import ModelRegistry
+
+class FakeModel:
+    def __init__(self, key):
+        self.key = key
+        self.released = False
+
+def make_registry(load_delay: float = 0.0):
+    """Builds a registry around a fake loader that counts how often each key is loaded."""
+    load_counts = {}
+
+    def loader(key):
+        time.sleep(load_delay)
+        load_counts[key] = load_counts.get(key, 0) + 1
+        return FakeModel(key)
+
+    def unloader(model):
+        model.released = True
+
+    registry = ModelRegistry(loader=loader, size_of=lambda model: 1024, unloader=unloader)
+    return registry, load_counts
+
+def test_registry_loads_each_variant_once_under_concurrency():
+    registry, load_counts = make_registry(load_delay=0.05)
+    key = ("base-model", "motion-adapter")
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(registry.get(key))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert load_counts == {key: 1}
+    assert all(model is results[0] for model in results)
+
+def test_registry_keeps_variants_separate_and_reports_stats():
+    registry, load_counts = make_registry()
+    first = registry.get(("base-model", "adapter-a"))
+    second = registry.get(("base-model", "adapter-b"))
+    registry.get(("base-model", "adapter-a"))
+
+    assert first is not second
+    stats = registry.stats()
+    assert stats["num_models"] == 2
+    assert stats["total_resident_bytes"] == 2048
+    use_counts = {tuple(m["key"]): m["use_count"] for m in stats["models"]}
+    assert use_counts[("base-model", "adapter-a")] == 2
+    assert all(m["load_seconds"] >= 0 for m in stats["models"])
+
+def test_registry_clear_releases_models():
+    registry, _ = make_registry()
+    model = registry.get(("base-model", "adapter-a"))
+
+    registry.clear()
+
+    assert model.released
+    assert not registry.is_loaded(("base-model", "adapter-a"))
+    assert registry.stats()["num_models"] == 0
+
+def test_registry_limit_unloads_least_recently_used_idle_variant():
+    registry, load_counts = make_registry()
+    registry.set_max_models(2)
+    registry.preload([("base-model", "default")])
+    first = registry.get(("base-model", "adapter-a"))
+
+    with registry.hold(("base-model", "adapter-a")):
+        # adapter-a is in use and the default is pinned: neither can make room.
+        second = registry.get(("base-model", "adapter-b"))
+        assert registry.stats()["num_models"] == 3
+        assert not first.released
+
+    # Once released, the least recently used unpinned variant goes.
+    assert first.released and not second.released
+    assert not registry.is_loaded(("base-model", "adapter-a"))
+
+    registry.get(("base-model", "adapter-c"))
+    assert second.released
+    assert registry.is_loaded(("base-model", "default"))
+    stats = registry.stats()
+    assert (stats["num_models"], stats["evictions"]) == (2, 2)
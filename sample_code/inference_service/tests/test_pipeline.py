@@ -9,7 +9,12 @@ from PIL import Image
 # This is a common pattern for simple project structures without a full package installation.
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from main import process_full_pipeline, InferenceTask, InferenceTaskParams
+import main
+from main import (
+    process_full_pipeline, process_multi_motion_pipeline, process_preview_pipeline,
+    InferenceTask, InferenceTaskParams, MotionSpec, MultiMotionTask
+)
+from utils.result_cache import ResultCache
 
 # --- Test Helper Functions ---
 
@@ -43,9 +48,9 @@ def test_image(tmp_path: Path) -> Path:
 
 # --- Test Case ---
 
-@patch('main.image_utils.download_image')
-@patch('main.background_remover.remove_background')
-@patch('main.pose_extractor.extract_pose')
+@patch('main.image_utils.download_image_bytes')
+@patch('main.background_remover.remove_background_image')
+@patch('main.pose_extractor.extract_pose_from_array')
 @patch('main.animator.generate_animation')
 def test_full_pipeline_successful_run(
     mock_generate_animation: MagicMock,
@@ -66,20 +71,13 @@ def test_full_pipeline_successful_run(
     # 1. --- Setup Mocks ---
     temp_dir, output_dir = tmp_dirs
 
-    # Mock download_image: it should "download" our local test image.
-    def download_side_effect(url: str, save_path: Path) -> bool:
-        import shutil
-        shutil.copy(test_image, save_path)
-        return True
-    mock_download_image.side_effect = download_side_effect
+    # Mock download_image_bytes: it should "download" our local test image into memory.
+    mock_download_image.return_value = test_image.read_bytes()
 
-    # Mock remove_background: it should just copy the input to the output.
-    def remove_bg_side_effect(input_path: Path, output_path: Path):
-        import shutil
-        shutil.copy(input_path, output_path)
-    mock_remove_background.side_effect = remove_bg_side_effect
+    # Mock remove_background_image: it should just return the input image.
+    mock_remove_background.side_effect = lambda image: image
 
-    # Mock extract_pose: return some valid-looking dummy data.
+    # Mock extract_pose_from_array: return some valid-looking dummy data.
     mock_extract_pose.return_value = [{"x": 0.5, "y": 0.5, "z": -0.5, "visibility": 0.99}]
 
     # Mock generate_animation: return a list of dummy PIL frames.
@@ -118,6 +116,10 @@ def test_full_pipeline_successful_run(
     mock_extract_pose.assert_called_once()
     mock_generate_animation.assert_called_once()
 
+    # Stages hand off in memory: no intermediate artifacts or GIF unless requested.
+    assert not (temp_dir / job_id).exists()
+    assert mock_generate_animation.call_args.kwargs["output_path"] is None
+
     # Assert the content of the metadata file is correct
     with open(metadata_path, 'r') as f:
         metadata = json.load(f)
@@ -139,3 +141,482 @@ def test_full_pipeline_successful_run(
     sprite_sheet_img = Image.open(sprite_sheet_path)
     assert sprite_sheet_img.width == 4 * dummy_frames[0].width
     assert sprite_sheet_img.height == (num_frames // 4) * dummy_frames[0].height
+
+@patch('main.image_utils.download_image_bytes')
+@patch('main.background_remover.remove_background_image')
+@patch('main.pose_extractor.extract_pose_from_array')
+@patch('main.animator.generate_animation')
+def test_resubmitted_task_is_served_from_result_cache(
+    mock_generate_animation: MagicMock,
+    mock_extract_pose: MagicMock,
+    mock_remove_background: MagicMock,
+    mock_download_image: MagicMock,
+    tmp_dirs: tuple[Path, Path],
+    test_image: Path,
+    tmp_path: Path
+):
+    """
+    A second task for the same image and parameters, even under a different URL,
+    must reuse the cached assets without re-running any model stage.
+    """
+    temp_dir, output_dir = tmp_dirs
+    cache = ResultCache(tmp_path / "cache")
+
+    mock_download_image.return_value = test_image.read_bytes()
+    mock_remove_background.side_effect = lambda image: image
+    mock_extract_pose.return_value = None
+    mock_generate_animation.return_value = create_dummy_frames(num_frames=8, size=(64, 64))
+
+    params = InferenceTaskParams(num_frames=8, seed=42)
+    first = process_full_pipeline(
+        InferenceTask(job_id="first", source_image_url="http://example.com/a.png", params=params),
+        temp_base_dir=temp_dir, output_base_dir=output_dir, cache=cache
+    )
+    second = process_full_pipeline(
+        InferenceTask(job_id="second", source_image_url="http://mirror.example.com/a.png", params=params),
+        temp_base_dir=temp_dir, output_base_dir=output_dir, cache=cache
+    )
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    mock_remove_background.assert_called_once()
+    mock_extract_pose.assert_called_once()
+    mock_generate_animation.assert_called_once()
+
+    with open(output_dir / "second" / "character_anim.json") as f:
+        metadata = json.load(f)
+    assert metadata["job_id"] == "second"
+    assert metadata["source_image_url"] == "http://mirror.example.com/a.png"
+    assert (output_dir / "second" / "character_sprites.png").read_bytes() == \
+        (output_dir / "first" / "character_sprites.png").read_bytes()
+
+    # A different seed must miss the frame cache but reuse the upstream stages.
+    process_full_pipeline(
+        InferenceTask(job_id="third", source_image_url="http://example.com/a.png",
+                      params=InferenceTaskParams(num_frames=8, seed=7)),
+        temp_base_dir=temp_dir, output_base_dir=output_dir, cache=cache
+    )
+    mock_remove_background.assert_called_once()
+    mock_extract_pose.assert_called_once()
+    assert mock_generate_animation.call_count == 2
+
+@patch('main.image_utils.download_image_bytes')
+@patch('main.background_remover.remove_background_image')
+@patch('main.pose_extractor.extract_pose_from_array')
+@patch('main.animator.generate_animation')
+def test_unseeded_task_is_generated_afresh_each_time(
+    mock_generate_animation: MagicMock,
+    mock_extract_pose: MagicMock,
+    mock_remove_background: MagicMock,
+    mock_download_image: MagicMock,
+    tmp_dirs: tuple[Path, Path],
+    test_image: Path,
+    tmp_path: Path
+):
+    """Without a seed every submission is a new draw: frames and assets bypass the cache."""
+    temp_dir, output_dir = tmp_dirs
+    cache = ResultCache(tmp_path / "cache")
+    mock_download_image.return_value = test_image.read_bytes()
+    mock_remove_background.side_effect = lambda image: image
+    mock_extract_pose.return_value = None
+    mock_generate_animation.return_value = create_dummy_frames(num_frames=4, size=(32, 32))
+
+    params = InferenceTaskParams(num_frames=4)
+    results = [
+        process_full_pipeline(
+            InferenceTask(job_id=job_id, source_image_url="http://example.com/a.png", params=params),
+            temp_base_dir=temp_dir, output_base_dir=output_dir, cache=cache
+        )
+        for job_id in ("first", "second")
+    ]
+
+    assert [result["cached"] for result in results] == [False, False]
+    assert mock_generate_animation.call_count == 2
+    # The deterministic upstream stages are still cached.
+    mock_remove_background.assert_called_once()
+
+@patch('main.image_utils.download_image_bytes')
+@patch('main.background_remover.remove_background_image')
+@patch('main.pose_extractor.extract_pose_from_array')
+@patch('main.animator.generate_animation')
+def test_persist_intermediates_writes_debug_artifacts(
+    mock_generate_animation: MagicMock,
+    mock_extract_pose: MagicMock,
+    mock_remove_background: MagicMock,
+    mock_download_image: MagicMock,
+    tmp_dirs: tuple[Path, Path],
+    test_image: Path
+):
+    """With the debug flag set, every intermediate artifact is written to the job's temp directory."""
+    temp_dir, output_dir = tmp_dirs
+    mock_download_image.return_value = test_image.read_bytes()
+    mock_remove_background.side_effect = lambda image: image
+    mock_extract_pose.return_value = [{"x": 0.5, "y": 0.5, "z": -0.5, "visibility": 0.99}]
+    mock_generate_animation.return_value = create_dummy_frames(num_frames=4, size=(32, 32))
+
+    task = InferenceTask(
+        job_id="debug-job",
+        source_image_url="http://example.com/fake_image.png",
+        params=InferenceTaskParams(num_frames=4, persist_intermediates=True)
+    )
+    process_full_pipeline(task=task, temp_base_dir=temp_dir, output_base_dir=output_dir)
+
+    job_temp_dir = temp_dir / "debug-job"
+    assert (job_temp_dir / "00_source.png").read_bytes() == test_image.read_bytes()
+    assert (job_temp_dir / "01_no_bg.png").exists()
+    assert (job_temp_dir / "02_pose_data.json").exists()
+    assert mock_generate_animation.call_args.kwargs["output_path"] == job_temp_dir / "03_animation.gif"
+
+@patch('main.image_utils.download_image_bytes')
+@patch('main.background_remover.remove_background_image')
+@patch('main.pose_extractor.extract_pose_from_array')
+@patch('main.pose_extractor.extract_poses')
+@patch('main.animator.generate_animation')
+def test_limbs_hitbox_mode_adds_per_frame_hurtboxes(
+    mock_generate_animation: MagicMock,
+    mock_extract_poses: MagicMock,
+    mock_extract_pose: MagicMock,
+    mock_remove_background: MagicMock,
+    mock_download_image: MagicMock,
+    tmp_dirs: tuple[Path, Path],
+    test_image: Path
+):
+    """In "limbs" mode every generated frame is pose-estimated in one batch call."""
+    temp_dir, output_dir = tmp_dirs
+    mock_download_image.return_value = test_image.read_bytes()
+    mock_remove_background.side_effect = lambda image: image
+    mock_extract_pose.return_value = None
+    frames = create_dummy_frames(num_frames=4, size=(64, 64))
+    mock_generate_animation.return_value = frames
+    torso = [{"x": 0.5, "y": 0.5, "z": 0.0, "visibility": 0.0}] * 33
+    torso = [dict(lm, visibility=0.9) if i in (11, 12, 23, 24) else lm for i, lm in enumerate(torso)]
+    mock_extract_poses.return_value = [torso, None, torso, None]
+
+    task = InferenceTask(
+        job_id="limbs-job",
+        source_image_url="http://example.com/fake_image.png",
+        params=InferenceTaskParams(num_frames=4, hitbox_mode="limbs")
+    )
+    process_full_pipeline(task=task, temp_base_dir=temp_dir, output_base_dir=output_dir)
+
+    mock_extract_poses.assert_called_once()
+    assert mock_extract_poses.call_args.args[0] == frames
+    with open(output_dir / "limbs-job" / "character_anim.json") as f:
+        metadata = json.load(f)
+    assert set(metadata["frames"][0]["hurtboxes"]) == {"torso"}
+    assert metadata["frames"][1]["hurtboxes"] == {}
+    assert metadata["frames"][0]["width"] == 64
+
+@patch('main.image_utils.download_image_bytes')
+@patch('main.background_remover.remove_background_image')
+@patch('main.pose_extractor.extract_pose_from_array')
+@patch('main.animator.generate_animation')
+def test_atlas_layout_writes_trimmed_sprites_and_relative_hitboxes(
+    mock_generate_animation: MagicMock,
+    mock_extract_pose: MagicMock,
+    mock_remove_background: MagicMock,
+    mock_download_image: MagicMock,
+    tmp_dirs: tuple[Path, Path],
+    test_image: Path,
+    tmp_path: Path
+):
+    """The atlas layout packs trimmed frames, records their offsets and survives the result cache."""
+    temp_dir, output_dir = tmp_dirs
+    cache = ResultCache(tmp_path / "cache")
+    mock_download_image.return_value = test_image.read_bytes()
+    mock_remove_background.side_effect = lambda image: image
+    mock_extract_pose.return_value = None
+    frames = []
+    for i in range(4):
+        frame = Image.new('RGBA', (128, 128), (0, 0, 0, 0))
+        frame.paste(Image.new('RGBA', (40, 60), (255, 0, 0, 255)), (20 + i * 10, 30))
+        frames.append(frame)
+    mock_generate_animation.return_value = frames
+
+    params = InferenceTaskParams(num_frames=4, sheet_layout="atlas", seed=3)
+    result = process_full_pipeline(
+        InferenceTask(job_id="atlas-job", source_image_url="http://example.com/a.png", params=params),
+        temp_base_dir=temp_dir, output_base_dir=output_dir, cache=cache
+    )
+
+    with open(output_dir / "atlas-job" / "character_anim.json") as f:
+        metadata = json.load(f)
+    assert metadata["animation_properties"]["layout"] == "atlas"
+    assert metadata["atlas"]["unique_frames"] == 1
+    assert result["output_files"]["atlas_pages"] == [str(output_dir / "atlas-job" / "character_sprites.png")]
+    page = Image.open(output_dir / "atlas-job" / "character_sprites.png")
+    assert page.size == tuple(metadata["atlas"]["page_sizes"][0]) == (64, 64)
+
+    last = metadata["frames"][3]
+    assert last["sprite"]["offset_x"] == 50 and last["sprite"]["offset_y"] == 30
+    assert (last["x"], last["y"], last["width"], last["height"]) == (0, 0, 40, 60)
+
+    cached = process_full_pipeline(
+        InferenceTask(job_id="atlas-again", source_image_url="http://example.com/a.png", params=params),
+        temp_base_dir=temp_dir, output_base_dir=output_dir, cache=cache
+    )
+    assert cached["cached"] is True
+    assert (output_dir / "atlas-again" / "character_sprites.png").read_bytes() == \
+        (output_dir / "atlas-job" / "character_sprites.png").read_bytes()
+
+@patch('main.image_utils.download_image_bytes')
+@patch('main.background_remover.remove_background_image')
+@patch('main.pose_extractor.extract_pose_from_array')
+@patch('main.animator.generate_animation')
+def test_webp_sheet_is_encoded_and_reported(
+    mock_generate_animation: MagicMock,
+    mock_extract_pose: MagicMock,
+    mock_remove_background: MagicMock,
+    mock_download_image: MagicMock,
+    tmp_dirs: tuple[Path, Path],
+    test_image: Path
+):
+    """The chosen format determines the sheet's file name; bytes and encode time are reported."""
+    temp_dir, output_dir = tmp_dirs
+    mock_download_image.return_value = test_image.read_bytes()
+    mock_remove_background.side_effect = lambda image: image
+    mock_extract_pose.return_value = None
+    mock_generate_animation.return_value = create_dummy_frames(num_frames=4, size=(32, 32))
+
+    task = InferenceTask(
+        job_id="webp-job",
+        source_image_url="http://example.com/fake_image.png",
+        params=InferenceTaskParams(num_frames=4, image_format="webp", encode_preset="small")
+    )
+    result = process_full_pipeline(task=task, temp_base_dir=temp_dir, output_base_dir=output_dir)
+
+    sheet_path = output_dir / "webp-job" / "character_sprites.webp"
+    assert result["output_files"]["sprite_sheet"] == str(sheet_path)
+    assert Image.open(sheet_path).format == "WEBP"
+    assert result["encoding"]["format"] == "webp" and result["encoding"]["preset"] == "small"
+    assert result["encoding"]["bytes"] == sheet_path.stat().st_size
+    with open(output_dir / "webp-job" / "character_anim.json") as f:
+        assert json.load(f)["sheets"] == ["character_sprites.webp"]
+
+@patch('main.image_utils.download_image_bytes')
+@patch('main.background_remover.remove_background_image')
+@patch('main.pose_extractor.extract_pose_from_array')
+@patch('main.animator.generate_animation')
+def test_fast_tier_generates_with_lightning_settings(
+    mock_generate_animation: MagicMock,
+    mock_extract_pose: MagicMock,
+    mock_remove_background: MagicMock,
+    mock_download_image: MagicMock,
+    tmp_dirs: tuple[Path, Path],
+    test_image: Path
+):
+    """The fast tier swaps in the Lightning adapter with its distilled step count and no guidance."""
+    temp_dir, output_dir = tmp_dirs
+    mock_download_image.return_value = test_image.read_bytes()
+    mock_remove_background.side_effect = lambda image: image
+    mock_extract_pose.return_value = None
+    mock_generate_animation.return_value = create_dummy_frames(num_frames=4, size=(32, 32))
+
+    task = InferenceTask(
+        job_id="fast-job",
+        source_image_url="http://example.com/fake_image.png",
+        params=InferenceTaskParams(num_frames=4, generation_tier="fast", lightning_steps=2, num_inference_steps=40)
+    )
+    process_full_pipeline(task=task, temp_base_dir=temp_dir, output_base_dir=output_dir)
+
+    kwargs = mock_generate_animation.call_args.kwargs
+    assert kwargs["motion_adapter_id"] == "ByteDance/AnimateDiff-Lightning:2step"
+    assert kwargs["num_inference_steps"] == 2
+    assert kwargs["guidance_scale"] == 1.0
+
+@patch('main.image_utils.download_image_bytes')
+@patch('main.background_remover.remove_background_image')
+@patch('main.pose_extractor.extract_pose_from_array')
+@patch('main.animator.generate_animations')
+@patch('main.animator.generate_animation')
+def test_multi_motion_job_shares_stages_and_emits_animations(
+    mock_generate_animation: MagicMock,
+    mock_generate_animations: MagicMock,
+    mock_extract_pose: MagicMock,
+    mock_remove_background: MagicMock,
+    mock_download_image: MagicMock,
+    tmp_dirs: tuple[Path, Path],
+    test_image: Path,
+    tmp_path: Path
+):
+    """
+    Shared stages run once, motions of equal length are generated in one call, and the
+    metadata has the `animations`, `h_frames` and `v_frames` keys CharacterLoader.gd reads.
+    Frames are cached per motion, so a single-motion job for one of them hits the cache.
+    """
+    temp_dir, output_dir = tmp_dirs
+    mock_download_image.return_value = test_image.read_bytes()
+    mock_remove_background.side_effect = lambda image: image
+    mock_extract_pose.return_value = None
+    mock_generate_animations.side_effect = lambda motion_prompts, num_frames, **kwargs: [
+        create_dummy_frames(num_frames=num_frames, size=(32, 32)) for _ in motion_prompts
+    ]
+    cache = ResultCache(tmp_path / "cache")
+
+    task = MultiMotionTask(
+        job_id="moves-job",
+        source_image_url="http://example.com/fake_image.png",
+        motions=[
+            MotionSpec(name="idle", motion_prompt="standing idle"),
+            MotionSpec(name="punch", motion_prompt="throwing a punch", frame_duration=0.05),
+            MotionSpec(name="walk", motion_prompt="walking forward", num_frames=6),
+        ],
+        params=InferenceTaskParams(num_frames=4, num_columns_sprite_sheet=4, seed=5)
+    )
+    result = process_multi_motion_pipeline(task, temp_base_dir=temp_dir, output_base_dir=output_dir, cache=cache)
+
+    assert result["status"] == "complete"
+    mock_download_image.assert_called_once()
+    mock_remove_background.assert_called_once()
+    mock_extract_pose.assert_called_once()
+    # One call per frame count: idle and punch are batched together.
+    assert [c.kwargs["motion_prompts"] for c in mock_generate_animations.call_args_list] == [
+        ["standing idle", "throwing a punch"], ["walking forward"]
+    ]
+
+    with open(output_dir / "moves-job" / "character_anim.json") as f:
+        metadata = json.load(f)
+    assert (metadata["h_frames"], metadata["v_frames"]) == (4, 4)
+    assert metadata["animation_properties"]["num_frames"] == 14
+    animations = metadata["animations"]
+    assert list(animations) == ["idle", "punch", "walk"]
+    assert animations["punch"]["frames"] == [4, 5, 6, 7]
+    assert animations["punch"]["durations"] == [0.05] * 4
+    assert animations["walk"]["frames"] == list(range(8, 14))
+    assert animations["punch"]["hitboxes"]["5"] == [{"x": 0, "y": 0, "width": 32, "height": 32}]
+    assert Image.open(output_dir / "moves-job" / "character_sprites.png").size == (128, 128)
+
+    single = process_full_pipeline(
+        InferenceTask(
+            job_id="walk-only",
+            source_image_url="http://example.com/fake_image.png",
+            params=InferenceTaskParams(motion_prompt="walking forward", num_frames=6, seed=5)
+        ),
+        temp_base_dir=temp_dir, output_base_dir=output_dir, cache=cache
+    )
+    assert single["status"] == "complete"
+    mock_generate_animation.assert_not_called()
+
+def test_multi_motion_task_rejects_duplicate_names():
+    with pytest.raises(ValueError, match="idle"):
+        MultiMotionTask(
+            source_image_url="http://example.com/fake_image.png",
+            motions=[MotionSpec(name="idle", motion_prompt="idle"), MotionSpec(name="idle", motion_prompt="breathing")]
+        )
+
+@pytest.mark.parametrize("pipeline, task", [
+    (process_full_pipeline, InferenceTask(job_id="full", source_image_url="http://example.com/a.png")),
+    (process_preview_pipeline, InferenceTask(
+        job_id="preview", source_image_url="http://example.com/a.png", params=InferenceTaskParams(preview=True)
+    )),
+    (process_multi_motion_pipeline, MultiMotionTask(
+        job_id="multi", source_image_url="http://example.com/a.png",
+        motions=[MotionSpec(name="idle", motion_prompt="standing idle")]
+    )),
+])
+@patch('main.image_utils.download_image_bytes', return_value=None)
+def test_failed_job_is_counted_and_re_raised(mock_download_image: MagicMock, pipeline, task, tmp_dirs: tuple[Path, Path]):
+    temp_dir, output_dir = tmp_dirs
+    failed = main.metrics.JOBS_TOTAL.value(outcome="failed")
+
+    with pytest.raises(RuntimeError, match="Failed to download"):
+        pipeline(task, temp_base_dir=temp_dir, output_base_dir=output_dir)
+
+    assert main.metrics.JOBS_TOTAL.value(outcome="failed") == failed + 1
+    assert (output_dir / task.job_id).is_dir()
+
+@patch('main.image_utils.download_image_bytes')
+@patch('main.background_remover.remove_background_image')
+@patch('main.pose_extractor.extract_pose_from_array')
+@patch('main.animator.generate_animation')
+def test_timing_breakdown_is_added_on_request(
+    mock_generate_animation: MagicMock,
+    mock_extract_pose: MagicMock,
+    mock_remove_background: MagicMock,
+    mock_download_image: MagicMock,
+    tmp_dirs: tuple[Path, Path],
+    test_image: Path
+):
+    temp_dir, output_dir = tmp_dirs
+    mock_download_image.return_value = test_image.read_bytes()
+    mock_remove_background.side_effect = lambda image: image
+    mock_extract_pose.return_value = None
+    mock_generate_animation.return_value = create_dummy_frames(num_frames=4, size=(32, 32))
+
+    untimed = process_full_pipeline(
+        InferenceTask(job_id="untimed", source_image_url="http://example.com/a.png", params=InferenceTaskParams(num_frames=4)),
+        temp_base_dir=temp_dir, output_base_dir=output_dir
+    )
+    timed = process_full_pipeline(
+        InferenceTask(
+            job_id="timed",
+            source_image_url="http://example.com/a.png",
+            params=InferenceTaskParams(num_frames=4, include_timings=True)
+        ),
+        temp_base_dir=temp_dir, output_base_dir=output_dir
+    )
+
+    assert "timings" not in untimed
+    spans = timed["timings"]["spans"]
+    assert {"download", "background", "pose", "generate", "hitboxes", "sprite_sheet", "encode", "metadata"} <= set(spans)
+    assert timed["timings"]["total_seconds"] >= spans["generate"]
+
+@patch('main.image_utils.download_image_bytes')
+@patch('main.background_remover.remove_background_image')
+@patch('main.pose_extractor.extract_pose_from_array')
+@patch('main.animator.generate_animation')
+def test_preview_renders_small_animation_and_promotes_with_its_seed(
+    mock_generate_animation: MagicMock,
+    mock_extract_pose: MagicMock,
+    mock_remove_background: MagicMock,
+    mock_download_image: MagicMock,
+    tmp_dirs: tuple[Path, Path],
+    test_image: Path,
+    tmp_path: Path
+):
+    temp_dir, output_dir = tmp_dirs
+    cache = ResultCache(tmp_path / "cache")
+    mock_download_image.return_value = test_image.read_bytes()
+    mock_remove_background.side_effect = lambda image: image
+    mock_extract_pose.return_value = None
+    mock_generate_animation.side_effect = lambda **kwargs: create_dummy_frames(
+        num_frames=kwargs["num_frames"], size=(kwargs["width"], kwargs["height"])
+    )
+
+    params = InferenceTaskParams(num_frames=16, width=512, height=384, preview=True)
+    result = process_preview_pipeline(
+        InferenceTask(job_id="preview", source_image_url="http://example.com/a.png", params=params),
+        temp_base_dir=temp_dir, output_base_dir=output_dir, cache=cache
+    )
+
+    preview_kwargs = mock_generate_animation.call_args.kwargs
+    assert (preview_kwargs["width"], preview_kwargs["height"]) == (256, 192)
+    assert preview_kwargs["num_frames"] == 8
+    assert preview_kwargs["num_inference_steps"] == 10
+    assert preview_kwargs["seed"] == result["seed"]
+    mock_extract_pose.assert_not_called()
+    with Image.open(result["output_files"]["preview"]) as preview:
+        assert preview.format == "WEBP"
+        assert preview.n_frames == 8
+    assert not (output_dir / "preview" / "character_anim.json").exists()
+
+    # The promoted task renders at full size with the preview's seed and reuses the cached background.
+    render = result["render"]
+    promoted = InferenceTask(job_id="full", source_image_url=render["source_image_url"],
+                             params=InferenceTaskParams(**render["params"]))
+    assert promoted.params.preview is False
+    process_full_pipeline(promoted, temp_base_dir=temp_dir, output_base_dir=output_dir, cache=cache)
+
+    full_kwargs = mock_generate_animation.call_args.kwargs
+    assert (full_kwargs["width"], full_kwargs["height"], full_kwargs["num_frames"]) == (512, 384, 16)
+    assert full_kwargs["seed"] == result["seed"]
+    mock_remove_background.assert_called_once()
+    assert (output_dir / "full" / "character_anim.json").exists()
+
+def test_multi_motion_task_rejects_preview():
+    with pytest.raises(ValueError, match="Previews"):
+        MultiMotionTask(
+            source_image_url="http://example.com/a.png",
+            motions=[MotionSpec(name="idle", motion_prompt="idle")],
+            params=InferenceTaskParams(preview=True)
+        )
@@ -0,0 +1,71 @@
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline import pose_extractor
+
+class FakePose:
+    """Stands in for mediapipe's Pose: reports one landmark at the mean red value of the image."""
+    instances = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.calls = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        FakePose.instances.append(self)
+
+    def process(self, image_rgb):
+        # A Pose instance must never be used by two threads at once.
+        assert self.lock.acquire(blocking=False), "estimator shared between threads"
+        try:
+            self.calls += 1
+            if image_rgb[:, :, 0].max() == 0:
+                return SimpleNamespace(pose_landmarks=None)
+            landmark = SimpleNamespace(x=float(image_rgb[:, :, 0].mean()), y=0.5, z=0.0, visibility=1.0)
+            return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=[landmark]))
+        finally:
+            self.lock.release()
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def fake_mediapipe():
+    FakePose.instances = []
+    with patch.object(pose_extractor.PosePool, '_create_estimator', lambda self: FakePose(model_complexity=self.model_complexity)):
+        yield
+    pose_extractor.close_pools()
+    pose_extractor.configure()
+
+def test_estimators_are_pooled_per_complexity(fake_mediapipe):
+    pose_extractor.configure(pool_size=1, model_complexity=0)
+    image = np.full((8, 8, 3), 10, dtype=np.uint8)
+
+    pose_extractor.extract_pose_from_array(image)
+    pose_extractor.extract_pose_from_array(image)
+    pose_extractor.extract_pose_from_array(image, model_complexity=2)
+
+    assert [p.kwargs["model_complexity"] for p in FakePose.instances] == [0, 2]
+    assert FakePose.instances[0].calls == 2
+
+def test_extract_poses_batches_across_pool_and_keeps_order(fake_mediapipe):
+    pose_extractor.configure(pool_size=3, model_complexity=1)
+    images = [np.full((8, 8, 4), value, dtype=np.uint8) for value in (0, 10, 20, 30, 40)]
+
+    results = pose_extractor.extract_poses(images)
+
+    assert results[0] is None
+    assert [r[0]["x"] for r in results[1:]] == [10.0, 20.0, 30.0, 40.0]
+    assert len(FakePose.instances) <= 3
+    assert sum(p.calls for p in FakePose.instances) == 5
+
+    pose_extractor.close_pools()
+    assert all(p.closed for p in FakePose.instances)
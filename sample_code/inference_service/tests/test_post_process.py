@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline import hitbox_generator, post_process
+from utils import shared_frames
+
+# --- Test Helper Functions ---
+
+def animation(num_frames=6, size=(96, 64)):
+    """RGBA frames with a moving opaque block and a semi-transparent one."""
+    frames = []
+    for i in range(num_frames):
+        frame = Image.new('RGBA', size, (0, 0, 0, 0))
+        frame.paste(Image.new('RGBA', (30, 40), (200, 40, 40, 255)), (5 + 4 * i, 10))
+        frame.paste(Image.new('RGBA', (12, 12), (40, 40, 200, 90)), (70, 40))
+        frames.append(frame)
+    return frames
+
+@pytest.fixture
+def process_pool():
+    post_process.configure(max_workers=1)
+    yield
+    post_process.configure(max_workers=0)
+
+# --- Test Cases ---
+
+def test_shared_frames_round_trip_and_unlink():
+    frames = animation()
+    with shared_frames.SharedFrames(frames) as shared:
+        assert shared.handle.shape == (6, 64, 96, 4)
+        with shared_frames.attach(shared.handle) as array:
+            images = shared_frames.to_images(array)
+            del array
+    assert all(np.array_equal(np.asarray(a), np.asarray(b)) for a, b in zip(images, frames))
+    with pytest.raises(FileNotFoundError):
+        with shared_frames.attach(shared.handle):
+            pass
+
+def test_mixed_sizes_or_modes_are_not_shared():
+    frames = animation()
+    assert shared_frames.can_share(frames)
+    assert not shared_frames.can_share(frames[:2] + [frames[2].resize((32, 32))])
+    assert not shared_frames.can_share(frames[:2] + [frames[2].convert('LA')])
+
+@pytest.mark.parametrize("alpha_threshold", [0, 100])
+def test_process_pool_hitboxes_match_in_thread(process_pool, alpha_threshold):
+    frames = animation()
+    expected = hitbox_generator.generate_hitboxes_for_animation(
+        frames, alpha_threshold=alpha_threshold, include_regions=True
+    )
+    assert post_process.generate_hitboxes(frames, alpha_threshold=alpha_threshold, include_regions=True) == expected
+
+def test_process_pool_sprite_sheet_matches_in_thread(tmp_path):
+    frames = animation(num_frames=5)
+    in_thread = post_process.assemble_sprite_sheet(frames, 2, tmp_path / "thread.png", fmt="png8")
+    post_process.configure(max_workers=1)
+    try:
+        pooled = post_process.assemble_sprite_sheet(frames, 2, tmp_path / "pooled.png", fmt="png8")
+    finally:
+        post_process.configure(max_workers=0)
+
+    assert pooled.bytes == in_thread.bytes
+    with Image.open(in_thread.path) as a, Image.open(pooled.path) as b:
+        assert a.size == b.size == (192, 192)
+        assert np.array_equal(np.asarray(a.convert('RGBA')), np.asarray(b.convert('RGBA')))
@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+from typing import List
+
+import torch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline.prompt_cache import PromptEmbeddingCache
+
+# --- Helper Functions ---
+
+class FakeEncoder:
+    """Encodes each prompt as a (1, 4) row filled with its length, recording every call."""
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    def __call__(self, prompts: List[str]) -> torch.Tensor:
+        self.calls.append(list(prompts))
+        return torch.stack([torch.full((1, 4), float(len(p))) for p in prompts])
+
+# --- Test Cases ---
+
+def test_repeated_prompts_skip_the_encoder():
+    cache = PromptEmbeddingCache()
+    encode = FakeEncoder()
+
+    first = cache.get_embeddings("sd15", ["knight", "knight", "archer"], encode)
+    second = cache.get_embeddings("sd15", ["archer", "knight"], encode)
+
+    # Duplicates within a batch are encoded once, and the second batch is all hits.
+    assert encode.calls == [["knight", "archer"]]
+    assert first.shape == (3, 1, 4)
+    assert first[:, 0, 0].tolist() == [6.0, 6.0, 6.0]
+    assert second[:, 0, 0].tolist() == [6.0, 6.0]
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == 3
+    assert stats["misses"] == 2
+    assert stats["hit_rate"] == 0.6
+
+def test_embeddings_are_keyed_by_model():
+    cache = PromptEmbeddingCache()
+    encode = FakeEncoder()
+
+    cache.get_embeddings("sd15", ["knight"], encode)
+    cache.get_embeddings("other-model", ["knight"], encode)
+
+    assert encode.calls == [["knight"], ["knight"]]
+    assert cache.stats()["entries"] == 2
+
+def test_least_recently_used_prompts_are_evicted():
+    cache = PromptEmbeddingCache(max_entries=2)
+    encode = FakeEncoder()
+
+    cache.get_embeddings("sd15", ["a", "b"], encode)
+    cache.get_embeddings("sd15", ["a"], encode)  # "b" is now the least recently used
+    cache.get_embeddings("sd15", ["c"], encode)
+    cache.get_embeddings("sd15", ["a", "b"], encode)
+
+    assert encode.calls == [["a", "b"], ["c"], ["b"]]
+    assert cache.stats()["evictions"] == 2
+
+    cache.resize(1)
+    assert cache.stats()["entries"] == 1
+    cache.clear()
+    assert cache.stats()["entries"] == 0
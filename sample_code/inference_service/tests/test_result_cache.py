@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.result_cache import ResultCache, make_key
+
+def test_keys_depend_on_every_parameter():
+    base = make_key("frames", image="abc", motion_prompt="walk", seed=1)
+    assert base == make_key("frames", seed=1, motion_prompt="walk", image="abc")
+    assert base != make_key("frames", image="abc", motion_prompt="walk", seed=2)
+    assert base.startswith("frames-")
+
+def test_round_trips_typed_entries_and_counts_hits(tmp_path: Path):
+    cache = ResultCache(tmp_path / "cache")
+    frames = [Image.new('RGBA', (8, 8), (i, 0, 0, 255)) for i in range(3)]
+
+    assert cache.get_frames("frames-1") is None
+    cache.put_frames("frames-1", frames)
+    cache.put_json("pose-1", {"landmarks": None})
+
+    restored = cache.get_frames("frames-1")
+    assert [f.getpixel((0, 0)) for f in restored] == [(0, 0, 0, 255), (1, 0, 0, 255), (2, 0, 0, 255)]
+    assert cache.get_json("pose-1") == {"landmarks": None}
+
+    stats = cache.stats()
+    assert stats["by_stage"]["frames"] == {"hits": 1, "misses": 1}
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+def test_evicts_least_recently_used_entries_and_survives_restart(tmp_path: Path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=250)
+    cache.put_files("a-1", {"blob": b"a" * 100})
+    cache.put_files("b-1", {"blob": b"b" * 100})
+    cache.get_files("a-1")  # "a" is now the most recently used entry.
+    cache.put_files("c-1", {"blob": b"c" * 100})
+
+    assert cache.contains("a-1") and cache.contains("c-1")
+    assert not cache.contains("b-1")
+    assert cache.stats()["evictions"] == 1
+
+    reopened = ResultCache(tmp_path / "cache", max_bytes=250)
+    assert reopened.get_files("c-1") == {"blob": b"c" * 100}
+    assert reopened.stats()["total_bytes"] == 200
@@ -0,0 +1,68 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipeline.stage_graph import Stage, StageGraph, StageExecutor, StageTimeoutError, GPU
+
+@pytest.fixture
+def executor():
+    stage_executor = StageExecutor(cpu_workers=4, gpu_workers=1)
+    yield stage_executor
+    stage_executor.shutdown()
+
+def test_independent_stages_run_concurrently_and_dependencies_receive_results(executor):
+    # Both stages must be running at the same time for the barrier to release.
+    barrier = threading.Barrier(2, timeout=5)
+
+    def cpu_stage(inputs):
+        barrier.wait()
+        return "mask"
+
+    def gpu_stage(inputs):
+        barrier.wait()
+        return ["frame-0", "frame-1"]
+
+    graph = StageGraph([
+        Stage("background", cpu_stage),
+        Stage("generate", gpu_stage, resource=GPU),
+        Stage("hitboxes", lambda inputs: len(inputs["generate"]), deps=("generate",)),
+        Stage("sheet", lambda inputs: "+".join(inputs["generate"]), deps=("generate",)),
+        Stage("metadata", lambda inputs: (inputs["hitboxes"], inputs["sheet"], inputs["background"]),
+              deps=("hitboxes", "sheet", "background")),
+    ])
+    durations = {}
+    results = graph.run(executor, on_stage_complete=lambda name, seconds: durations.__setitem__(name, seconds))
+
+    assert results["metadata"] == (2, "frame-0+frame-1", "mask")
+    assert set(durations) == {"background", "generate", "hitboxes", "sheet", "metadata"}
+
+def test_failed_stage_stops_dependents(executor):
+    ran = []
+    graph = StageGraph([
+        Stage("generate", lambda inputs: 1 / 0, resource=GPU),
+        Stage("hitboxes", lambda inputs: ran.append("hitboxes"), deps=("generate",)),
+    ])
+    with pytest.raises(ZeroDivisionError):
+        graph.run(executor)
+    assert ran == []
+
+def test_stage_timeout_is_enforced(executor):
+    graph = StageGraph([Stage("slow", lambda inputs: time.sleep(1), timeout=0.05)])
+    start = time.monotonic()
+    with pytest.raises(StageTimeoutError):
+        graph.run(executor)
+    assert time.monotonic() - start < 0.9
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", lambda inputs: None, deps=("missing",))])
+    with pytest.raises(ValueError):
+        StageGraph([
+            Stage("a", lambda inputs: None, deps=("b",)),
+            Stage("b", lambda inputs: None, deps=("a",)),
+        ])
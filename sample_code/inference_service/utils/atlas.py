@@ -0,0 +1,261 @@
+import hashlib
+import logging
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# (x, y, width, height)
+Rect = Tuple[int, int, int, int]
+
+DEFAULT_MAX_PAGE_SIZE = 2048
+DEFAULT_PADDING = 2
+
+@dataclass
+class AtlasSprite:
+    """
+    Where one animation frame lives in the atlas.
+
+    The trimmed sprite occupies (x, y, width, height) on `page`; drawing it at
+    (offset_x, offset_y) on a transparent source_width x source_height canvas
+    reconstructs the original frame.
+    """
+    page: int
+    x: int
+    y: int
+    width: int
+    height: int
+    offset_x: int
+    offset_y: int
+    source_width: int
+    source_height: int
+
+    def describe(self) -> Dict[str, int]:
+        return asdict(self)
+
+@dataclass
+class Atlas:
+    """Packed atlas pages plus one sprite entry per input frame, in frame order."""
+    pages: List[Image.Image]
+    sprites: List[AtlasSprite]
+    unique_sprites: int
+
+class MaxRectsBin:
+    """
+    A single bin packed with the MaxRects algorithm (best short side fit).
+
+    The bin tracks the maximal free rectangles left after every placement; a new
+    rectangle goes into the free rectangle that leaves the smallest leftover on
+    its shorter side.
+    """
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self._free: List[Rect] = [(0, 0, width, height)]
+
+    def insert(self, width: int, height: int) -> Optional[Tuple[int, int]]:
+        """Places a rectangle and returns its position, or None if it does not fit."""
+        best: Optional[Tuple[int, int]] = None
+        best_score: Optional[Tuple[int, int]] = None
+        for fx, fy, fw, fh in self._free:
+            if width <= fw and height <= fh:
+                leftover_w, leftover_h = fw - width, fh - height
+                score = (min(leftover_w, leftover_h), max(leftover_w, leftover_h))
+                if best_score is None or score < best_score:
+                    best, best_score = (fx, fy), score
+        if best is not None:
+            self._split_free(best[0], best[1], width, height)
+        return best
+
+    def _split_free(self, ux: int, uy: int, uw: int, uh: int) -> None:
+        free: List[Rect] = []
+        for rect in self._free:
+            fx, fy, fw, fh = rect
+            if ux >= fx + fw or ux + uw <= fx or uy >= fy + fh or uy + uh <= fy:
+                free.append(rect)
+                continue
+            if ux > fx:
+                free.append((fx, fy, ux - fx, fh))
+            if ux + uw < fx + fw:
+                free.append((ux + uw, fy, fx + fw - ux - uw, fh))
+            if uy > fy:
+                free.append((fx, fy, fw, uy - fy))
+            if uy + uh < fy + fh:
+                free.append((fx, uy + uh, fw, fy + fh - uy - uh))
+        # Drop free rectangles contained in another one (keeping one of any duplicates).
+        self._free = [
+            r for i, r in enumerate(free)
+            if not any(_contains(o, r) and (o != r or j < i) for j, o in enumerate(free) if j != i)
+        ]
+
+def _contains(outer: Rect, inner: Rect) -> bool:
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and inner[0] + inner[2] <= outer[0] + outer[2]
+            and inner[1] + inner[3] <= outer[1] + outer[3])
+
+def _pack(sizes: List[Tuple[int, int]], page_width: int, page_height: int, padding: int) -> Optional[List[Tuple[int, int]]]:
+    """Packs every size into one page, returning the positions or None if they do not all fit."""
+    # The bin is grown by the padding so that sprites may touch the right and bottom edges.
+    page_bin = MaxRectsBin(page_width + padding, page_height + padding)
+    positions = []
+    for width, height in sizes:
+        position = page_bin.insert(width + padding, height + padding)
+        if position is None:
+            return None
+        positions.append(position)
+    return positions
+
+def _page_sizes(max_page_size: int) -> List[Tuple[int, int]]:
+    """Every power-of-two page size up to the maximum, smallest area (then squarest) first."""
+    sides = []
+    side = 1
+    while side <= max_page_size:
+        sides.append(side)
+        side *= 2
+    return sorted(((w, h) for w in sides for h in sides), key=lambda s: (s[0] * s[1], abs(s[0] - s[1]), -s[0]))
+
+def _smallest_page(sizes: List[Tuple[int, int]], max_page_size: int, padding: int) -> Optional[Tuple[Tuple[int, int], List[Tuple[int, int]]]]:
+    """Finds the smallest power-of-two page that holds every size, with the positions."""
+    total_area = sum(w * h for w, h in sizes)
+    max_w = max(w for w, _ in sizes)
+    max_h = max(h for _, h in sizes)
+    for page_width, page_height in _page_sizes(max_page_size):
+        if page_width < max_w or page_height < max_h or page_width * page_height < total_area:
+            continue
+        positions = _pack(sizes, page_width, page_height, padding)
+        if positions is not None:
+            return (page_width, page_height), positions
+    return None
+
+def trim_frame(frame: Image.Image, alpha_threshold: int = 0) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    Crops a frame to the bounding box of its pixels with alpha above `alpha_threshold`.
+
+    Returns:
+        The trimmed RGBA image and its (x, y) offset in the original frame. Fully
+        transparent frames trim to a single transparent pixel at (0, 0).
+    """
+    frame = frame.convert('RGBA') if frame.mode != 'RGBA' else frame
+    alpha = frame.getchannel('A')
+    if alpha_threshold > 0:
+        alpha = alpha.point(lambda value: 255 if value > alpha_threshold else 0)
+    bbox = alpha.getbbox()
+    if bbox is None:
+        return Image.new('RGBA', (1, 1), (0, 0, 0, 0)), (0, 0)
+    return frame.crop(bbox), (bbox[0], bbox[1])
+
+def build_atlas(
+    frames: List[Image.Image],
+    padding: int = DEFAULT_PADDING,
+    max_page_size: int = DEFAULT_MAX_PAGE_SIZE,
+    alpha_threshold: int = 0
+) -> Atlas:
+    """
+    Packs animation frames into power-of-two atlas pages.
+
+    Every frame is trimmed to its opaque bounding box and identical trimmed sprites
+    are stored once. The unique sprites are packed with MaxRects into the smallest
+    power-of-two page that holds them all, or into as many `max_page_size` pages as
+    needed, each then shrunk to the smallest power-of-two size that still fits.
+
+    Args:
+        frames: A list of PIL Image objects, expected to be in RGBA format.
+        padding: Transparent pixels kept between sprites to avoid texture bleeding.
+        max_page_size: The largest page width and height.
+        alpha_threshold: Pixels with alpha strictly greater than this are kept when trimming.
+
+    Returns:
+        The packed Atlas.
+    """
+    if not frames:
+        raise ValueError("Cannot create an atlas from an empty list of frames.")
+
+    unique: List[Image.Image] = []
+    unique_index: Dict[Tuple[int, int, bytes], int] = {}
+    frame_sprites: List[Tuple[int, Tuple[int, int]]] = []
+    for frame in frames:
+        trimmed, offset = trim_frame(frame, alpha_threshold)
+        key = (trimmed.width, trimmed.height, hashlib.blake2b(trimmed.tobytes(), digest_size=16).digest())
+        if key not in unique_index:
+            unique_index[key] = len(unique)
+            unique.append(trimmed)
+        frame_sprites.append((unique_index[key], offset))
+
+    for sprite in unique:
+        if sprite.width > max_page_size or sprite.height > max_page_size:
+            raise ValueError(f"A {sprite.width}x{sprite.height} sprite does not fit in a {max_page_size}px atlas page.")
+
+    # Pack large sprites first; MaxRects does best when they are placed early.
+    order = sorted(range(len(unique)), key=lambda i: (max(unique[i].size), unique[i].width * unique[i].height), reverse=True)
+    groups: List[List[int]] = []
+    packed = _smallest_page([unique[i].size for i in order], max_page_size, padding)
+    if packed is not None:
+        groups.append(order)
+    else:
+        bins: List[MaxRectsBin] = []
+        for i in order:
+            width, height = unique[i].size
+            for page, page_bin in enumerate(bins):
+                if page_bin.insert(width + padding, height + padding) is not None:
+                    groups[page].append(i)
+                    break
+            else:
+                page_bin = MaxRectsBin(max_page_size + padding, max_page_size + padding)
+                page_bin.insert(width + padding, height + padding)
+                bins.append(page_bin)
+                groups.append([i])
+
+    pages: List[Image.Image] = []
+    placements: Dict[int, Tuple[int, int, int]] = {}
+    for page, group in enumerate(groups):
+        (page_width, page_height), positions = _smallest_page([unique[i].size for i in group], max_page_size, padding)
+        page_image = Image.new('RGBA', (page_width, page_height), (0, 0, 0, 0))
+        for i, (x, y) in zip(group, positions):
+            page_image.paste(unique[i], (x, y))
+            placements[i] = (page, x, y)
+        pages.append(page_image)
+
+    sprites = []
+    for frame, (i, (offset_x, offset_y)) in zip(frames, frame_sprites):
+        page, x, y = placements[i]
+        sprites.append(AtlasSprite(
+            page=page, x=x, y=y, width=unique[i].width, height=unique[i].height,
+            offset_x=offset_x, offset_y=offset_y,
+            source_width=frame.width, source_height=frame.height
+        ))
+
+    logger.info(
+        f"Packed {len(frames)} frames ({len(unique)} unique) into {len(pages)} atlas page(s): "
+        f"{', '.join(f'{p.width}x{p.height}' for p in pages)}."
+    )
+    return Atlas(pages=pages, sprites=sprites, unique_sprites=len(unique))
+
+def unpack_frames(pages: List[Image.Image], sprites: List[Dict[str, int]]) -> List[Image.Image]:
+    """
+    Rebuilds full-size frames from atlas pages and the sprite entries written to the metadata.
+    """
+    frames = []
+    for sprite in sprites:
+        x, y = sprite["x"], sprite["y"]
+        trimmed = pages[sprite["page"]].crop((x, y, x + sprite["width"], y + sprite["height"]))
+        frame = Image.new('RGBA', (sprite["source_width"], sprite["source_height"]), (0, 0, 0, 0))
+        frame.paste(trimmed, (sprite["offset_x"], sprite["offset_y"]))
+        frames.append(frame)
+    return frames
+
+def translate_boxes(data: Any, dx: int, dy: int) -> Any:
+    """
+    Returns a copy of hitbox data with every box (any dict with "x" and "y") moved by (dx, dy).
+
+    Used to express hitboxes, regions and hurtboxes relative to a trimmed sprite.
+    """
+    if isinstance(data, list):
+        return [translate_boxes(item, dx, dy) for item in data]
+    if isinstance(data, dict):
+        moved = {key: translate_boxes(value, dx, dy) for key, value in data.items()}
+        if "x" in data and "y" in data:
+            moved["x"] = data["x"] + dx
+            moved["y"] = data["y"] + dy
+        return moved
+    return data
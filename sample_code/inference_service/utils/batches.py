@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .job_queue import DuplicateJobError, FINISHED_STATUSES, JobQueue, JobRecord, JobStatus, QueueFullError
+
+logger = logging.getLogger(__name__)
+
+class BatchStatus:
+    RUNNING = "running"
+    COMPLETE = "complete"
+    CANCELLED = "cancelled"
+
+class BatchRun:
+    """
+    Feeds the jobs of one bulk submission into a job queue and tracks them until all finish.
+
+    Jobs are submitted in the given order, with at most `max_in_flight` of them queued or
+    running at once: enough to keep every worker (and the generation batcher) busy, while
+    leaving room in the queue for interactive jobs submitted in the meantime. A full
+    queue is retried rather than failing the batch. Once every job has finished,
+    `on_finished` is called with the run, e.g. to write an output manifest.
+    """
+    def __init__(
+        self,
+        batch_id: str,
+        job_queue: JobQueue,
+        jobs: List[Tuple[str, Any]],
+        max_in_flight: int,
+        on_submit: Optional[Callable[[str, Any], None]] = None,
+        on_skipped: Optional[Callable[[str, Any], None]] = None,
+        on_finished: Optional[Callable[["BatchRun"], None]] = None,
+        poll_interval: float = 0.2,
+    ):
+        """
+        Args:
+            batch_id: Identifies the batch in status queries and logs.
+            job_queue: The queue the jobs are submitted to.
+            jobs: (job_id, payload) pairs, in submission order.
+            max_in_flight: The most jobs of this batch queued or running at once.
+            on_submit: Called with each job's id and payload just before it is first
+                submitted, so work can start ahead of it (e.g. downloading its input).
+            on_skipped: Called for a job passed to `on_submit` that was not queued after
+                all: its id was a duplicate, or the run was cancelled while it waited.
+            on_finished: Called once every job has finished (or the run was cancelled).
+            poll_interval: Seconds between checks for free capacity and finished jobs.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        self.batch_id = batch_id
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.status = BatchStatus.RUNNING
+        self._queue = job_queue
+        self._jobs = jobs
+        self._max_in_flight = max_in_flight
+        self._on_submit = on_submit
+        self._on_skipped = on_skipped
+        self._on_finished = on_finished
+        self._poll_interval = poll_interval
+        self._records: Dict[str, JobRecord] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"batch-{batch_id}", daemon=True)
+
+    def start(self) -> "BatchRun":
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """Stops submitting further jobs; jobs already queued still run."""
+        self._stop_event.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self._thread.join(timeout=timeout)
+
+    def record(self, job_id: str) -> Optional[JobRecord]:
+        """The record of a submitted job of this batch; kept even after the queue forgets it."""
+        with self._lock:
+            return self._records.get(job_id)
+
+    def describe(self) -> Dict[str, Any]:
+        """Returns aggregate progress: job counts by status and the mean progress of all jobs."""
+        with self._lock:
+            records = [self._records.get(job_id) for job_id, _ in self._jobs]
+        counts = {"pending": 0, JobStatus.QUEUED: 0, JobStatus.RUNNING: 0, JobStatus.COMPLETE: 0, JobStatus.FAILED: 0}
+        progress = 0
+        for record in records:
+            if record is None:
+                counts["pending"] += 1
+                continue
+            counts[record.status] += 1
+            progress += 100 if record.status in FINISHED_STATUSES else record.progress_percent
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return {
+            "batch_id": self.batch_id,
+            "status": self.status,
+            "num_jobs": len(records),
+            "jobs": counts,
+            "progress_percent": progress // len(records) if records else 100,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(end - self.submitted_at, 3),
+        }
+
+    def _run(self) -> None:
+        for job_id, payload in self._jobs:
+            record = self._submit(job_id, payload)
+            if record is None:
+                break
+            with self._lock:
+                self._records[job_id] = record
+        while not self._stop_event.is_set() and self._in_flight() > 0:
+            time.sleep(self._poll_interval)
+        self.status = BatchStatus.CANCELLED if self._stop_event.is_set() else BatchStatus.COMPLETE
+        self.finished_at = time.time()
+        logger.info(f"Batch {self.batch_id} {self.status} in {self.finished_at - self.submitted_at:.1f}s.")
+        if self._on_finished is not None:
+            try:
+                self._on_finished(self)
+            except Exception as e:
+                logger.error(f"Finishing batch {self.batch_id} failed: {e}", exc_info=True)
+
+    def _submit(self, job_id: str, payload: Any) -> Optional[JobRecord]:
+        """Submits one job once there is capacity; None if the run was cancelled first."""
+        announced = False
+        while not self._stop_event.is_set():
+            if self._in_flight() >= self._max_in_flight:
+                time.sleep(self._poll_interval)
+                continue
+            if not announced:
+                # Announced once, before the first attempt: a worker may pick the job up
+                # as soon as it is queued.
+                announced = True
+                if self._on_submit is not None:
+                    self._on_submit(job_id, payload)
+            try:
+                return self._queue.submit(job_id, payload)
+            except QueueFullError:
+                time.sleep(self._poll_interval)
+                continue
+            except DuplicateJobError as e:
+                self._skipped(job_id, payload)
+                # Record the failure in the batch instead of stopping it.
+                return JobRecord(job_id=job_id, status=JobStatus.FAILED, error=str(e), finished_at=time.time())
+        if announced:
+            self._skipped(job_id, payload)
+        return None
+
+    def _skipped(self, job_id: str, payload: Any) -> None:
+        if self._on_skipped is not None:
+            self._on_skipped(job_id, payload)
+
+    def _in_flight(self) -> int:
+        with self._lock:
+            return sum(1 for record in self._records.values() if record.status not in FINISHED_STATUSES)
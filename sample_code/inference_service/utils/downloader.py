@@ -0,0 +1,253 @@
+import io
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 20 * 1024**2
+# 4096 x 4096: far above any useful sprite source, far below a decompression bomb.
+DEFAULT_MAX_PIXELS = 4096 * 4096
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 5.0
+DEFAULT_CONNECTIONS_PER_HOST = 4
+
+CHUNK_SIZE = 64 * 1024
+# Image headers (dimensions) sit in the first bytes of a file; past this much data the
+# pixel guard stops re-parsing and waits for the complete download.
+HEADER_PROBE_BYTES = 256 * 1024
+# Prefetched images nobody claimed within this time are dropped.
+PREFETCH_TTL_SECONDS = 300.0
+
+class DownloadError(RuntimeError):
+    """Raised when a source image cannot be fetched or is rejected by a size guard."""
+
+class ImageDownloader:
+    """
+    Fetches source images into memory over a shared, keep-alive connection pool.
+
+    Connections are reused across jobs, with at most `connections_per_host` open to any
+    one host (further requests wait for a free connection). Transient connection errors
+    and 502/503/504 responses are retried. A download is aborted as soon as it exceeds
+    `max_bytes` (by its Content-Length or while streaming) or its header declares more
+    than `max_pixels` pixels, before the rest of the body is read.
+
+    `prefetch` starts downloading a queued job's image in the background, so the
+    download overlaps other jobs' GPU work; `get` then returns the prefetched bytes.
+    """
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_pixels: int = DEFAULT_MAX_PIXELS,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS,
+        connections_per_host: int = DEFAULT_CONNECTIONS_PER_HOST,
+        prefetch_workers: int = 4,
+        max_prefetched: int = 16,
+        retries: int = 2,
+    ):
+        """
+        Args:
+            max_bytes: The largest accepted image file.
+            max_pixels: The most pixels (width x height) an accepted image may have.
+            timeout: Seconds to wait for data from the server before giving up.
+            connect_timeout: Seconds to wait for a connection.
+            connections_per_host: Pooled connections per host; also the most concurrent downloads from one host.
+            prefetch_workers: Threads downloading prefetched images.
+            max_prefetched: The most prefetched images held at once; beyond it, jobs download for themselves.
+            retries: Retries of failed connections and 502/503/504 responses.
+        """
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self._timeout = (connect_timeout, timeout)
+        self._max_prefetched = max_prefetched
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=connections_per_host,
+            pool_block=True,
+            max_retries=Retry(
+                total=retries, read=0, backoff_factor=0.2,
+                status_forcelist=(502, 503, 504), allowed_methods=("GET",), raise_on_status=False
+            ),
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, prefetch_workers), thread_name_prefix="downloader")
+        # url -> (download, number of jobs that will claim it, started at)
+        self._prefetched: Dict[str, Tuple[Future, int, float]] = {}
+        self._lock = threading.Lock()
+        self._counts = {
+            "downloads": 0, "bytes": 0, "failed": 0, "rejected": 0,
+            "prefetch_hits": 0, "prefetch_misses": 0, "prefetch_skipped": 0,
+        }
+
+    def fetch(self, url: str) -> bytes:
+        """
+        Downloads `url` into memory.
+
+        Raises:
+            DownloadError: If the request fails or the image exceeds a size guard.
+        """
+        start = time.perf_counter()
+        try:
+            with self._session.get(url, stream=True, timeout=self._timeout) as response:
+                response.raise_for_status()
+                length = response.headers.get("Content-Length", "")
+                if length.isdigit() and int(length) > self.max_bytes:
+                    raise self._rejected(f"Image at {url} is {int(length)} bytes, more than the {self.max_bytes} byte limit.")
+                buffer = bytearray()
+                size_known = False
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    buffer.extend(chunk)
+                    if len(buffer) > self.max_bytes:
+                        raise self._rejected(f"Image at {url} exceeds the {self.max_bytes} byte limit.")
+                    if not size_known and len(buffer) <= HEADER_PROBE_BYTES:
+                        size_known = self._check_pixels(buffer, url)
+                if not size_known:
+                    self._check_pixels(buffer, url)
+        except requests.exceptions.RequestException as e:
+            self._count("failed")
+            raise DownloadError(f"Failed to download image from {url}: {e}") from e
+        with self._lock:
+            self._counts["downloads"] += 1
+            self._counts["bytes"] += len(buffer)
+        logger.info(f"Image downloaded from {url} ({len(buffer)} bytes in {time.perf_counter() - start:.2f}s)")
+        return bytes(buffer)
+
+    def prefetch(self, url: str) -> None:
+        """Starts downloading `url` in the background for a job that will call `get` for it later."""
+        now = time.monotonic()
+        with self._lock:
+            self._drop_expired(now)
+            entry = self._prefetched.get(url)
+            if entry is not None:
+                future, claims, started_at = entry
+                self._prefetched[url] = (future, claims + 1, started_at)
+                return
+            if len(self._prefetched) >= self._max_prefetched:
+                self._counts["prefetch_skipped"] += 1
+                return
+            self._prefetched[url] = (self._executor.submit(self.fetch, url), 1, now)
+
+    def release(self, url: str) -> None:
+        """
+        Gives up one `prefetch` claim whose job was not queued after all. Once no claims
+        remain the download is dropped, and cancelled if it has not started yet.
+        """
+        with self._lock:
+            entry = self._prefetched.get(url)
+            if entry is None:
+                return
+            future, claims, started_at = entry
+            if claims > 1:
+                self._prefetched[url] = (future, claims - 1, started_at)
+                return
+            del self._prefetched[url]
+        future.cancel()
+
+    def get(self, url: str) -> bytes:
+        """
+        Returns the image at `url`: the prefetched download when there is one (waiting
+        for it to finish), otherwise a fresh download.
+
+        Raises:
+            DownloadError: If the request fails or the image exceeds a size guard.
+        """
+        with self._lock:
+            entry = self._prefetched.get(url)
+            if entry is not None:
+                future, claims, started_at = entry
+                if claims > 1:
+                    self._prefetched[url] = (future, claims - 1, started_at)
+                else:
+                    del self._prefetched[url]
+                self._counts["prefetch_hits"] += 1
+            else:
+                self._counts["prefetch_misses"] += 1
+        if entry is None:
+            return self.fetch(url)
+        return future.result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns download, rejection and prefetch counters."""
+        with self._lock:
+            return {**self._counts, "prefetched": len(self._prefetched)}
+
+    def close(self) -> None:
+        """Drops prefetched images and closes the pooled connections."""
+        with self._lock:
+            prefetched = [future for future, _, _ in self._prefetched.values()]
+            self._prefetched.clear()
+        for future in prefetched:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        self._session.close()
+
+    def _check_pixels(self, buffer: bytearray, url: str) -> bool:
+        """
+        Rejects the image if its header declares too many pixels. Returns False while
+        the header has not been received yet.
+        """
+        try:
+            with Image.open(io.BytesIO(buffer)) as image:
+                width, height = image.size
+        except Image.DecompressionBombError as e:
+            raise self._rejected(f"Image at {url} is too large: {e}")
+        except Exception:
+            return False
+        if width * height > self.max_pixels:
+            raise self._rejected(
+                f"Image at {url} is {width}x{height}, more than the {self.max_pixels} pixel limit."
+            )
+        return True
+
+    def _rejected(self, message: str) -> DownloadError:
+        self._count("rejected")
+        return DownloadError(message)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _drop_expired(self, now: float) -> None:
+        expired = [url for url, (_, _, started_at) in self._prefetched.items() if now - started_at > PREFETCH_TTL_SECONDS]
+        for url in expired:
+            future, _, _ = self._prefetched.pop(url)
+            future.cancel()
+            logger.info(f"Dropped unclaimed prefetched image {url}.")
+
+# --- Process-wide downloader ---
+
+_settings: Dict[str, Any] = {}
+_downloader: Optional[ImageDownloader] = None
+_downloader_lock = threading.Lock()
+
+def configure(**settings: Any) -> None:
+    """Sets the `ImageDownloader` arguments of the shared downloader. It is recreated on next use."""
+    global _settings
+    shutdown()
+    with _downloader_lock:
+        _settings = dict(settings)
+
+def get_downloader() -> ImageDownloader:
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None:
+            _downloader = ImageDownloader(**_settings)
+        return _downloader
+
+def shutdown() -> None:
+    """Closes the shared downloader, e.g. on application shutdown."""
+    global _downloader
+    with _downloader_lock:
+        downloader, _downloader = _downloader, None
+    if downloader is not None:
+        downloader.close()
@@ -0,0 +1,158 @@
+import io
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Output formats: plain PNG, lossless WebP, and palette-quantised (8-bit) PNG with alpha.
+FORMATS = ("png", "webp", "png8")
+FILE_EXTENSIONS = {"png": ".png", "webp": ".webp", "png8": ".png"}
+
+# Presets trade encode time against file size.
+PRESETS = ("fast", "balanced", "small")
+DEFAULT_FORMAT = "png"
+DEFAULT_PRESET = "fast"
+
+_SAVE_OPTIONS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "png": {
+        "fast": {"format": "PNG", "compress_level": 1},
+        # PIL's default level.
+        "balanced": {"format": "PNG", "compress_level": 6},
+        "small": {"format": "PNG", "compress_level": 9, "optimize": True},
+    },
+    # For lossless WebP, `quality` is the compression effort rather than fidelity.
+    "webp": {
+        "fast": {"format": "WEBP", "lossless": True, "method": 0, "quality": 0},
+        "balanced": {"format": "WEBP", "lossless": True, "method": 4, "quality": 50},
+        "small": {"format": "WEBP", "lossless": True, "method": 6, "quality": 100},
+    },
+    "png8": {
+        "fast": {"format": "PNG", "compress_level": 1},
+        "balanced": {"format": "PNG", "compress_level": 6},
+        "small": {"format": "PNG", "compress_level": 9, "optimize": True},
+    },
+}
+
+@dataclass
+class EncodedFile:
+    """The outcome of encoding one image to disk."""
+    path: str
+    format: str
+    preset: str
+    bytes: int
+    encode_seconds: float
+
+    def describe(self) -> Dict[str, Any]:
+        return asdict(self)
+
+def file_extension(fmt: str) -> str:
+    """The file extension (with the dot) used for a format."""
+    _check(fmt, DEFAULT_PRESET)
+    return FILE_EXTENSIONS[fmt]
+
+def _check(fmt: str, preset: str) -> None:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown image format '{fmt}'; expected one of {FORMATS}.")
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown encode preset '{preset}'; expected one of {PRESETS}.")
+
+def encode_to_bytes(image: Image.Image, fmt: str = DEFAULT_FORMAT, preset: str = DEFAULT_PRESET) -> bytes:
+    """
+    Encodes an image in memory.
+
+    Args:
+        image: The image to encode; RGBA images keep their alpha channel in every format.
+        fmt: "png", "webp" (lossless) or "png8" (256-colour palette with alpha).
+        preset: "fast", "balanced" or "small".
+    """
+    _check(fmt, preset)
+    if fmt == "png8":
+        # Fast octree is the quantiser that keeps an RGBA palette, so transparency survives.
+        image = image.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+    buffer = io.BytesIO()
+    image.save(buffer, **_SAVE_OPTIONS[fmt][preset])
+    return buffer.getvalue()
+
+def encode_image(image: Image.Image, path: Path, fmt: str = DEFAULT_FORMAT, preset: str = DEFAULT_PRESET) -> EncodedFile:
+    """
+    Encodes an image and writes it to `path`.
+
+    Returns:
+        The written file with its size in bytes and the time spent encoding.
+    """
+    start = time.perf_counter()
+    data = encode_to_bytes(image, fmt, preset)
+    elapsed = time.perf_counter() - start
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    logger.info(f"Encoded {path.name} as {fmt}/{preset}: {len(data)} bytes in {elapsed * 1000:.0f}ms.")
+    return EncodedFile(path=str(path), format=fmt, preset=preset, bytes=len(data), encode_seconds=round(elapsed, 4))
+
+# --- Shared encoder pool ---
+
+_max_workers = 2
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def configure(max_workers: int = 2) -> None:
+    """Sets the number of encoder threads. The pool is recreated on next use."""
+    global _max_workers
+    shutdown()
+    with _executor_lock:
+        _max_workers = max(1, max_workers)
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix="encoder")
+        return _executor
+
+def shutdown() -> None:
+    """Shuts the encoder pool down, e.g. on application shutdown."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+def encode_images(
+    images: List[Tuple[Image.Image, Path]],
+    fmt: str = DEFAULT_FORMAT,
+    preset: str = DEFAULT_PRESET
+) -> List[EncodedFile]:
+    """
+    Encodes several images on the shared encoder pool. zlib and libwebp release the
+    GIL, so pages of an atlas are compressed in parallel.
+
+    Args:
+        images: (image, output path) pairs.
+        fmt: "png", "webp" (lossless) or "png8" (256-colour palette with alpha).
+        preset: "fast", "balanced" or "small".
+
+    Returns:
+        The encoded files, in input order.
+    """
+    _check(fmt, preset)
+    if len(images) == 1:
+        image, path = images[0]
+        return [encode_image(image, path, fmt, preset)]
+    executor = _get_executor()
+    futures = [executor.submit(encode_image, image, path, fmt, preset) for image, path in images]
+    return [future.result() for future in futures]
+
+def summarize(files: List[EncodedFile]) -> Dict[str, Any]:
+    """Totals the bytes and encode time of a job's encoded files."""
+    return {
+        "format": files[0].format if files else None,
+        "preset": files[0].preset if files else None,
+        "bytes": sum(f.bytes for f in files),
+        "encode_seconds": round(sum(f.encode_seconds for f in files), 4),
+        "files": [f.describe() for f in files],
+    }
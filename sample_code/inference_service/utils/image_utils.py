@@ -1,33 +1,74 @@
-import requests
+import io
 import logging
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from PIL import Image
 
+from . import downloader
+
 logger = logging.getLogger(__name__)
 
+def download_image_bytes(url: str) -> Optional[bytes]:
+    """
+    Downloads an image from a URL straight into memory through the shared pooled
+    downloader, using its prefetched copy when there is one.
+    Returns the raw bytes on success, None on failure or when a size guard rejects it.
+    """
+    try:
+        logger.info(f"Downloading image from {url}")
+        return downloader.get_downloader().get(url)
+    except downloader.DownloadError as e:
+        logger.error(str(e))
+        return None
+
 def download_image(url: str, save_path: Path) -> bool:
     """
     Downloads an image from a URL and saves it to a local path.
     Returns True on success, False on failure.
     """
-    try:
-        logger.info(f"Downloading image from {url} to {save_path}")
-        response = requests.get(url, stream=True, timeout=30)
-        response.raise_for_status()  # Raise an exception for bad status codes
-
-        # Ensure the directory exists
-        save_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(save_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        logger.info(f"Image downloaded successfully to {save_path}")
-        return True
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Failed to download image from {url}: {e}")
+    data = download_image_bytes(url)
+    if data is None:
         return False
 
+    # Ensure the directory exists
+    save_path.parent.mkdir(parents=True, exist_ok=True)
+    save_path.write_bytes(data)
+    logger.info(f"Image saved to {save_path}")
+    return True
+
+def load_image(data: bytes) -> Image.Image:
+    """Decodes an in-memory image file (PNG, JPEG, ...) into a PIL image."""
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+def save_gif(frames: List[Image.Image], path: Path, frame_duration_ms: int = 100) -> None:
+    """Writes a looping animated GIF of the given frames."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frames[0].save(
+        path,
+        format="GIF",
+        save_all=True,
+        append_images=frames[1:],
+        duration=frame_duration_ms,
+        loop=0,
+        disposal=2,
+    )
+
+def save_animated_webp(frames: List[Image.Image], path: Path, frame_duration_ms: int = 100, quality: int = 75) -> None:
+    """Writes a looping lossy animated WebP of the given frames; much smaller than a GIF."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frames[0].save(
+        path,
+        format="WEBP",
+        save_all=True,
+        append_images=frames[1:],
+        duration=frame_duration_ms,
+        loop=0,
+        quality=quality,
+        method=4,
+    )
+
 def create_sprite_sheet(frames: List[Image.Image], columns: int) -> Image.Image:
     """
     Creates a single sprite sheet image from a list of animation frames.
@@ -65,3 +106,20 @@ def create_sprite_sheet(frames: List[Image.Image], columns: int) -> Image.Image:
         sprite_sheet.paste(frame, (x_offset, y_offset))
 
     return sprite_sheet
+
+def split_sprite_sheet(
+    sprite_sheet: Image.Image,
+    frame_width: int,
+    frame_height: int,
+    num_frames: int,
+    columns: int
+) -> List[Image.Image]:
+    """
+    Cuts a grid sprite sheet produced by `create_sprite_sheet` back into its frames.
+    """
+    frames = []
+    for i in range(num_frames):
+        x_offset = (i % columns) * frame_width
+        y_offset = (i // columns) * frame_height
+        frames.append(sprite_sheet.crop((x_offset, y_offset, x_offset + frame_width, y_offset + frame_height)))
+    return frames
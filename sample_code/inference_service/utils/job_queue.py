@@ -0,0 +1,310 @@
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Protocol, Tuple
+
+logger = logging.getLogger(__name__)
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETE = "complete"
+    FAILED = "failed"
+
+FINISHED_STATUSES = (JobStatus.COMPLETE, JobStatus.FAILED)
+
+# Events kept per job for streaming clients; older events are dropped first.
+MAX_JOB_EVENTS = 512
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+class DuplicateJobError(ValueError):
+    """Raised when a job is submitted with an id that is already known."""
+
+@dataclass
+class JobRecord:
+    """
+    The state of a single job as seen by the status and result endpoints.
+    """
+    job_id: str
+    status: str = JobStatus.QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress_percent: int = 0
+    logs: List[str] = field(default_factory=list)
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    # Numbered events for streaming clients: {"id", "event", "data"}, ids starting at 1.
+    events: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=MAX_JOB_EVENTS), repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        self._changed = threading.Condition(self._lock)
+        self._last_event_id = 0
+
+    def report(self, message: str, progress_percent: Optional[int] = None) -> None:
+        """Appends a log line, optionally advances the progress of the job, and emits a "progress" event."""
+        with self._lock:
+            self._report_locked(message, progress_percent)
+
+    def finish(
+        self,
+        status: str,
+        message: str,
+        data: Dict[str, Any],
+        result: Optional[Any] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """
+        Marks the job complete or failed and emits its final event (`status`, with `data`)
+        in the same step, so a streaming client never sees a finished job whose final
+        event has not been recorded yet.
+        """
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self._report_locked(message, 100 if status == JobStatus.COMPLETE else None)
+            self._emit_locked(status, data)
+
+    def _report_locked(self, message: str, progress_percent: Optional[int]) -> None:
+        self.logs.append(message)
+        if progress_percent is not None:
+            self.progress_percent = max(self.progress_percent, min(int(progress_percent), 100))
+        self._emit_locked("progress", {
+            "status": self.status,
+            "message": message,
+            "progress_percent": self.progress_percent,
+        })
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        """Records an event (e.g. "stage", "step", "preview") and wakes streaming clients."""
+        with self._lock:
+            self._emit_locked(event, data)
+
+    def _emit_locked(self, event: str, data: Dict[str, Any]) -> None:
+        self._last_event_id += 1
+        self.events.append({"id": self._last_event_id, "event": event, "data": data})
+        self._changed.notify_all()
+
+    def wait_for_events(self, after_id: int = 0, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the retained events with an id greater than `after_id`, waiting up to
+        `timeout` seconds for one if there are none yet and the job is still active.
+        """
+        with self._changed:
+            if self._last_event_id <= after_id and self.status not in FINISHED_STATUSES:
+                self._changed.wait(timeout)
+            return [event for event in self.events if event["id"] > after_id]
+
+    def describe(self) -> Dict[str, Any]:
+        """Returns a JSON-serialisable snapshot of the job state."""
+        with self._lock:
+            queue_wait = None
+            if self.started_at is not None:
+                queue_wait = round(self.started_at - self.submitted_at, 3)
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "progress_percent": self.progress_percent,
+                "logs": list(self.logs),
+                "submitted_at": self.submitted_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "queue_wait_seconds": queue_wait,
+                "error": self.error,
+            }
+
+# --- Brokers ---
+
+class JobBroker(Protocol):
+    """
+    The transport between job submission and the workers. The default broker is an
+    in-process bounded queue; a local broker (e.g. Redis) can be plugged in by
+    implementing the same three methods.
+    """
+    def put(self, item: Tuple[str, Any]) -> None:
+        """Enqueues an item, raising `QueueFullError` if the broker is at capacity."""
+        ...
+
+    def get(self, timeout: float) -> Optional[Tuple[str, Any]]:
+        """Dequeues the next item, or returns None if none arrived within `timeout`."""
+        ...
+
+    def qsize(self) -> int:
+        ...
+
+class InProcessBroker:
+    """A bounded, thread-safe FIFO broker backed by `queue.Queue`."""
+    def __init__(self, max_size: int = 64):
+        self._queue: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=max_size)
+
+    def put(self, item: Tuple[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            raise QueueFullError(f"Job queue is full ({self._queue.maxsize} jobs waiting).")
+
+    def get(self, timeout: float) -> Optional[Tuple[str, Any]]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+# --- Job queue ---
+
+JobHandler = Callable[[Any, JobRecord], Any]
+
+class JobQueue:
+    """
+    Accepts jobs, hands them to a broker, and drains the broker with a pool of
+    worker threads that run `handler(payload, record)` for each job.
+
+    The handler's return value becomes the job result; an exception marks the job
+    as failed. Finished records are kept for later status/result queries, bounded
+    by `max_finished_jobs` (oldest evicted first).
+    """
+    def __init__(
+        self,
+        handler: JobHandler,
+        num_workers: int = 1,
+        broker: Optional[JobBroker] = None,
+        max_finished_jobs: int = 1000,
+        poll_interval: float = 0.5,
+    ):
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1.")
+        self._handler = handler
+        self.num_workers = num_workers
+        self._broker = broker if broker is not None else InProcessBroker()
+        self._max_finished_jobs = max_finished_jobs
+        self._poll_interval = poll_interval
+        self._records: "OrderedDict[str, JobRecord]" = OrderedDict()
+        self._queued_ids: List[str] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._workers: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """Starts the worker threads. Calling `start` on a running queue is a no-op."""
+        if self._workers:
+            return
+        self._stop_event.clear()
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        logger.info(f"Job queue started with {self.num_workers} worker(s).")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Signals the workers to exit once their current job finishes and waits for them.
+        """
+        self._stop_event.set()
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self._workers = []
+        logger.info("Job queue stopped.")
+
+    def submit(self, job_id: str, payload: Any) -> JobRecord:
+        """
+        Enqueues a job and returns its record immediately.
+
+        Raises:
+            DuplicateJobError: If a job with this id is already queued, running or retained.
+            QueueFullError: If the broker is at capacity.
+        """
+        record = JobRecord(job_id=job_id)
+        with self._lock:
+            if job_id in self._records:
+                raise DuplicateJobError(f"Job {job_id} already exists.")
+            self._records[job_id] = record
+            self._queued_ids.append(job_id)
+        try:
+            self._broker.put((job_id, payload))
+        except Exception:
+            with self._lock:
+                self._records.pop(job_id, None)
+                self._queued_ids.remove(job_id)
+            raise
+        record.report("Job queued.")
+        logger.info(f"Job {job_id} queued (queue depth: {self.queue_depth()}).")
+        return record
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        with self._lock:
+            return self._records.get(job_id)
+
+    def queue_depth(self) -> int:
+        """The number of jobs waiting for a worker."""
+        with self._lock:
+            return len(self._queued_ids)
+
+    def running_count(self) -> int:
+        with self._lock:
+            return sum(1 for r in self._records.values() if r.status == JobStatus.RUNNING)
+
+    def position(self, job_id: str) -> Optional[int]:
+        """The 0-based position of a queued job, or None if it is not waiting."""
+        with self._lock:
+            try:
+                return self._queued_ids.index(job_id)
+            except ValueError:
+                return None
+
+    def wait(self, job_id: str, timeout: float = 30.0) -> JobRecord:
+        """Blocks until the job finishes or `timeout` elapses. Intended for tests and tools."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            record = self.get(job_id)
+            if record is not None and record.status in FINISHED_STATUSES:
+                return record
+            time.sleep(0.01)
+        raise TimeoutError(f"Job {job_id} did not finish within {timeout}s.")
+
+    def _worker_loop(self) -> None:
+        while not self._stop_event.is_set():
+            item = self._broker.get(timeout=self._poll_interval)
+            if item is None:
+                continue
+            job_id, payload = item
+            self._run_job(job_id, payload)
+
+    def _run_job(self, job_id: str, payload: Any) -> None:
+        with self._lock:
+            if job_id in self._queued_ids:
+                self._queued_ids.remove(job_id)
+            record = self._records.get(job_id)
+        if record is None:
+            # Submitted through an external broker by another process.
+            record = JobRecord(job_id=job_id)
+            with self._lock:
+                self._records[job_id] = record
+
+        with record._lock:
+            record.status = JobStatus.RUNNING
+            record.started_at = time.time()
+        record.report("Job started.")
+        try:
+            result = self._handler(payload, record)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            record.finish(JobStatus.FAILED, f"Job failed: {e}", {"error": str(e)}, error=str(e))
+        else:
+            record.finish(JobStatus.COMPLETE, "Job complete.", {"result": result}, result=result)
+        self._evict_finished()
+
+    def _evict_finished(self) -> None:
+        with self._lock:
+            finished = [jid for jid, r in self._records.items() if r.status in FINISHED_STATUSES]
+            for job_id in finished[:max(0, len(finished) - self._max_finished_jobs)]:
+                del self._records[job_id]
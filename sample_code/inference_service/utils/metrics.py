@@ -0,0 +1,210 @@
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the duration histogram buckets: from sub-second CPU stages
+# up to long quality-tier generations.
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+# A sample of a collected metric: its label values and its value.
+Sample = Tuple[Dict[str, str], float]
+# (name, type, help, samples); collectors return these when the metrics are scraped.
+CollectedMetric = Tuple[str, str, str, List[Sample]]
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    """A monotonically increasing count, per combination of label values."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in sorted(self._values.items())]
+
+class Gauge(Counter):
+    """A value that goes up and down; `set_max` keeps a high-water mark."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def set_max(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = max(self._values.get(key, value), value)
+
+class Histogram:
+    """Observations counted into cumulative buckets, with their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: (per-bucket counts, sum, count).
+        self._values: Dict[Tuple[Tuple[str, str], ...], Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(_label_key(labels))
+            return entry[2] if entry else 0
+
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(key + (("le", _format_value(bound)),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Holds the process's metrics and renders them in the Prometheus text exposition format.
+
+    Counters, gauges and histograms are updated as work happens. Collectors are called
+    on every scrape for values that already live elsewhere (cache counters, queue depth),
+    so they are never stale or double-counted.
+    """
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], List[CollectedMetric]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[CollectedMetric]]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}"]
+            lines += metric.render()
+        for collector in collectors:
+            try:
+                collected = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, samples in collected:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_format_labels(_label_key(labels))} {_format_value(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+# --- Pipeline metrics ---
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "spriteshift_stage_duration_seconds", "Wall-clock time of each pipeline step (download, stages, encode)."
+)
+JOB_SECONDS = REGISTRY.histogram(
+    "spriteshift_job_duration_seconds", "Wall-clock time of a job from start to finish, excluding queue wait."
+)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "spriteshift_queue_wait_seconds", "Time jobs spent queued before a worker started them."
+)
+JOBS_TOTAL = REGISTRY.counter(
+    "spriteshift_jobs_total", "Finished jobs by outcome (complete, cached, failed)."
+)
+
+class JobTrace:
+    """
+    Wall-clock timing spans of one job. Every span is also observed in the
+    `spriteshift_stage_duration_seconds` histogram under its name.
+    """
+    def __init__(self):
+        self.spans: Dict[str, float] = {}
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+        STAGE_SECONDS.observe(seconds, stage=name)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def describe(self) -> Dict[str, object]:
+        """The job's timing breakdown, as returned to clients that ask for it."""
+        with self._lock:
+            return {
+                "total_seconds": round(self.elapsed(), 4),
+                "spans": {name: round(seconds, 4) for name, seconds in self.spans.items()},
+            }
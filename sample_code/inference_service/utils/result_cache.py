@@ -0,0 +1,197 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+def hash_bytes(data: bytes) -> str:
+    """Returns the hex SHA-256 digest of `data`, used to address source images."""
+    return hashlib.sha256(data).hexdigest()
+
+def make_key(stage: str, **parts: Any) -> str:
+    """
+    Builds a content-addressed cache key for a pipeline stage from the stage name
+    and every input that affects its output (image hashes, prompts, model ids, ...).
+    """
+    canonical = json.dumps({"stage": stage, **parts}, sort_keys=True, default=str)
+    return f"{stage}-{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+class ResultCache:
+    """
+    A size-bounded, least-recently-used cache of pipeline artifacts on local disk.
+
+    Each entry is a directory of files under `root`, written atomically so that a
+    crashed write never leaves a half-populated entry. When the total size exceeds
+    `max_bytes`, the least recently used entries are evicted. Hit and miss counters
+    are kept per stage (the prefix of the key before the first '-').
+    """
+    def __init__(self, root: Path, max_bytes: int = 2 * 1024**3):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.evictions = 0
+        self._load_index()
+
+    # --- Raw entry access ---
+
+    def get_files(self, key: str) -> Optional[Dict[str, bytes]]:
+        """Returns every file of an entry by name, or None on a miss."""
+        stage = key.split("-", 1)[0]
+        with self._lock:
+            present = key in self._index
+            if present:
+                self._index.move_to_end(key)
+        entry_dir = self._entry_dir(key)
+        files = None
+        if present:
+            try:
+                files = {p.name: p.read_bytes() for p in sorted(entry_dir.iterdir())}
+                os.utime(entry_dir)
+            except OSError as e:
+                logger.warning(f"Cache entry {key} is unreadable, dropping it: {e}")
+                self._remove(key)
+        with self._lock:
+            counter = self.hits if files is not None else self.misses
+            counter[stage] = counter.get(stage, 0) + 1
+        return files
+
+    def put_files(self, key: str, files: Dict[str, bytes]) -> None:
+        """Stores an entry made of named files, replacing any existing entry for `key`."""
+        size = sum(len(data) for data in files.values())
+        if size > self.max_bytes:
+            logger.warning(f"Not caching {key}: {size} bytes exceeds the cache size limit.")
+            return
+        staging_dir = self.root / f".tmp-{uuid.uuid4().hex}"
+        staging_dir.mkdir(parents=True)
+        try:
+            for name, data in files.items():
+                (staging_dir / name).write_bytes(data)
+            entry_dir = self._entry_dir(key)
+            entry_dir.parent.mkdir(parents=True, exist_ok=True)
+            self._remove(key)
+            os.replace(staging_dir, entry_dir)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {key}: {e}")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return
+        with self._lock:
+            self._index[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return key in self._index
+
+    # --- Typed helpers ---
+
+    def get_json(self, key: str) -> Optional[Any]:
+        files = self.get_files(key)
+        return json.loads(files["data.json"]) if files else None
+
+    def put_json(self, key: str, data: Any) -> None:
+        self.put_files(key, {"data.json": json.dumps(data).encode("utf-8")})
+
+    def get_image(self, key: str) -> Optional[Image.Image]:
+        files = self.get_files(key)
+        return _decode_png(files["image.png"]) if files else None
+
+    def put_image(self, key: str, image: Image.Image) -> None:
+        self.put_files(key, {"image.png": _encode_png(image)})
+
+    def get_frames(self, key: str) -> Optional[List[Image.Image]]:
+        files = self.get_files(key)
+        if not files:
+            return None
+        return [_decode_png(files[name]) for name in sorted(files) if name.startswith("frame_")]
+
+    def put_frames(self, key: str, frames: List[Image.Image]) -> None:
+        self.put_files(key, {f"frame_{i:04d}.png": _encode_png(frame) for i, frame in enumerate(frames)})
+
+    # --- Stats ---
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = sum(self.hits.values())
+            misses = sum(self.misses.values())
+            return {
+                "entries": len(self._index),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                "evictions": self.evictions,
+                "by_stage": {
+                    stage: {"hits": self.hits.get(stage, 0), "misses": self.misses.get(stage, 0)}
+                    for stage in sorted(set(self.hits) | set(self.misses))
+                },
+            }
+
+    # --- Internals ---
+
+    def _entry_dir(self, key: str) -> Path:
+        digest = key.rsplit("-", 1)[-1]
+        return self.root / digest[:2] / key
+
+    def _load_index(self) -> None:
+        """Rebuilds the LRU index from disk, oldest entries first."""
+        entries = []
+        for shard in self.root.iterdir():
+            if shard.name.startswith(".tmp-"):
+                shutil.rmtree(shard, ignore_errors=True)
+                continue
+            if not shard.is_dir():
+                continue
+            for entry_dir in shard.iterdir():
+                size = sum(p.stat().st_size for p in entry_dir.iterdir())
+                entries.append((entry_dir.stat().st_mtime, entry_dir.name, size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+        if entries:
+            logger.info(f"Result cache loaded {len(entries)} entries ({self._total_bytes / 1024**2:.1f}MB) from {self.root}.")
+        self._evict()
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            size = self._index.pop(key, None)
+            if size is not None:
+                self._total_bytes -= size
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _evict(self) -> None:
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or not self._index:
+                    return
+                key = next(iter(self._index))
+                self.evictions += 1
+            logger.info(f"Evicting least recently used cache entry {key}.")
+            self._remove(key)
+
+def _encode_png(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    # Cached artifacts favour fast writes over small files.
+    image.save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+def _decode_png(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
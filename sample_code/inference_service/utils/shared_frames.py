@@ -0,0 +1,94 @@
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Modes whose pixels map directly onto a (height, width, channels) uint8 array.
+CHANNELS = {"RGB": 3, "RGBA": 4}
+
+@dataclass(frozen=True)
+class FramesHandle:
+    """
+    Names a block of shared memory holding a stack of equally sized frames. The handle
+    is all a worker process receives: it is a few bytes to pickle, however large the frames.
+    """
+    name: str
+    shape: Tuple[int, int, int, int]  # (num_frames, height, width, channels)
+    mode: str
+
+def can_share(frames: List[Image.Image]) -> bool:
+    """True if the frames can be stacked into one shared array: all RGB or RGBA and of one size."""
+    if not frames or frames[0].mode not in CHANNELS:
+        return False
+    first = frames[0]
+    return all(frame.mode == first.mode and frame.size == first.size for frame in frames)
+
+class SharedFrames:
+    """
+    Owns a shared-memory copy of animation frames for hand-off to worker processes.
+
+    Frames are copied in once, as a single (num_frames, height, width, channels) uint8
+    array; workers attach to it by name and read it in place instead of receiving
+    pickled images. The block is unlinked when the owner is closed.
+    """
+    def __init__(self, frames: List[Image.Image]):
+        """
+        Args:
+            frames: Frames accepted by `can_share`.
+        """
+        if not can_share(frames):
+            raise ValueError("Shared frames must be non-empty, RGB or RGBA and of one size.")
+        mode = frames[0].mode
+        width, height = frames[0].size
+        shape = (len(frames), height, width, CHANNELS[mode])
+        self._shm: Optional[shared_memory.SharedMemory] = shared_memory.SharedMemory(
+            create=True, size=int(np.prod(shape))
+        )
+        array = np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf)
+        for i, frame in enumerate(frames):
+            array[i] = np.asarray(frame)
+        del array  # The block cannot be closed while views into it are alive.
+        self.handle = FramesHandle(name=self._shm.name, shape=shape, mode=mode)
+
+    def close(self) -> None:
+        """Releases and unlinks the block. Workers must be done with it."""
+        shm, self._shm = self._shm, None
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self) -> "SharedFrames":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+@contextmanager
+def attach(handle: FramesHandle) -> Iterator[np.ndarray]:
+    """
+    Yields the frames of `handle` as a read-only array view into the shared block.
+    The block can only be detached once no views into it remain, so delete the view
+    (and any derived from it) before the `with` block ends.
+    """
+    shm = shared_memory.SharedMemory(name=handle.name)
+    array = np.ndarray(handle.shape, dtype=np.uint8, buffer=shm.buf)
+    array.flags.writeable = False
+    try:
+        yield array
+    finally:
+        del array
+        shm.close()
+
+def to_images(array: np.ndarray) -> List[Image.Image]:
+    """
+    Copies a (num_frames, height, width, channels) array back out into RGB or RGBA images.
+    Each frame is copied first: `Image.fromarray` may otherwise keep pointing into the
+    shared block after it is detached.
+    """
+    return [Image.fromarray(frame.copy()) for frame in array]